@@ -1,6 +1,27 @@
 import chainer
+from chainer.utils import conv
 
 from chainer_wing.node import Input, Output, Function
+from chainer_wing import util
+
+
+def pooling_shape(node, in_shape, cover_all):
+    if len(in_shape) != 3:
+        raise util.InvalidShape('{} expects (channel, height, width) input '
+                                'but got {}.'.format(node.get_name(),
+                                                     in_shape))
+    ksize = node.get_param_value('ksize')
+    pad = node.get_param_value('pad')
+    # stride is not exposed and defaults to ksize.
+    out_shape = (in_shape[0],
+                 conv.get_conv_outsize(in_shape[1], ksize, ksize, pad,
+                                       cover_all),
+                 conv.get_conv_outsize(in_shape[2], ksize, ksize, pad,
+                                       cover_all))
+    if min(out_shape) <= 0:
+        raise util.InvalidShape('Output of {} becomes empty {}.'
+                                .format(node.get_name(), out_shape))
+    return out_shape
 
 
 class AveragePooling2d(Function):
@@ -15,6 +36,12 @@ class AveragePooling2d(Function):
         return self.ID + ' = average_pooling_2d(ksize={0}, pad={1}, x='.\
             format(self._ksize, self._pad)
 
+    def infer_shape(self, in_shape):
+        return pooling_shape(self, in_shape, False)
+
+    def count_flops(self, in_shape, out_shape):
+        return util.prod(out_shape) * self.get_param_value('ksize') ** 2
+
     @classmethod
     def register_chainer_impl(cls):
         return chainer.functions.average_pooling_2d
@@ -32,6 +59,12 @@ class MaxPooling2d(Function):
         return self.ID + ' = max_pooling_2d(ksize={0}, pad={1}, x='.\
             format(self._ksize, self._pad)
 
+    def infer_shape(self, in_shape):
+        return pooling_shape(self, in_shape, True)
+
+    def count_flops(self, in_shape, out_shape):
+        return util.prod(out_shape) * self.get_param_value('ksize') ** 2
+
     @classmethod
     def register_chainer_impl(cls):
         return chainer.functions.max_pooling_2d
@@ -1,6 +1,22 @@
 import chainer
+from chainer.utils import conv
 
 from chainer_wing.node import Input, Output, Link
+from chainer_wing import util
+
+
+def check_image_shape(node, in_shape):
+    if len(in_shape) != 3:
+        raise util.InvalidShape('{} expects (channel, height, width) input '
+                                'but got {}.'.format(node.get_name(),
+                                                     in_shape))
+
+
+def check_out_shape(node, out_shape):
+    if min(out_shape) <= 0:
+        raise util.InvalidShape('Output of {} becomes empty {}.'
+                                .format(node.get_name(), out_shape))
+    return out_shape
 
 
 class Convolution2D(Link):
@@ -23,6 +39,28 @@ class Convolution2D(Link):
                     pad=self._pad,
                     nobias=self._nobias)
 
+    def infer_shape(self, in_shape):
+        check_image_shape(self, in_shape)
+        ksize = self.get_param_value('ksize')
+        stride = self.get_param_value('stride')
+        pad = self.get_param_value('pad')
+        return check_out_shape(self, (
+            self.get_param_value('out_channels'),
+            conv.get_conv_outsize(in_shape[1], ksize, stride, pad),
+            conv.get_conv_outsize(in_shape[2], ksize, stride, pad)))
+
+    def count_params(self, in_shape):
+        out_channels = self.get_param_value('out_channels')
+        ksize = self.get_param_value('ksize')
+        params = in_shape[0] * out_channels * ksize * ksize
+        if not self.get_param_value('nobias'):
+            params += out_channels
+        return params
+
+    def count_flops(self, in_shape, out_shape):
+        ksize = self.get_param_value('ksize')
+        return 2 * in_shape[0] * ksize * ksize * util.prod(out_shape)
+
     @classmethod
     def register_chainer_impl(cls):
         return chainer.links.Convolution2D
@@ -48,6 +86,28 @@ class Deconvolution2D(Link):
                     pad=self._pad,
                     nobias=self._nobias)
 
+    def infer_shape(self, in_shape):
+        check_image_shape(self, in_shape)
+        ksize = self.get_param_value('ksize')
+        stride = self.get_param_value('stride')
+        pad = self.get_param_value('pad')
+        return check_out_shape(self, (
+            self.get_param_value('out_channels'),
+            conv.get_deconv_outsize(in_shape[1], ksize, stride, pad),
+            conv.get_deconv_outsize(in_shape[2], ksize, stride, pad)))
+
+    def count_params(self, in_shape):
+        out_channels = self.get_param_value('out_channels')
+        ksize = self.get_param_value('ksize')
+        params = in_shape[0] * out_channels * ksize * ksize
+        if not self.get_param_value('nobias'):
+            params += out_channels
+        return params
+
+    def count_flops(self, in_shape, out_shape):
+        ksize = self.get_param_value('ksize')
+        return 2 * util.prod(in_shape) * out_shape[0] * ksize * ksize
+
     @classmethod
     def register_chainer_impl(cls):
         return chainer.links.Deconvolution2D
@@ -74,6 +134,28 @@ class DepthwiseConvolution2D(Link):
                     pad=self._pad,
                     nobias=self._nobias)
 
+    def infer_shape(self, in_shape):
+        check_image_shape(self, in_shape)
+        ksize = self.get_param_value('ksize')
+        stride = self.get_param_value('stride')
+        pad = self.get_param_value('pad')
+        return check_out_shape(self, (
+            in_shape[0] * self.get_param_value('channel_multiplier'),
+            conv.get_conv_outsize(in_shape[1], ksize, stride, pad),
+            conv.get_conv_outsize(in_shape[2], ksize, stride, pad)))
+
+    def count_params(self, in_shape):
+        out_channels = in_shape[0] * self.get_param_value('channel_multiplier')
+        ksize = self.get_param_value('ksize')
+        params = out_channels * ksize * ksize
+        if not self.get_param_value('nobias'):
+            params += out_channels
+        return params
+
+    def count_flops(self, in_shape, out_shape):
+        ksize = self.get_param_value('ksize')
+        return 2 * ksize * ksize * util.prod(out_shape)
+
     @classmethod
     def register_chainer_impl(cls):
         return chainer.links.DepthwiseConvolution2D
@@ -98,6 +180,22 @@ class BatchNormalization(Link):
                     use_gamma=self._use_gamma,
                     use_beta=self._use_beta)
 
+    def infer_shape(self, in_shape):
+        size = self.get_param_value('size')
+        if in_shape[0] != size:
+            raise util.InvalidShape('{} has size {} but input has {} '
+                                    'channels.'.format(self.get_name(), size,
+                                                       in_shape[0]))
+        return in_shape
+
+    def count_params(self, in_shape):
+        use_params = (self.get_param_value('use_gamma'),
+                      self.get_param_value('use_beta'))
+        return in_shape[0] * sum(1 for use in use_params if use)
+
+    def count_flops(self, in_shape, out_shape):
+        return 2 * util.prod(out_shape)
+
     @classmethod
     def register_chainer_impl(cls):
         return chainer.links.BatchNormalization
@@ -13,6 +13,15 @@ class VGG16(Link):
         return 'VGG16Layers({pretrained_model}),' \
             .format(pretrained_model=self._pretrained_model)
 
+    def infer_shape(self, in_shape):
+        return 1000,
+
+    def count_params(self, in_shape):
+        return 138357544
+
+    def count_flops(self, in_shape, out_shape):
+        return 30940000000
+
     @classmethod
     def register_chainer_impl(cls):
         return chainer.links.VGG16Layers
@@ -28,6 +37,15 @@ class ResNet50(Link):
         return 'ResNetLayers({pretrained_model}, n_layers=50),' \
             .format(pretrained_model=self._pretrained_model)
 
+    def infer_shape(self, in_shape):
+        return 1000,
+
+    def count_params(self, in_shape):
+        return 25557032
+
+    def count_flops(self, in_shape, out_shape):
+        return 7720000000
+
     @classmethod
     def register_chainer_impl(cls):
         return chainer.links.ResNet50Layers
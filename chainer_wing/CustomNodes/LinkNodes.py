@@ -1,6 +1,7 @@
 import chainer
 
 from chainer_wing.node import Input, Output, Link
+from chainer_wing import util
 
 
 # TODO(fukatani): implement systematically.
@@ -16,6 +17,18 @@ class Linear(Link):
             .format(out_size=self._out_size,
                     nobias=self._nobias)
 
+    def infer_shape(self, in_shape):
+        return self.get_param_value('out_size'),
+
+    def count_params(self, in_shape):
+        out_size = self.get_param_value('out_size')
+        if self.get_param_value('nobias'):
+            return util.prod(in_shape) * out_size
+        return (util.prod(in_shape) + 1) * out_size
+
+    def count_flops(self, in_shape, out_shape):
+        return 2 * util.prod(in_shape) * util.prod(out_shape)
+
     @classmethod
     def register_chainer_impl(cls):
         return chainer.links.Linear
@@ -32,6 +45,18 @@ class Maxout(Link):
         return 'Maxout(None, {out_size}, {pool_size}),' \
             .format(out_size=self._out_size, pool_size=self._pool_size)
 
+    def infer_shape(self, in_shape):
+        return self.get_param_value('out_size'),
+
+    def count_params(self, in_shape):
+        out_size = self.get_param_value('out_size')
+        pool_size = self.get_param_value('pool_size')
+        return (util.prod(in_shape) + 1) * out_size * pool_size
+
+    def count_flops(self, in_shape, out_shape):
+        pool_size = self.get_param_value('pool_size')
+        return 2 * util.prod(in_shape) * util.prod(out_shape) * pool_size
+
     @classmethod
     def register_chainer_impl(cls):
         return chainer.links.Maxout
@@ -0,0 +1,94 @@
+"""
+Measure predict latency of a compiled net before and after folding
+BatchNormalization into the preceding Linear links.
+
+    python bench_fusion.py
+"""
+from importlib import machinery
+import os
+import sys
+import tempfile
+import timeit
+
+import chainer
+import numpy
+from PyQt5.QtWidgets import QApplication
+
+from chainer_wing import compiler
+from chainer_wing.gui_main.graph import Graph
+from chainer_wing.node import NODECLASSES
+from chainer_wing.subwindows.train_config import TrainParamServer
+import chainer_wing.node_lib  # To register CustomNodes.
+
+
+def build_graph(n_hidden, width):
+    graph = Graph()
+
+    def spawn(class_name, **values):
+        node = graph.spawnNode(NODECLASSES[class_name])
+        for key, value in values.items():
+            node.inputs[key].set_value(value)
+        return node
+
+    previous = None
+    for _ in range(n_hidden):
+        layers = [spawn('Linear', out_size=width, nobias=False),
+                  spawn('BatchNormalization', size=width, decay=0.9,
+                        eps=2e-5, use_gamma=True, use_beta=True),
+                  spawn('Relu')]
+        for layer in layers:
+            if previous is not None:
+                graph.connect(previous, 'out_array', layer, 'in_array')
+            previous = layer
+    last = spawn('Linear', out_size=10, nobias=False)
+    loss = spawn('SoftmaxCrossEntropy')
+    graph.connect(previous, 'out_array', last, 'in_array')
+    graph.connect(last, 'out_array', loss, 'in_array')
+    return graph
+
+
+def main(n_hidden=4, width=512, batch_size=256, repeat=50):
+    work_dir = tempfile.mkdtemp()
+    os.mkdir(os.path.join(work_dir, 'result'))
+    TrainParamServer().load_from_dict({'WorkDir': work_dir,
+                                       'NetName': 'FusionNet',
+                                       'ModelName': 'FusionModel',
+                                       'Task': 'Simple Classification',
+                                       'Optimizer': 'SGD',
+                                       'opt_lr': 0.01,
+                                       'BatchSize': batch_size,
+                                       'Epoch': 1,
+                                       'GPU': 0})
+    graph = build_graph(n_hidden, width)
+    compiler_instance = compiler.Compiler()
+    assert compiler_instance(graph.nodes)
+    for report in compiler_instance.reports:
+        print(report)
+
+    module = machinery.SourceFileLoader(
+        'fusion_net', TrainParamServer().get_net_name()).load_module()
+    x = numpy.random.rand(batch_size, 784).astype(numpy.float32)
+    model = module.FusionNet()
+    with chainer.using_config('train', False):
+        model.predict(x)  # initialize parameters.
+        for name, link in model.namedlinks(skipself=True):
+            if isinstance(link, chainer.links.BatchNormalization):
+                link.avg_mean[...] = numpy.random.rand(width)
+                link.avg_var[...] = numpy.random.rand(width) + 0.5
+
+        expect = model.predict(x)
+        before = min(timeit.repeat(lambda: model.predict(x), number=1,
+                                   repeat=repeat))
+        model.fuse_batch_normalization()
+        actual = model.predict(x)
+        after = min(timeit.repeat(lambda: model.predict(x), number=1,
+                                  repeat=repeat))
+    assert numpy.allclose(expect, actual, atol=1e-4)
+    print('predict latency before fusion: {:.3f} ms'.format(before * 1000))
+    print('predict latency after fusion:  {:.3f} ms'.format(after * 1000))
+    return before, after
+
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    main()
@@ -0,0 +1,43 @@
+"""
+Measure an epoch of batches of tabular data by SerialIterator with
+concat_examples and by ArrayIterator with array_converter.
+
+    python bench_iterator.py
+"""
+import time
+
+import chainer
+from chainer.datasets import TupleDataset
+import numpy
+
+from chainer_wing.extension.array_iterator import array_converter
+from chainer_wing.extension.array_iterator import ArrayIterator
+
+
+def measure(iterator, converter, n_batches):
+    start = time.perf_counter()
+    for _ in range(n_batches):
+        converter(iterator.next())
+    return time.perf_counter() - start
+
+
+def main(n_examples=100000, n_features=100, batch_sizes=(20, 100, 1000)):
+    x = numpy.random.rand(n_examples, n_features).astype(numpy.float32)
+    t = numpy.random.randint(0, 10, n_examples).astype(numpy.int32)
+    dataset = TupleDataset(x, t)
+    results = {}
+    for batch_size in batch_sizes:
+        n_batches = n_examples // batch_size
+        serial = measure(chainer.iterators.SerialIterator(dataset, batch_size),
+                         chainer.dataset.concat_examples, n_batches)
+        array = measure(ArrayIterator(dataset, batch_size), array_converter,
+                        n_batches)
+        results[batch_size] = serial, array
+        print('batch {:>5}: SerialIterator {:7.1f} ms / epoch, '
+              'ArrayIterator {:7.1f} ms / epoch ({:.1f}x)'.format(
+                  batch_size, serial * 1000, array * 1000, serial / array))
+    return results
+
+
+if __name__ == '__main__':
+    main()
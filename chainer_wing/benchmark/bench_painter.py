@@ -0,0 +1,101 @@
+"""
+Measure Painter2D repaint time on synthetic graphs while panning over a
+part of the graph and while zoomed out to show the whole graph, and the
+time of hit testing for hover, click and box selection.
+
+    python bench_painter.py
+"""
+import math
+import os
+import sys
+import tempfile
+import timeit
+
+from PyQt5 import QtCore
+from PyQt5 import QtGui
+from PyQt5.QtWidgets import QApplication
+
+from chainer_wing.gui_main.graph import Graph
+from chainer_wing.gui_main.painter import Painter2D
+from chainer_wing.node import NODECLASSES
+import chainer_wing.node_lib  # To register CustomNodes.
+
+
+def make_settings():
+    settings = QtCore.QSettings(
+        os.path.join(tempfile.mkdtemp(), 'bench_painter.ini'),
+        QtCore.QSettings.IniFormat)
+    settings.setValue('FontSize', 8)
+    settings.setValue('NodeTitleFontSize', 11)
+    settings.setValue('ConnectionLineWidth', 2)
+    settings.setValue('NodeWidth', 100)
+    return settings
+
+
+def build_graph(n_nodes):
+    painter = Painter2D()
+    painter.set_settings(make_settings())
+    graph = Graph(painter=painter)
+    columns = int(math.ceil(math.sqrt(n_nodes)))
+    previous = None
+    for i in range(n_nodes):
+        position = ((i % columns) * 250, (i // columns) * 200)
+        if i % 2:
+            node = graph.spawnNode(NODECLASSES['Relu'], position=position,
+                                   silent=True)
+        else:
+            node = graph.spawnNode(NODECLASSES['Linear'], position=position,
+                                   silent=True)
+            node.inputs['out_size'].set_value(10)
+        if previous is not None:
+            graph.connect(previous, 'out_array', node, 'in_array')
+        previous = node
+    return painter, columns
+
+
+def measure(painter, image, move, repeat):
+    def repaint():
+        move()
+        painter.render(image)
+    repaint()  # Warm up.
+    return min(timeit.repeat(repaint, number=1, repeat=repeat))
+
+
+def measure_hit_test(painter, repeat):
+    center = QtCore.QPoint(painter.width() // 2, painter.height() // 2)
+
+    def hit_test():
+        painter.getInputPinAt(center)
+        painter.getOutputPinAt(center)
+        painter.nodeAt(center)
+        painter.massNodeCollide(0, 0, painter.width(), painter.height())
+    return min(timeit.repeat(hit_test, number=1, repeat=repeat))
+
+
+def main(sizes=(100, 1000, 5000), repeat=5):
+    results = []
+    for n_nodes in sizes:
+        painter, columns = build_graph(n_nodes)
+        painter.resize(1200, 800)
+        image = QtGui.QImage(painter.size(), QtGui.QImage.Format_ARGB32)
+
+        def pan():
+            painter.globalOffset += QtCore.QPoint(7, 5)
+
+        painter.scale = 1.
+        painted_pan = measure(painter, image, pan, repeat)
+        painter.scale = 1200. / (columns * 250)
+        painter.globalOffset = QtCore.QPoint(0, 0)
+        painted_all = measure(painter, image, pan, repeat)
+        hit_test = measure_hit_test(painter, repeat)
+        print('{:>6} nodes: pan {:9.2f} ms, whole graph {:9.2f} ms, '
+              'hit test {:7.3f} ms'.format(n_nodes, painted_pan * 1000,
+                                           painted_all * 1000,
+                                           hit_test * 1000))
+        results.append((n_nodes, painted_pan, painted_all, hit_test))
+    return results
+
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    main()
@@ -0,0 +1,58 @@
+"""
+Measure the overhead of CWProgressBar per training iteration, with Qt
+events processed every iteration and at the default interval.
+
+    python bench_progress.py
+"""
+import sys
+import time
+import types
+
+from PyQt5.QtWidgets import QApplication
+
+from chainer_wing.extension.cw_progress_bar import CWProgressBar
+
+
+def make_trainer(iters_per_epoch):
+    updater = types.SimpleNamespace(iteration=0, epoch=0, epoch_detail=0.)
+    trainer = types.SimpleNamespace(updater=updater, observation={})
+
+    def step():
+        updater.iteration += 1
+        updater.epoch_detail = updater.iteration / iters_per_epoch
+        updater.epoch = updater.iteration // iters_per_epoch
+        trainer.observation = {'main/loss': 1. / updater.iteration}
+    return trainer, step
+
+
+def measure(pbar, n_iter, iters_per_epoch):
+    trainer, step = make_trainer(iters_per_epoch)
+    start = time.perf_counter()
+    for _ in range(n_iter):
+        step()
+        pbar(trainer)
+    elapsed = time.perf_counter() - start
+    pbar.finalize()
+    # Subtract the cost of the fake training loop.
+    trainer, step = make_trainer(iters_per_epoch)
+    start = time.perf_counter()
+    for _ in range(n_iter):
+        step()
+    return (elapsed - (time.perf_counter() - start)) / n_iter
+
+
+def main(n_iter=20000, epoch=20):
+    iters_per_epoch = n_iter // epoch
+    results = {}
+    for name, event_interval in (('every iteration', 0.),
+                                 ('default', 0.05)):
+        pbar = CWProgressBar(epoch, event_interval=event_interval)
+        results[name] = measure(pbar, n_iter, iters_per_epoch)
+        print('events {:>16}: {:8.2f} us / iteration'.format(
+            name, results[name] * 1e6))
+    return results
+
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    main()
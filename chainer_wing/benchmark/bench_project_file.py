@@ -0,0 +1,73 @@
+"""
+Measure save and load time and file size of the compact project format
+against the indented format of Graph.to_dict on synthetic graphs.
+
+    python bench_project_file.py
+"""
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+from PyQt5.QtWidgets import QApplication
+
+from chainer_wing.benchmark.bench_painter import build_graph
+from chainer_wing.benchmark.bench_painter import make_settings
+from chainer_wing.gui_main.graph import Graph
+from chainer_wing.gui_main.painter import Painter2D
+from chainer_wing.gui_main import project
+from chainer_wing.subwindows.train_config import TrainParamServer
+from chainer_wing import util
+
+
+def new_graph():
+    painter = Painter2D()
+    painter.set_settings(make_settings())
+    return Graph(painter=painter)
+
+
+def save_indented(file_name, graph):
+    with open(file_name, 'w') as fw:
+        proj_dict = {'graph': graph.to_dict(),
+                     'train': TrainParamServer().to_dict()}
+        fw.write(json.dumps(proj_dict, sort_keys=True, indent=4,
+                            cls=util.NetJSONEncoder))
+
+
+def measure(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main(sizes=(1000, 10000), repeat=3):
+    work_dir = tempfile.mkdtemp()
+    compact_file = os.path.join(work_dir, 'compact.json')
+    indented_file = os.path.join(work_dir, 'indented.json')
+    results = []
+    for n_nodes in sizes:
+        painter, _ = build_graph(n_nodes)
+        graph = painter.graph
+        save_old = measure(lambda: save_indented(indented_file, graph),
+                           repeat)
+        save_new = measure(lambda: project.save_project(compact_file, graph),
+                           repeat)
+        load_old = measure(
+            lambda: project.load_project(indented_file, new_graph()), repeat)
+        load_new = measure(
+            lambda: project.load_project(compact_file, new_graph()), repeat)
+        size_old = os.path.getsize(indented_file)
+        size_new = os.path.getsize(compact_file)
+        print('{:>6} nodes: indented save {:8.1f} ms, load {:8.1f} ms, '
+              '{:6.0f} KiB'.format(n_nodes, save_old * 1000,
+                                   load_old * 1000, size_old / 1024))
+        print('{:>6} nodes: compact  save {:8.1f} ms, load {:8.1f} ms, '
+              '{:6.0f} KiB'.format(n_nodes, save_new * 1000,
+                                   load_new * 1000, size_new / 1024))
+        results.append((n_nodes, save_old, load_old, size_old,
+                        save_new, load_new, size_new))
+    return results
+
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    main()
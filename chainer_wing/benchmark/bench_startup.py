@@ -0,0 +1,72 @@
+"""
+Measure application startup: import cost of each module imported by the
+main window, reported by python -X importtime, and the time until the main
+window is shown and until its configuration is loaded.
+
+    python bench_startup.py
+"""
+import subprocess
+import sys
+import time
+
+from PyQt5 import QtWidgets
+
+MAIN_MODULE = 'chainer_wing.gui_main.main'
+
+
+def measure_imports(module=MAIN_MODULE):
+    """
+    Import module in a fresh interpreter.
+    :return: Dictionary from module name to (self, cumulative) import time
+     in seconds.
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                           'import ' + module],
+                          stderr=subprocess.PIPE, universal_newlines=True)
+    costs = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        costs[name.strip()] = (int(self_us) / 1e6, int(cumulative_us) / 1e6)
+    return costs
+
+
+def measure_window():
+    """
+    :return: Time to construct and show the main window, and time to load
+     its configuration and the node library, in seconds.
+    """
+    from chainer_wing.gui_main.main import initialize_painter
+    from chainer_wing.gui_main.painter import MainWindow
+    start = time.perf_counter()
+    win = MainWindow(painter=initialize_painter())
+    win.show()
+    win.repaint()
+    shown = time.perf_counter() - start
+    start = time.perf_counter()
+    win.init_config()
+    configured = time.perf_counter() - start
+    win.close()
+    return shown, configured
+
+
+def main(top=15):
+    costs = measure_imports()
+    total = costs[MAIN_MODULE][1]
+    print('import {}: {:.1f} ms'.format(MAIN_MODULE, total * 1000))
+    top_level = [(cumulative, name) for name, (_, cumulative) in costs.items()
+                 if '.' not in name or name.startswith('chainer_wing')]
+    for cumulative, name in sorted(top_level, reverse=True)[:top]:
+        print('{:>9.1f} ms  {}'.format(cumulative * 1000, name))
+    for heavy in ('chainer', 'chainercv', 'numpy'):
+        print('{} imported at startup: {}'.format(heavy, heavy in costs))
+    shown, configured = measure_window()
+    print('window shown {:.1f} ms, configuration loaded {:.1f} ms'.format(
+        shown * 1000, configured * 1000))
+    return costs, shown, configured
+
+
+if __name__ == '__main__':
+    app = QtWidgets.QApplication(sys.argv)
+    main()
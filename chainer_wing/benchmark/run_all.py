@@ -0,0 +1,265 @@
+"""
+Benchmark suite for the data loading, compile, train step and predict
+paths on synthetic data. It runs without a display and writes the results
+as JSON, so that results of two versions can be compared.
+
+    python run_all.py [--quick] [--only csv compile ...] [--output FILE]
+"""
+import argparse
+import contextlib
+from importlib import machinery
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+import chainer
+import numpy
+
+from chainer_wing import compiler
+from chainer_wing.data_fetch import DataManager
+from chainer_wing.gui_main.graph import Graph
+from chainer_wing.gui_main import project
+from chainer_wing.node import NODECLASSES
+from chainer_wing.runner import PredictionRunner
+from chainer_wing.subwindows.train_config import TrainParamServer
+import chainer_wing.node_lib  # To register CustomNodes.
+
+MNIST_PROJECT = os.path.join(os.path.dirname(__file__),
+                             '../../examples/mnist/mnist.json')
+
+
+def set_train_params(work_dir, **params):
+    result_dir = os.path.join(work_dir, 'result')
+    if not os.path.isdir(result_dir):
+        os.mkdir(result_dir)
+    train_params = {'WorkDir': work_dir,
+                    'NetName': 'BenchNet',
+                    'ModelName': 'BenchModel',
+                    'Task': 'Simple Classification',
+                    'Optimizer': 'SGD',
+                    'opt_lr': 0.01,
+                    'BatchSize': 100,
+                    'Epoch': 1,
+                    'GPU': 0}
+    train_params.update(params)
+    TrainParamServer().load_from_dict(train_params)
+
+
+def measure(func, repeat):
+    func()  # Warm up.
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def bench_csv(work_dir, sizes, repeat, n_columns=10):
+    """
+    DataManager.csv_to_ndarray on csv files of sizes rows.
+    """
+    results = []
+    for n_rows in sizes:
+        csv_file = os.path.join(work_dir, 'bench_{}.csv'.format(n_rows))
+        array = numpy.random.rand(n_rows, n_columns).astype(numpy.float32)
+        numpy.savetxt(csv_file, array, fmt='%.6f', delimiter=',')
+        elapsed = min(timeit.repeat(
+            lambda: DataManager().csv_to_ndarray(csv_file, True, False),
+            number=1, repeat=repeat))
+        results.append({'rows': n_rows,
+                        'columns': n_columns,
+                        'bytes': os.path.getsize(csv_file),
+                        'seconds': elapsed,
+                        'rows_per_sec': n_rows / elapsed})
+        os.remove(csv_file)
+    return results
+
+
+def bench_compute_mean(work_dir, sizes, repeat, image_size=64):
+    """
+    ImageDataManager.compute_mean on sizes synthetic images.
+    """
+    try:
+        import PIL.Image
+        from chainer_wing.data_fetch import ImageDataManager
+    except ImportError as error:
+        return {'skipped': str(error)}
+    set_train_params(work_dir, ResizeWidth=image_size,
+                     ResizeHeight=image_size, Crop='Do Nothing',
+                     CropWidth=image_size, CropHeight=image_size,
+                     UseRandomXFlip=False, UseRandomYFlip=False,
+                     UseRandomRotation=False, PCAlighting=0)
+    results = []
+    for n_images in sizes:
+        image_dir = tempfile.mkdtemp(dir=work_dir)
+        image_files = []
+        for i in range(n_images):
+            image_file = os.path.join(image_dir, '{}.png'.format(i))
+            pixels = numpy.random.randint(0, 256, (image_size, image_size, 3))
+            PIL.Image.fromarray(pixels.astype(numpy.uint8)).save(image_file)
+            image_files.append(image_file)
+        try:
+            elapsed = measure(
+                lambda: ImageDataManager().compute_mean(image_files), repeat)
+        except Exception as error:
+            # e.g. chainercv is missing in augment_data.
+            return {'skipped': '{}: {}'.format(type(error).__name__, error)}
+        results.append({'images': n_images,
+                        'image_size': image_size,
+                        'seconds': elapsed,
+                        'images_per_sec': n_images / elapsed})
+    return results
+
+
+def build_chain(n_nodes, width=32):
+    graph = Graph()
+    previous = None
+    for i in range(n_nodes - 1):
+        if i % 2:
+            node = graph.spawnNode(NODECLASSES['Relu'])
+        else:
+            node = graph.spawnNode(NODECLASSES['Linear'])
+            node.inputs['out_size'].set_value(width)
+            node.inputs['nobias'].set_value(False)
+        if previous is not None:
+            graph.connect(previous, 'out_array', node, 'in_array')
+        previous = node
+    loss = graph.spawnNode(NODECLASSES['SoftmaxCrossEntropy'])
+    graph.connect(previous, 'out_array', loss, 'in_array')
+    return graph
+
+
+def bench_compile(work_dir, sizes, repeat):
+    """
+    Compiler on chains of Linear and Relu nodes of sizes nodes.
+    """
+    set_train_params(work_dir)
+    results = []
+    for n_nodes in sizes:
+        graph = build_chain(n_nodes)
+        elapsed = measure(lambda: compiler.Compiler()(graph.nodes), repeat)
+        results.append({'nodes': n_nodes, 'seconds': elapsed})
+    return results
+
+
+def load_mnist_net(work_dir, batch_size):
+    graph = Graph()
+    project.load_project(MNIST_PROJECT, graph)
+    # Keep the optimizer settings of the example, but never use GPU.
+    TrainParamServer()['WorkDir'] = work_dir
+    TrainParamServer()['NetName'] = 'BenchNet'
+    TrainParamServer()['ModelName'] = 'BenchModel'
+    TrainParamServer()['GPU'] = 0
+    TrainParamServer()['BatchSize'] = batch_size
+    if not os.path.isdir(TrainParamServer().get_result_dir()):
+        os.mkdir(TrainParamServer().get_result_dir())
+    assert compiler.Compiler()(graph.nodes)
+    return machinery.SourceFileLoader(
+        'bench_net', TrainParamServer().get_net_name()).load_module()
+
+
+def bench_train_step(work_dir, n_steps, batch_size=100):
+    """
+    Train steps of the mnist example net on random images.
+    The trained model is saved for bench_predict.
+    """
+    module = load_mnist_net(work_dir, batch_size)
+    model = module.BenchNet()
+    optimizer = module.get_optimizer()
+    optimizer.setup(model)
+    x = numpy.random.rand(batch_size, 784).astype(numpy.float32)
+    t = numpy.random.randint(0, 10, batch_size).astype(numpy.int32)
+    optimizer.update(model, x, t)  # Warm up.
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        optimizer.update(model, x, t)
+    elapsed = time.perf_counter() - start
+    chainer.serializers.save_npz(TrainParamServer().get_model_name() + '.npz',
+                                 model)
+    return {'optimizer': TrainParamServer()['Optimizer'],
+            'batch_size': batch_size,
+            'steps': n_steps,
+            'steps_per_sec': n_steps / elapsed,
+            'samples_per_sec': n_steps * batch_size / elapsed}
+
+
+def bench_predict(work_dir, sizes, repeat):
+    """
+    PredictionRunner on npz files of sizes samples, with the model saved by
+     bench_train_step.
+    """
+    results = []
+    for n_samples in sizes:
+        pred_file = os.path.join(work_dir, 'pred_{}.npz'.format(n_samples))
+        numpy.savez(pred_file,
+                    x=numpy.random.rand(n_samples, 784).astype(numpy.float32))
+        TrainParamServer()['PredInputData'] = pred_file
+        runner = PredictionRunner()
+        elapsed = measure(lambda: runner.run(True, False), repeat)
+        results.append({'samples': n_samples,
+                        'seconds': elapsed,
+                        'samples_per_sec': n_samples / elapsed})
+    return results
+
+
+BENCHMARKS = ('csv', 'compute_mean', 'compile', 'train_step', 'predict')
+
+
+def main(only=BENCHMARKS, quick=False, repeat=3):
+    if quick:
+        csv_sizes, image_sizes, graph_sizes = (10 ** 4, 10 ** 5), (16,), \
+            (10, 100)
+        n_steps, pred_sizes = 20, (1000,)
+    else:
+        csv_sizes, image_sizes, graph_sizes = \
+            (10 ** 5, 10 ** 6, 10 ** 7), (64, 256), (10, 100, 1000)
+        n_steps, pred_sizes = 200, (1000, 10000)
+    work_dir = tempfile.mkdtemp()
+    set_train_params(work_dir)
+    results = {}
+    # Keep stdout for the JSON.
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            if 'csv' in only:
+                results['csv'] = bench_csv(work_dir, csv_sizes, repeat)
+            if 'compute_mean' in only:
+                results['compute_mean'] = bench_compute_mean(
+                    work_dir, image_sizes, repeat)
+            if 'compile' in only:
+                results['compile'] = bench_compile(work_dir, graph_sizes,
+                                                   repeat)
+            if 'train_step' in only or 'predict' in only:
+                results['train_step'] = bench_train_step(work_dir, n_steps)
+            if 'predict' in only:
+                results['predict'] = bench_predict(work_dir, pred_sizes,
+                                                   repeat)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return {'python': platform.python_version(),
+            'chainer': chainer.__version__,
+            'numpy': numpy.__version__,
+            'platform': platform.platform(),
+            'quick': quick,
+            'results': results}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quick', action='store_true',
+                        help='Use small sizes.')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS,
+                        default=BENCHMARKS)
+    parser.add_argument('--output', default=None,
+                        help='JSON file. By default, print to stdout.')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    report = json.dumps(main(args.only, args.quick), indent=2)
+    if args.output:
+        with open(args.output, 'w') as fw:
+            fw.write(report + '\n')
+    else:
+        print(report)
@@ -1,3 +1,4 @@
+from chainer_wing import compiler_pass
 from chainer_wing import util
 from chainer_wing.node import InputNotAvailable
 from chainer_wing.node import Link
@@ -11,17 +12,18 @@ class NoLossError(Exception):
 
 
 class Compiler(object):
+    def __init__(self, passes=None):
+        if passes is None:
+            passes = compiler_pass.default_passes()
+        self.passes = passes
+        self.reports = []
+
     def __call__(self, nodes, **kwargs):
-        if not nodes:
-            util.disp_error('Please place nodes and connect them'
-                            ' before compilation.')
-            return False
-        init_impl = self.compile_init(nodes)
-        if not init_impl:
-            return False
-        call_impl, pred_impl, lossID = self.compile_call(nodes)
-        if not (call_impl and pred_impl):
+        compiled = self.compile_program(nodes)
+        if compiled is None:
             return False
+        (init_impl, call_impl, pred_impl, lossID, fused_pred_impl,
+         fuse_impl) = compiled
         classification = 'Class' in TrainParamServer()['Task']
         net_file = open(TrainParamServer().get_net_name(), 'w')
         net_file.write(TEMPLATES['NetTemplate']()(TrainParamServer()['NetName'],
@@ -29,11 +31,80 @@ class Compiler(object):
                                                   call_impl,
                                                   pred_impl,
                                                   lossID,
-                                                  classification))
+                                                  classification,
+                                                  fused_pred_impl,
+                                                  fuse_impl))
         net_file.write(TEMPLATES['OptimizerTemplate']()(TrainParamServer()))
-        net_file.write(TEMPLATES['TrainerTemplate']()(TrainParamServer()))
+        net_file.write(TEMPLATES['TrainerTemplate']()(TrainParamServer(),
+                                                      bool(fuse_impl)))
+        return True
+
+    def export(self, nodes, module_file, weight_file):
+        """
+        Write a standalone inference module of the graph.
+        :param module_file: Path of the module to be written.
+        :param weight_file: Weight file name relative to module_file.
+        :return: If export was succeeded, return True.
+        """
+        compiled = self.compile_program(nodes)
+        if compiled is None:
+            return False
+        init_impl, _, pred_impl, _, fused_pred_impl, fuse_impl = compiled
+        classification = 'Class' in TrainParamServer()['Task']
+        with open(module_file, 'w') as fw:
+            fw.write(TEMPLATES['InferenceTemplate']()(
+                TrainParamServer()['NetName'], init_impl, pred_impl,
+                classification, weight_file, fused_pred_impl, fuse_impl))
         return True
 
+    def compile_program(self, nodes):
+        """
+        Optimize nodes and compile them to the code fragments of templates.
+        :return: Tuple of init_impl, call_impl, pred_impl, lossID,
+         fused_pred_impl and fuse_impl. If compilation failed, return None.
+        """
+        if not nodes:
+            util.disp_error('Please place nodes and connect them'
+                            ' before compilation.')
+            return None
+        program = self.optimize(nodes)
+        init_impl = self.compile_init(program.nodes)
+        if not init_impl:
+            return None
+        call_impl, pred_impl, lossID = self.compile_call(program.chains)
+        if not (call_impl and pred_impl):
+            return None
+        fused_pred_impl = ''
+        fuse_impl = ''
+        if program.fused:
+            _, fused_pred_impl, _ = self.compile_call(program.fused_chains())
+            fuse_impl = self.compile_fuse(program.fused)
+        return (init_impl, call_impl, pred_impl, lossID, fused_pred_impl,
+                fuse_impl)
+
+    def optimize(self, nodes):
+        """
+        Run the optimisation passes over the node graph.
+        What each pass changed is stored in self.reports.
+        :param nodes: Dictionary mapping node ID to Node instance.
+        :return: compiler_pass.Program instance.
+        """
+        program = compiler_pass.Program(dict(nodes), self.build_chains(nodes))
+        self.reports = []
+        for optimization in self.passes:
+            program = optimization(program)
+            self.reports.append(optimization.report())
+        return program
+
+    def build_chains(self, nodes):
+        chains = []
+        for node in nodes.values():
+            if issubclass(type(node), Loss):
+                chains.append(self.compile_node(node, nodes, []))
+        if not chains:
+            raise NoLossError('Please plase loss function.')
+        return chains
+
     def compile_init(self, nodes):
         links = []
         for node in nodes.values():
@@ -47,17 +118,13 @@ class Compiler(object):
                     return ''
         return '\n'.join(links)
 
-    def compile_call(self, nodes):
+    def compile_call(self, chains):
         call_all_loss = []
         call_all_pred = []
         loss = None
-        for node in nodes.values():
-            if not issubclass(type(node), Loss):
-                continue
-
-            chains = self.compile_node(node, nodes, [])
-            loss = chains[0]
-            funcs = chains[1:]
+        for chain in chains:
+            loss = chain[0]
+            funcs = chain[1:]
             compiled_pred = []
             previous_ID = ''
             try:
@@ -69,8 +136,8 @@ class Compiler(object):
                     compiled_pred.append(pred_call)
                     previous_ID = func.get_name()
             except InputNotAvailable:
-                util.disp_error('Unset parameter was found in {0}'.format(node))
-                return ''
+                util.disp_error('Unset parameter was found in {0}'.format(loss))
+                return '', '', ''
 
             compiled_pred.append('        return ' + previous_ID)
             compiled_pred = '\n'.join(compiled_pred)
@@ -81,6 +148,14 @@ class Compiler(object):
             raise NoLossError('Please plase loss function.')
         return ', '.join(call_all_loss), ', '.join(call_all_pred), loss.get_name()
 
+    def compile_fuse(self, fused):
+        fuse_calls = []
+        for bn, link in fused.items():
+            fuse_calls.append('        fuse_batch_normalization(self.{0}, '
+                              'self.{1})'.format(link.get_name(),
+                                                 bn.get_name()))
+        return '\n'.join(fuse_calls)
+
     def compile_node(self, cursor, nodes, decode):
         decode.append(cursor)
         for connect in cursor.get_input_connections():
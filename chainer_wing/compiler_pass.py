@@ -0,0 +1,144 @@
+from collections import OrderedDict
+
+
+class Program(object):
+    """
+    Intermediate representation handed through the optimisation passes.
+    :param nodes: Dictionary mapping node ID to the nodes to be instantiated.
+    :param chains: List of node chains, each ordered from a loss node back
+     to the first node which receives the input.
+    """
+
+    def __init__(self, nodes, chains):
+        self.nodes = nodes
+        self.chains = chains
+        # BatchNormalization node -> Link node folded into it at inference.
+        self.fused = OrderedDict()
+
+    def fused_chains(self):
+        return [[node for node in chain if node not in self.fused]
+                for chain in self.chains]
+
+
+class CompilerPass(object):
+    """
+    Base class for the optimisation passes run by the Compiler.
+    Each pass records human readable descriptions of what it changed in
+     self.changes.
+    """
+
+    def __init__(self):
+        self.changes = []
+
+    def __call__(self, program):
+        self.changes = []
+        return self.run(program)
+
+    def run(self, program):
+        raise NotImplementedError
+
+    def report(self):
+        if not self.changes:
+            return '{}: nothing changed.'.format(self.__class__.__name__)
+        return '{}: {}'.format(self.__class__.__name__,
+                               ', '.join(self.changes))
+
+
+class DeadNodeElimination(CompilerPass):
+    """
+    Drops nodes which are not reachable from any loss, so that unconnected
+     links are not instantiated (and trained) in the generated net.
+    """
+
+    def run(self, program):
+        reachable = OrderedDict()
+        for chain in program.chains:
+            for node in chain:
+                reachable[node.ID] = node
+        for nodeID, node in program.nodes.items():
+            if nodeID not in reachable:
+                self.changes.append('dropped {}'.format(node.get_name()))
+        program.nodes = reachable
+        return program
+
+
+class FoldActivation(CompilerPass):
+    """
+    Folds consecutive elementwise activations whose composition is
+     computed by one of them alone. e.g. relu(relu(x)) -> relu(x).
+    """
+
+    def run(self, program):
+        for chain in program.chains:
+            i = 0
+            # chain[i] consumes the output of chain[i + 1].
+            while i < len(chain) - 1:
+                consumer, producer = chain[i], chain[i + 1]
+                kept = self.fold(producer, consumer)
+                if kept is None:
+                    i += 1
+                    continue
+                dropped = consumer if kept is producer else producer
+                chain.remove(dropped)
+                self.changes.append('folded {} into {}'.format(
+                    dropped.get_name(), kept.get_name()))
+                if dropped.ID in program.nodes and \
+                        not any(dropped in other for other in program.chains):
+                    del program.nodes[dropped.ID]
+        return program
+
+    @staticmethod
+    def fold(producer, consumer):
+        """
+        :return: The node which alone computes consumer(producer(x)).
+         If they cannot be folded, return None.
+        """
+        names = (type(producer).__name__, type(consumer).__name__)
+        if names == ('Relu', 'Relu'):
+            return consumer
+        elif names == ('Relu', 'ClippedRelu'):
+            return consumer
+        elif names == ('ClippedRelu', 'Relu'):
+            return producer
+        elif names == ('ClippedRelu', 'ClippedRelu'):
+            try:
+                if producer._z <= consumer._z:
+                    return producer
+                return consumer
+            except AttributeError:
+                return None
+        return None
+
+
+class FuseBatchNormalization(CompilerPass):
+    """
+    Marks BatchNormalization nodes directly following Linear or
+     Convolution2D, so that prediction_main folds their statistics into
+     the weight and bias of the preceding link and skips them.
+    """
+    fusable = ('Linear', 'Convolution2D')
+
+    def run(self, program):
+        for chain in program.chains:
+            for consumer, producer in zip(chain[:-1], chain[1:]):
+                if type(consumer).__name__ != 'BatchNormalization':
+                    continue
+                if type(producer).__name__ not in self.fusable:
+                    continue
+                if not self.is_only_consumer(producer):
+                    continue
+                program.fused[consumer] = producer
+                self.changes.append('fused {} into {}'.format(
+                    consumer.get_name(), producer.get_name()))
+        return program
+
+    @staticmethod
+    def is_only_consumer(node):
+        for out in node.outputs.values():
+            if len(node.graph.getConnectionsOfOutput(out)) != 1:
+                return False
+        return True
+
+
+def default_passes():
+    return [DeadNodeElimination(), FoldActivation(), FuseBatchNormalization()]
@@ -1,8 +1,11 @@
 import csv
 import glob
 from importlib import machinery
+import itertools
 import os
+import zipfile
 
+from chainer.dataset import concat_examples
 from chainer.datasets import tuple_dataset
 from chainer.datasets.image_dataset import _read_image_as_array
 import numpy
@@ -30,7 +33,7 @@ class DataManager(object):
         else:
             raise util.UnexpectedFileExtension()
 
-    def csv_to_ndarray(self, csv_file, is_supervised, shuffle):
+    def count_header(self, csv_file):
         exists_header = 0
         with open(csv_file, 'r') as f:
             reader = csv.reader(f)
@@ -38,14 +41,66 @@ class DataManager(object):
                 if isinstance(line[0], str):
                     exists_header = 1
                 break
+        return exists_header
+
+    def csv_to_ndarray(self, csv_file, is_supervised, shuffle):
         array = numpy.loadtxt(csv_file, dtype=numpy.float32,
-                              delimiter=',', skiprows=exists_header)
+                              delimiter=',',
+                              skiprows=self.count_header(csv_file))
         if shuffle:
             numpy.random.shuffle(array)
         if is_supervised:
             return array[:, :-1], numpy.atleast_2d(array[:, -1]).T
         return array, None
 
+    def get_input_shape(self):
+        """
+        Returns the shape of one training sample without loading whole data.
+        """
+        train_file = TrainParamServer()['TrainData']
+        if train_file.endswith('.csv'):
+            with open(train_file, 'r') as f:
+                first_line = next(csv.reader(f))
+            # The last column is label.
+            return len(first_line) - 1,
+        elif train_file.endswith('.npz'):
+            # Read only the header of x.npy in the archive.
+            with zipfile.ZipFile(train_file) as archive:
+                with archive.open('x.npy') as f:
+                    if numpy.lib.format.read_magic(f) == (1, 0):
+                        header = numpy.lib.format.read_array_header_1_0(f)
+                    else:
+                        header = numpy.lib.format.read_array_header_2_0(f)
+            return header[0][1:]
+        else:
+            raise util.UnexpectedFileExtension()
+
+    def get_data_head(self, n):
+        """
+        Returns the first n training samples and labels in the same format
+         as get_data_train, reading only those rows from a csv file.
+        Except for a data getter script, the samples are not minmax scaled,
+         since the statistics of the whole training data are not read. Use
+         them only where the values do not matter, e.g. for a dry run.
+        """
+        train_file = TrainParamServer()['TrainData']
+        if train_file.endswith('.csv'):
+            header = self.count_header(train_file)
+            with open(train_file, 'r') as f:
+                # loadtxt of numpy<1.16 has no max_rows.
+                rows = itertools.islice(f, header, header + n)
+                array = numpy.loadtxt(rows, dtype=numpy.float32,
+                                      delimiter=',', ndmin=2)
+            data, label = array[:, :-1], numpy.atleast_2d(array[:, -1]).T
+        elif train_file.endswith('.py'):
+            # Data getter script can only return whole data.
+            train_data, _ = self.get_data_train()
+            return concat_examples(train_data[:n])
+        else:
+            data, label = self.get_data_from_file(train_file, True)
+            data, label = data[:n], label[:n]
+        return data, label
+
     def pack_data(self, data, label):
         return tuple_dataset.TupleDataset(data, label)
 
@@ -191,6 +246,13 @@ class ImageDataManager(object):
 
         self.compute_mean(train_images)
 
+    def get_input_shape(self):
+        """
+        Returns the shape of one image after preprocessing.
+        """
+        return (3, TrainParamServer()['ResizeWidth'],
+                TrainParamServer()['ResizeHeight'])
+
     def compute_mean(self, images):
         print('compute mean image')
         sum_image = 0
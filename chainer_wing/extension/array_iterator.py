@@ -0,0 +1,157 @@
+import chainer
+import numpy
+
+# The code below is embedded in the generated net file by TrainerTemplate,
+# so that it should only refer to chainer and numpy.
+
+
+def get_arrays(dataset):
+    """
+    :return: Arrays of dataset if it is a TupleDataset of numpy arrays,
+     e.g. tabular data of DataManager, or a SubDataset of it. Otherwise,
+     None.
+    """
+    if isinstance(dataset, chainer.datasets.SubDataset):
+        arrays = get_arrays(dataset._dataset)
+        if arrays is None:
+            return None
+        if dataset._order is None:
+            indices = slice(dataset._start, dataset._finish)
+        else:
+            indices = dataset._order[dataset._start:dataset._finish]
+        return tuple(array[indices] for array in arrays)
+    if not isinstance(dataset, chainer.datasets.TupleDataset):
+        return None
+    arrays = dataset._datasets
+    if not all(isinstance(array, numpy.ndarray) for array in arrays):
+        return None
+    return arrays
+
+
+def array_converter(batch, device=None):
+    """
+    Converter for batches of ArrayIterator, which are already stacked.
+    """
+    return tuple(chainer.dataset.to_device(device, array) for array in batch)
+
+
+def make_iterator(dataset, batch_size, repeat=True, shuffle=True):
+    """
+    :return: ArrayIterator and array_converter if dataset is backed by
+     numpy arrays. Otherwise, SerialIterator and concat_examples.
+    """
+    if get_arrays(dataset) is None:
+        return (chainer.iterators.SerialIterator(dataset, batch_size,
+                                                 repeat=repeat,
+                                                 shuffle=shuffle),
+                chainer.dataset.concat_examples)
+    return (ArrayIterator(dataset, batch_size, repeat=repeat,
+                          shuffle=shuffle),
+            array_converter)
+
+
+class ArrayIterator(chainer.dataset.Iterator):
+    """
+    Iterator over the numpy arrays of a dataset (see get_arrays). A whole
+     batch is gathered by fancy indexing of each array with the permutation
+     of the epoch, instead of a tuple of each example as SerialIterator.
+    A batch is a tuple of arrays, so that array_converter should be used
+     instead of concat_examples.
+    Batches are written into two buffers by turns. A batch is overwritten
+     by the next but one batch, so that it should not be kept.
+    """
+
+    def __init__(self, dataset, batch_size, repeat=True, shuffle=True):
+        self.dataset = dataset
+        self.arrays = get_arrays(dataset)
+        if self.arrays is None:
+            raise ValueError('ArrayIterator requires a dataset of numpy '
+                             'arrays.')
+        self.batch_size = batch_size
+        self._repeat = repeat
+        self._shuffle = shuffle
+        self._buffers = [tuple(numpy.empty((batch_size,) + array.shape[1:],
+                                           dtype=array.dtype)
+                               for array in self.arrays)
+                         for _ in range(2)]
+        self._next_buffer = 0
+        self.reset()
+
+    def __next__(self):
+        if not self._repeat and self.epoch > 0:
+            raise StopIteration
+        self._previous_epoch_detail = self.epoch_detail
+        size = len(self.dataset)
+        i = self.current_position
+        i_end = i + self.batch_size
+        indices = self._order[i:i_end]
+        if i_end >= size:
+            self.epoch += 1
+            self.is_new_epoch = True
+            self.current_position = 0
+            if self._repeat:
+                self._order = self._new_order()
+                rest = i_end - size
+                while rest > 0:
+                    # Fill the batch with the next epochs. A batch larger
+                    # than the dataset takes whole passes of it.
+                    head = self._order[:rest]
+                    indices = numpy.concatenate((indices, head))
+                    rest -= len(head)
+                    if len(head) == size:
+                        self.epoch += 1
+                        self._order = self._new_order()
+                        self.current_position = 0
+                    else:
+                        self.current_position = len(head)
+        else:
+            self.is_new_epoch = False
+            self.current_position = i_end
+        return self._gather(indices)
+
+    next = __next__
+
+    def _gather(self, indices):
+        if len(indices) != self.batch_size:
+            # The last batch of an epoch without repeat.
+            return tuple(array[indices] for array in self.arrays)
+        buffers = self._buffers[self._next_buffer]
+        self._next_buffer = 1 - self._next_buffer
+        for array, buffer in zip(self.arrays, buffers):
+            numpy.take(array, indices, axis=0, out=buffer)
+        return buffers
+
+    def _new_order(self):
+        if self._shuffle:
+            return numpy.random.permutation(len(self.dataset))
+        return numpy.arange(len(self.dataset))
+
+    @property
+    def epoch_detail(self):
+        return self.epoch + self.current_position / len(self.dataset)
+
+    @property
+    def previous_epoch_detail(self):
+        if self._previous_epoch_detail < 0:
+            return None
+        return self._previous_epoch_detail
+
+    @property
+    def repeat(self):
+        return self._repeat
+
+    def reset(self):
+        self.current_position = 0
+        self.epoch = 0
+        self.is_new_epoch = False
+        self._previous_epoch_detail = -1.
+        self._order = self._new_order()
+
+    def serialize(self, serializer):
+        self.current_position = serializer('current_position',
+                                           self.current_position)
+        self.epoch = serializer('epoch', self.epoch)
+        self.is_new_epoch = serializer('is_new_epoch', self.is_new_epoch)
+        self._order = serializer('order', self._order)
+        self._previous_epoch_detail = serializer(
+            'previous_epoch_detail', self._previous_epoch_detail)
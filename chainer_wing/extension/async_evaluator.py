@@ -0,0 +1,182 @@
+from importlib import machinery
+import logging
+import multiprocessing
+import queue
+import traceback
+
+import chainer
+from chainer import serializers
+from chainer.training import extension
+from chainer.training import trigger as trigger_module
+import numpy
+
+from chainer_wing.extension.array_iterator import make_iterator
+from chainer_wing.extension.evaluation import ConfidenceEvaluator
+
+logger = logging.getLogger('Chainer-Wing')
+
+# Prefix of the reported results, which are not of the current iteration.
+REPORT_NAME = 'async_validation'
+
+
+def snapshot_params(model):
+    """
+    :return: Dictionary from the path of each parameter and persistent
+     value of model to a copy of it on CPU.
+    """
+    serializer = serializers.DictionarySerializer()
+    serializer.save(model)
+    # DictionarySerializer keeps references to the arrays on CPU, which
+    # are updated in place by the following iterations.
+    return {key: numpy.array(value, copy=True)
+            for key, value in serializer.target.items()}
+
+
+def evaluation_worker(net_file, net_name, test, batch_size, device,
+                      requests, results):
+    """
+    Evaluate the snapshots sent through requests until None is sent.
+    The results are sent as (iteration, means) or ('error', traceback).
+    """
+    try:
+        module = machinery.SourceFileLoader('net_eval', net_file).load_module()
+        model = getattr(module, net_name)()
+        if device >= 0:
+            chainer.cuda.get_device_from_id(device).use()
+            model.to_gpu()
+        test_iter, converter = make_iterator(test, batch_size, repeat=False,
+                                             shuffle=False)
+        evaluator = ConfidenceEvaluator(test_iter, model, converter=converter,
+                                        device=device)
+        # Set by Trainer.extend for a usual Evaluator.
+        evaluator.name = REPORT_NAME
+        while True:
+            request = requests.get()
+            if request is None:
+                return
+            iteration, params = request
+            serializers.NpzDeserializer(params).load(model)
+            means = {key: float(value) for key, value in evaluator().items()}
+            results.put((iteration, means))
+    except Exception:
+        results.put(('error', traceback.format_exc()))
+
+
+class AsyncEvaluator(extension.Extension):
+    """
+    Evaluate the model on the test data in a worker process while training
+     continues, instead of Evaluator which blocks training for a pass over
+     the test data.
+    At each trigger a snapshot of the weights is sent to the worker. If the
+     previous one is still evaluated, it is sent when the worker is free,
+     unless a later snapshot replaces it.
+    The result is reported when it is received, into the log of a later
+     iteration. So that it is not taken for the validation of that
+     iteration, it is reported as async_validation/main/* together with
+     async_validation/iteration and async_validation/epoch of the snapshot.
+    The results of the last snapshots are waited for at the end of training,
+     when nothing can be reported. It is logged and passed to callback with
+     the epoch of the snapshot, if callback is given.
+    The worker rebuilds the net from the compiled net file, and it runs on
+     CPU by default so that it does not compete for GPU memory.
+    """
+    trigger = 1, 'iteration'
+    priority = extension.PRIORITY_WRITER
+    name = 'AsyncEvaluator'
+
+    def __init__(self, test, net_file, net_name, batch_size,
+                 trigger=(1, 'epoch'), device=-1, callback=None,
+                 final_timeout=60):
+        self.test = test
+        self.net_file = net_file
+        self.net_name = net_name
+        self.batch_size = batch_size
+        self.device = device
+        self.callback = callback
+        self.final_timeout = final_timeout
+        self.last = None
+        self._epoch_details = {}  # Iteration of a snapshot -> epoch_detail
+        self._trigger = trigger_module.get_trigger(trigger)
+        self._pending = None  # (iteration, epoch_detail, params)
+        self._busy = False
+        self._process = None
+        self._requests = None
+        self._results = None
+
+    def initialize(self, trainer):
+        # Forking a process with Qt and CUDA is not safe.
+        context = multiprocessing.get_context('spawn')
+        self._requests = context.Queue()
+        self._results = context.Queue()
+        self._process = context.Process(
+            target=evaluation_worker,
+            args=(self.net_file, self.net_name, self.test, self.batch_size,
+                  self.device, self._requests, self._results),
+            daemon=True)
+        self._process.start()
+
+    def receive(self, timeout=None):
+        """
+        Take the result of the worker, waiting for it up to timeout seconds
+         if timeout is given.
+        :return: Observation of the result, or None if it has not arrived.
+        """
+        try:
+            if timeout is None:
+                iteration, means = self._results.get_nowait()
+            else:
+                iteration, means = self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        self._busy = False
+        if iteration == 'error':
+            raise RuntimeError('Evaluation worker failed.\n' + means)
+        observation = dict(means)
+        observation[REPORT_NAME + '/iteration'] = iteration
+        observation[REPORT_NAME + '/epoch'] = \
+            self._epoch_details.pop(iteration)
+        self.last = iteration, means
+        return observation
+
+    def __call__(self, trainer):
+        observation = self.receive()
+        if observation is not None:
+            chainer.report(observation)
+        if self._trigger(trainer):
+            updater = trainer.updater
+            model = updater.get_optimizer('main').target
+            # The latest snapshot replaces one waiting for the worker.
+            self._pending = (updater.iteration, updater.epoch_detail,
+                             snapshot_params(model))
+        self.send()
+
+    def send(self):
+        if self._pending is None or self._busy:
+            return
+        iteration, epoch_detail, params = self._pending
+        self._epoch_details[iteration] = epoch_detail
+        self._requests.put((iteration, params))
+        self._pending = None
+        self._busy = True
+
+    def finalize(self):
+        if self._process is None:
+            return
+        while self._busy:
+            observation = self.receive(self.final_timeout)
+            if observation is None:
+                logger.warning('Evaluation of iteration {} was not finished '
+                               'in {} seconds.'.format(
+                                   max(self._epoch_details),
+                                   self.final_timeout))
+                break
+            logger.info('Validation of iteration {}: {}'.format(*self.last))
+            if self.callback is not None:
+                self.callback(observation[REPORT_NAME + '/epoch'],
+                              observation)
+            self.send()
+        self._requests.put(None)
+        self._process.join(timeout=10)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process = None
@@ -1,23 +1,83 @@
 from __future__ import division
 
+from collections import deque
 import datetime
 import time
 
 from PyQt5.QtCore import Qt
+from PyQt5 import QtCore
 from PyQt5 import QtWidgets
 
+import chainer
 from chainer.training import extension
 try:
     from chainer.training.triggers import interval
 except ImportError:
     from chainer.training.triggers import interval_trigger as interval
 
+from chainer_wing.extension.iteration_stats import format_record
+
+
+def to_float(value):
+    if isinstance(value, chainer.Variable):
+        value = value.data
+    return float(chainer.cuda.to_cpu(value))
+
+
+class ProgressChannel(object):
+    """
+    Records of training progress pushed by the training loop and polled by
+     the GUI. A record is (iteration, epoch_detail, time, metrics), where
+     metrics maps each reported name to a float. Variables are not kept, so
+     that their computational graphs are freed with the iteration.
+    append and popleft of deque are atomic, so the channel may be pushed
+     from another thread without a lock. The oldest records are dropped
+     when the GUI does not poll.
+    """
+
+    def __init__(self, maxlen=1024):
+        self.records = deque(maxlen=maxlen)
+
+    def push(self, iteration, epoch, observation):
+        metrics = {}
+        for name, value in observation.items():
+            try:
+                metrics[name] = to_float(value)
+            except (TypeError, ValueError):
+                # Not a scalar.
+                pass
+        self.records.append((iteration, epoch, time.time(), metrics))
+
+    def poll(self):
+        """
+        :return: List of the records pushed since the last poll.
+        """
+        records = []
+        while True:
+            try:
+                records.append(self.records.popleft())
+            except IndexError:
+                return records
 
-class CWProgressBar(extension.Extension, QtWidgets.QDialog):
 
-    def __init__(self, epoch, update_interval=100, *args):
-        self._update_interval = update_interval
-        self._recent_timing = []
+class CWProgressBar(extension.Extension, QtWidgets.QDialog):
+    """
+    Training extension showing the progress.
+    Each iteration only pushes a record to the channel. The dialog polls
+     the channel with a timer and Qt events are processed at most once per
+     event_interval seconds.
+    :param poll_interval: Interval of updating the dialog in milliseconds.
+    :param event_interval: Interval of processing Qt events in seconds.
+    """
+
+    def __init__(self, epoch, poll_interval=100, event_interval=0.05,
+                 *args):
+        self.channel = ProgressChannel()
+        # IterationStats summarized in the dialog, set by TrainRunner.
+        self.iteration_stats = None
+        self.event_interval = event_interval
+        self._next_events = 0.
+        self._recent_timing = deque(maxlen=100)
         self.stop_trigger = None
         self.interval_trigger = interval.IntervalTrigger(epoch, 'epoch')
         self.epoch = epoch
@@ -28,6 +88,8 @@ class CWProgressBar(extension.Extension, QtWidgets.QDialog):
         main_layout = QtWidgets.QVBoxLayout()
         self.pbar = QtWidgets.QProgressBar()
         self.pbar.setGeometry(25, 40, 200, 25)
+        # Hundredths of epoch.
+        self.pbar.setRange(0, epoch * 100)
         main_layout.addWidget(self.pbar)
 
         self._stat_label = QtWidgets.QLabel('')
@@ -53,60 +115,65 @@ class CWProgressBar(extension.Extension, QtWidgets.QDialog):
                                 color: black;
                             }
         ''')
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(poll_interval)
         self.show()
         self.raise_()
 
     def __call__(self, trainer):
-
-        # initialize some attributes at the first call
-        training_length = self.epoch, 'epoch'
-
-        stat_template = (
-                '{0.iteration:10} iter, {0.epoch} epoch / %s %ss\n' %
-                training_length)
-
-        length, unit = training_length
-        iteration = trainer.updater.iteration
-        self.pbar.setRange(0, length)
-
-        # print the progress bar
-        if iteration % self._update_interval == 0:
-            epoch = trainer.updater.epoch_detail
-            recent_timing = self._recent_timing
-            now = time.time()
-
-            recent_timing.append((iteration, epoch, now))
-
-            self.pbar.setValue(epoch)
-
-            self._stat_label.setText(stat_template.format(trainer.updater))
-            # out.write(status)
-
-            old_t, old_e, old_sec = recent_timing[0]
-            span = now - old_sec
-            if span != 0:
-                speed_t = (iteration - old_t) / span
-                speed_e = (epoch - old_e) / span
-            else:
-                speed_t = float('inf')
-                speed_e = float('inf')
-
-            if unit == 'iteration':
-                estimated_time = (length - iteration) / speed_t
-            else:
-                estimated_time = (length - epoch) / speed_e
-            self._est_label.setText('{:10.5g} iters/sec. '
-                                    'Estimated time to finish: {}.\n'
-                                    .format(speed_t,
-                                    datetime.timedelta(seconds=estimated_time)))
-
-            if len(recent_timing) > 100:
-                del recent_timing[0]
-        QtWidgets.QApplication.instance().processEvents()
+        updater = trainer.updater
+        self.channel.push(updater.iteration, updater.epoch_detail,
+                          trainer.observation)
+        now = time.perf_counter()
+        if now >= self._next_events:
+            self._next_events = now + self.event_interval
+            QtWidgets.QApplication.instance().processEvents()
+
+    def poll(self):
+        records = self.channel.poll()
+        if not records:
+            return
+        iteration, epoch, now, metrics = records[-1]
+        recent_timing = self._recent_timing
+        recent_timing.append((iteration, epoch, now))
+
+        self.pbar.setValue(int(epoch * 100))
+        stat = '{:10} iter, {} epoch / {} epochs\n'.format(
+            iteration, int(epoch), self.epoch)
+        loss = metrics.get('main/loss')
+        if loss is not None:
+            stat += 'loss: {:.5g}\n'.format(loss)
+        if self.iteration_stats is not None and \
+                self.iteration_stats.last is not None:
+            stat += format_record(self.iteration_stats.last) + '\n'
+        self._stat_label.setText(stat)
+
+        old_t, old_e, old_sec = recent_timing[0]
+        span = now - old_sec
+        if span != 0:
+            speed_t = (iteration - old_t) / span
+            speed_e = (epoch - old_e) / span
+        else:
+            speed_t = float('inf')
+            speed_e = float('inf')
+        if speed_e:
+            estimated_time = (self.epoch - epoch) / speed_e
+        else:
+            estimated_time = float('inf')
+        try:
+            estimated_time = datetime.timedelta(seconds=estimated_time)
+        except OverflowError:
+            estimated_time = 'unknown'
+        self._est_label.setText('{:10.5g} iters/sec. '
+                                'Estimated time to finish: {}.\n'
+                                .format(speed_t, estimated_time))
 
     def finalize(self):
         # delete the progress bar and exit training
         self.stop_trigger = True
+        self.timer.stop()
+        self.poll()
         super(CWProgressBar, self).close()
 
     def get_stop_trigger(self, trainer):
@@ -0,0 +1,53 @@
+import math
+
+import chainer
+from chainer import reporter as reporter_module
+from chainer.training import extensions
+
+# Two-sided 95% quantile of the normal distribution.
+Z_95 = 1.96
+
+
+class ConfidenceEvaluator(extensions.Evaluator):
+    """
+    Evaluator which also reports the half width of the 95% confidence
+     interval of each metric as <key>.ci95, e.g. validation/main/loss.ci95.
+    Means of batches are regarded as samples, so that it is approximate
+     for few batches.
+    """
+
+    def __init__(self, iterator, target,
+                 converter=chainer.dataset.concat_examples, device=None,
+                 trigger=(1, 'epoch')):
+        super(ConfidenceEvaluator, self).__init__(iterator, target,
+                                                  converter=converter,
+                                                  device=device)
+        self.trigger = trigger
+
+    def evaluate(self):
+        iterator = self._iterators['main']
+        eval_func = self.eval_func or self._targets['main']
+        iterator.reset()
+        summary = reporter_module.DictSummary()
+        n_batches = 0
+        for batch in iterator:
+            observation = {}
+            with reporter_module.report_scope(observation):
+                in_arrays = self.converter(batch, self.device)
+                with chainer.no_backprop_mode():
+                    if isinstance(in_arrays, tuple):
+                        eval_func(*in_arrays)
+                    elif isinstance(in_arrays, dict):
+                        eval_func(**in_arrays)
+                    else:
+                        eval_func(in_arrays)
+            summary.add(observation)
+            n_batches += 1
+        result = {}
+        for key, value in summary.make_statistics().items():
+            if key.endswith('.std'):
+                result[key[:-len('.std')] + '.ci95'] = \
+                    Z_95 * value / math.sqrt(n_batches)
+            else:
+                result[key] = value
+        return result
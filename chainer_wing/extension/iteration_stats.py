@@ -0,0 +1,175 @@
+import json
+import sys
+import time
+
+from chainer.training import extension
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """
+    :return: Peak resident set size of this process in MiB. If it is not
+     available, None.
+    """
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    if sys.platform == 'darwin':
+        return maxrss / (1 << 20)
+    return maxrss / 1024
+
+
+class IterationStats(extension.Extension):
+    """
+    Trainer extension which measures the time of each iteration spent in
+     fetching and converting the batch, forward, backward and optimizer
+     update, to tell whether training is bound by data or by computation.
+    The updater is instrumented when training starts: next of the main
+     iterator, the loss function and update of the optimizer are wrapped
+     and a hook is added to the optimizer. Means per iteration, samples/sec
+     and peak RSS are appended to a JSON lines file at each interval.
+    If an update accumulates gradients of several mini batches, the times
+     of all of them are summed.
+    On GPU, the time of a phase includes the kernels of earlier phases it
+     waits for, because kernels run asynchronously.
+    """
+    trigger = 1, 'iteration'
+    priority = extension.PRIORITY_WRITER
+    name = 'IterationStats'
+
+    def __init__(self, out_file, interval=100):
+        self.out_file = out_file
+        self.interval = interval
+        self.last = None
+        self._reset()
+        self._reset_iteration()
+        self._next_start = None
+        self._forward_end = None
+        self._update_start = None
+        self._updater = None
+
+    def _reset(self):
+        self.iterations = 0
+        self.samples = 0
+        self.data_time = 0.
+        self.forward_time = 0.
+        self.backward_time = 0.
+        self.update_time = 0.
+        self._interval_start = time.perf_counter()
+
+    def _reset_iteration(self):
+        self._updated = False
+        self._batch_size = 0
+        self._data = 0.
+        self._forward = 0.
+        self._backward = 0.
+        self._update = 0.
+
+    def _end_backward(self, now):
+        # Backward of a mini batch ends when the next mini batch is fetched
+        # or the optimizer starts to update.
+        if self._forward_end is not None:
+            self._backward += now - self._forward_end
+            self._forward_end = None
+
+    def initialize(self, trainer):
+        with open(self.out_file, 'w'):
+            pass
+        updater = trainer.updater
+        self._updater = updater
+        iterator = updater.get_iterator('main')
+        optimizer = updater.get_optimizer('main')
+        next_batch = iterator.next
+
+        def timed_next():
+            self._next_start = time.perf_counter()
+            self._end_backward(self._next_start)
+            batch = next_batch()
+            # A list of examples, or a tuple of arrays of ArrayIterator.
+            self._batch_size += len(batch[0] if isinstance(batch, tuple)
+                                    else batch)
+            return batch
+        iterator.next = timed_next
+
+        loss_func = updater.loss_func or optimizer.target
+
+        def timed_loss_func(*args, **kwargs):
+            forward_start = time.perf_counter()
+            self._data += forward_start - self._next_start
+            loss = loss_func(*args, **kwargs)
+            self._forward_end = time.perf_counter()
+            self._forward += self._forward_end - forward_start
+            return loss
+        updater.loss_func = timed_loss_func
+
+        def backward_end(optimizer):
+            self._update_start = time.perf_counter()
+            self._end_backward(self._update_start)
+        # Hooks are called before the update by default, and the keyword
+        # timing of add_hook is missing in chainer<4.
+        optimizer.add_hook(backward_end, name='IterationStatsBackward')
+
+        update = optimizer.update
+
+        def timed_update(*args, **kwargs):
+            update(*args, **kwargs)
+            self._update += time.perf_counter() - self._update_start
+            self._updated = True
+        optimizer.update = timed_update
+        self._reset()
+
+    def __call__(self, trainer):
+        if not self._updated:
+            return
+        self.iterations += 1
+        self.samples += self._batch_size
+        self.data_time += self._data
+        self.forward_time += self._forward
+        self.backward_time += self._backward
+        self.update_time += self._update
+        self._reset_iteration()
+        if self.iterations >= self.interval:
+            self.write()
+
+    def finalize(self):
+        if self.iterations:
+            self.write()
+
+    def write(self):
+        elapsed = time.perf_counter() - self._interval_start
+        record = {
+            'data_ms': self.data_time * 1000 / self.iterations,
+            'forward_ms': self.forward_time * 1000 / self.iterations,
+            'backward_ms': self.backward_time * 1000 / self.iterations,
+            'update_ms': self.update_time * 1000 / self.iterations,
+            'samples_per_sec': self.samples / elapsed if elapsed else 0.,
+            'peak_rss_mb': peak_rss_mb(),
+            'iterations': self.iterations,
+            'iteration': self._updater.iteration,
+            'epoch': self._updater.epoch_detail}
+        with open(self.out_file, 'a') as fw:
+            fw.write(json.dumps(record) + '\n')
+        self.last = record
+        self._reset()
+
+
+def format_record(record):
+    """
+    :return: One line summary of a record of IterationStats.
+    """
+    total = (record['data_ms'] + record['forward_ms'] +
+             record['backward_ms'] + record['update_ms'])
+    text = ('data {:.0%}, forward {:.3g} ms, backward {:.3g} ms, '
+            'update {:.3g} ms, {:.4g} samples/sec'
+            .format(record['data_ms'] / total if total else 0.,
+                    record['forward_ms'], record['backward_ms'],
+                    record['update_ms'], record['samples_per_sec']))
+    if record['peak_rss_mb'] is not None:
+        text += ', peak RSS {:.0f} MiB'.format(record['peak_rss_mb'])
+    return text
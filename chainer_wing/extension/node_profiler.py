@@ -0,0 +1,254 @@
+from collections import OrderedDict
+import json
+import os
+import sys
+import time
+
+from chainer import function_hook
+from chainer.training import extension
+
+from chainer_wing import util
+
+
+def parse_net_file(net_file):
+    """
+    Map line numbers of the generated net file to the node names assigned
+     on those lines. e.g. 'l0 = self.l0(x)' -> 'l0'.
+    :param net_file: Path to the net file generated by Compiler.
+    :return: Dictionary mapping line number (1-origin) to node name.
+    """
+    line_to_node = {}
+    in_graph = False
+    with open(net_file, 'r') as fr:
+        for lineno, line in enumerate(fr, 1):
+            stripped = line.strip()
+            if stripped.startswith('def '):
+                in_graph = stripped.startswith(('def _predict(',
+                                                'def _predict_fused(',
+                                                'def __call__('))
+                continue
+            if not in_graph or ' = ' not in stripped:
+                continue
+            name = stripped.split(' ')[0].replace('self.', '')
+            if name not in ('y', 'accuracy'):
+                line_to_node[lineno] = name
+    return line_to_node
+
+
+class NodeProfileHook(function_hook.FunctionHook):
+    """
+    Function hook which attributes forward/backward time and output memory
+     of each chainer function to the node whose statement created it.
+    Statements are found by the line number of the generated net file in
+     the call stack, the same way as util.get_executed_last_node.
+    """
+    name = 'NodeProfileHook'
+
+    def __init__(self, net_file):
+        self.net_file = os.path.normpath(net_file)
+        self.line_to_node = parse_net_file(net_file)
+        self.forward_time = OrderedDict()
+        self.backward_time = OrderedDict()
+        self.output_bytes = OrderedDict()
+        self._node_of = {}
+        self._start = {}
+        self._functions = []
+
+    def find_node(self):
+        frame = sys._getframe(2)
+        while frame is not None:
+            if os.path.normpath(frame.f_code.co_filename) == self.net_file:
+                name = self.line_to_node.get(frame.f_lineno)
+                if name is not None:
+                    return name
+            frame = frame.f_back
+        return None
+
+    def forward_preprocess(self, function, in_data):
+        name = self.find_node()
+        if name is None:
+            return
+        self._node_of[id(function)] = name
+        self._functions.append(function)
+        self._start[id(function)] = time.perf_counter()
+
+    def forward_postprocess(self, function, in_data):
+        start = self._start.pop(id(function), None)
+        if start is None:
+            return
+        name = self._node_of[id(function)]
+        self.forward_time[name] = (self.forward_time.get(name, 0.) +
+                                   time.perf_counter() - start)
+
+    def backward_preprocess(self, function, in_data, out_grad):
+        if self._functions:
+            # Forward has finished and the graph is still alive.
+            self.collect_output_bytes()
+        if id(function) in self._node_of:
+            self._start[id(function)] = time.perf_counter()
+
+    def backward_postprocess(self, function, in_data, out_grad):
+        start = self._start.pop(id(function), None)
+        if start is None:
+            return
+        name = self._node_of.pop(id(function))
+        self.backward_time[name] = (self.backward_time.get(name, 0.) +
+                                    time.perf_counter() - start)
+
+    def collect_output_bytes(self):
+        """
+        Measure the outputs of the functions recorded since the last call.
+        Call this after forward, while the computational graph is alive.
+        """
+        for function in self._functions:
+            name = self._node_of[id(function)]
+            size = 0
+            for output_ref in function.outputs or ():
+                output = output_ref()
+                if output is not None and output.shape is not None:
+                    size += output.dtype.itemsize * util.prod(output.shape)
+            self.output_bytes[name] = self.output_bytes.get(name, 0) + size
+        self._functions = []
+
+    def records(self):
+        """
+        :return: Dictionary mapping node name to a dictionary of
+         'forward' and 'backward' seconds and 'output_bytes'.
+        """
+        names = list(self.forward_time.keys())
+        for name in list(self.backward_time.keys()) + \
+                list(self.output_bytes.keys()):
+            if name not in names:
+                names.append(name)
+        return OrderedDict(
+            (name, {'forward': self.forward_time.get(name, 0.),
+                    'backward': self.backward_time.get(name, 0.),
+                    'output_bytes': self.output_bytes.get(name, 0)})
+            for name in names)
+
+
+class NodeProfiler(extension.Extension):
+    """
+    Trainer extension which profiles each node over a sample of iterations
+     with NodeProfileHook and writes the per iteration mean to a json file.
+    The first iteration is skipped because it initializes parameters.
+    """
+    trigger = 1, 'iteration'
+    priority = extension.PRIORITY_WRITER
+    name = 'NodeProfiler'
+
+    def __init__(self, net_file, out_file, n_iterations):
+        self.hook = NodeProfileHook(net_file)
+        self.out_file = out_file
+        self.n_iterations = n_iterations
+        self.profiled = 0
+        self.active = False
+
+    def __call__(self, trainer):
+        if self.active:
+            self.profiled += 1
+            if self.profiled >= self.n_iterations:
+                self.stop()
+        elif self.profiled == 0:
+            self.hook.__enter__()
+            self.active = True
+
+    def finalize(self):
+        if self.active:
+            self.stop()
+
+    def stop(self):
+        self.hook.__exit__()
+        self.active = False
+        if self.profiled:
+            self.write()
+
+    def write(self):
+        nodes = OrderedDict()
+        for name, record in self.hook.records().items():
+            nodes[name] = {
+                'forward_ms': record['forward'] * 1000 / self.profiled,
+                'backward_ms': record['backward'] * 1000 / self.profiled,
+                'output_bytes': record['output_bytes'] // self.profiled}
+        with open(self.out_file, 'w') as fw:
+            json.dump({'iterations': self.profiled, 'nodes': nodes}, fw,
+                      indent=2)
+
+
+def format_records(records):
+    row = '{:<20}{:>14}{:>14}{:>16}'
+    lines = [row.format('node', 'forward ms', 'backward ms', 'output bytes')]
+    for name, record in records.items():
+        lines.append(row.format(name,
+                                '{:.3f}'.format(record['forward'] * 1000),
+                                '{:.3f}'.format(record['backward'] * 1000),
+                                '{:,}'.format(record['output_bytes'])))
+    return '\n'.join(lines)
+
+
+def array_bytes(array):
+    if array is None:
+        return 0
+    return array.dtype.itemsize * util.prod(array.shape)
+
+
+def link_memory(link):
+    """
+    Memory held by the parameters of link after an optimizer update.
+    :return: Tuple of bytes of parameters, gradients and optimizer state.
+    """
+    param_bytes = 0
+    grad_bytes = 0
+    state_bytes = 0
+    for param in link.params():
+        param_bytes += array_bytes(param.data)
+        grad_bytes += array_bytes(param.grad)
+        update_rule = getattr(param, 'update_rule', None)
+        state = getattr(update_rule, 'state', None) or {}
+        for value in state.values():
+            if hasattr(value, 'dtype'):
+                state_bytes += array_bytes(value)
+    return param_bytes, grad_bytes, state_bytes
+
+
+def memory_records(model, hook):
+    """
+    :param model: Model after forward, backward and an optimizer update.
+    :param hook: NodeProfileHook used in the forward.
+    :return: Dictionary mapping node name to a dictionary of 'output_bytes',
+     'param_bytes', 'grad_bytes' and 'optimizer_bytes'.
+    """
+    records = OrderedDict()
+    for name, record in hook.records().items():
+        link = getattr(model, name, None)
+        if hasattr(link, 'params'):
+            param_bytes, grad_bytes, state_bytes = link_memory(link)
+        else:
+            param_bytes, grad_bytes, state_bytes = 0, 0, 0
+        records[name] = {'output_bytes': record['output_bytes'],
+                         'param_bytes': param_bytes,
+                         'grad_bytes': grad_bytes,
+                         'optimizer_bytes': state_bytes}
+    return records
+
+
+def format_memory_records(records, batch_size, peak_rss_mb=None):
+    row = '{:<20}{:>12}{:>12}{:>12}{:>12}{:>12}'
+    lines = ['Batch size {}'.format(batch_size),
+             row.format('node', 'output', 'param', 'grad', 'optimizer',
+                        'total')]
+    keys = ('output_bytes', 'param_bytes', 'grad_bytes', 'optimizer_bytes')
+    totals = dict.fromkeys(keys, 0)
+    for name, record in records.items():
+        for key in keys:
+            totals[key] += record[key]
+        lines.append(row.format(
+            name, *[util.format_bytes(record[key]) for key in keys],
+            util.format_bytes(sum(record[key] for key in keys))))
+    lines.append(row.format(
+        'total', *[util.format_bytes(totals[key]) for key in keys],
+        util.format_bytes(sum(totals.values()))))
+    if peak_rss_mb is not None:
+        lines.append('Peak RSS of the process: {:.0f} MiB'.format(
+            peak_rss_mb))
+    return '\n'.join(lines)
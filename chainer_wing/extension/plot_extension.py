@@ -1,6 +1,40 @@
+from chainer import reporter
+from chainer.training import extension
+from chainer.training import trigger as trigger_module
 
 
 def cw_postprocess(f, a, summary):
     y_data = a.lines[0].get_ydata()
     if min(y_data) > 0 and max(y_data) > min(y_data) * 100:
         a.set_yscale('log')
+
+
+class LiveReport(extension.Extension):
+    """
+    Pass the mean of the observed values to callback at each trigger, for
+     charts drawn by the GUI instead of the figures of PlotReport.
+    callback is called with epoch_detail and a dictionary from key to the
+     mean as float.
+    """
+
+    def __init__(self, callback, keys=('main/loss', 'validation/main/loss',
+                                       'main/accuracy',
+                                       'validation/main/accuracy',
+                                       'async_validation/main/loss',
+                                       'async_validation/main/accuracy',
+                                       'async_validation/epoch'),
+                 trigger=(1, 'epoch')):
+        self.callback = callback
+        self.keys = keys
+        self._trigger = trigger_module.get_trigger(trigger)
+        self._summary = reporter.DictSummary()
+
+    def __call__(self, trainer):
+        observation = trainer.observation
+        self._summary.add({key: observation[key] for key in self.keys
+                           if key in observation})
+        if self._trigger(trainer):
+            means = {key: float(value) for key, value
+                     in self._summary.compute_mean().items()}
+            self._summary = reporter.DictSummary()
+            self.callback(trainer.updater.epoch_detail, means)
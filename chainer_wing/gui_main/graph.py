@@ -1,14 +1,17 @@
 from collections import OrderedDict
-
-from chainer.utils import type_check
+import json
+import logging
+import os
 
 from chainer_wing import compiler
-from chainer_wing import runner
-from chainer_wing.node import Node, MetaNode
+from chainer_wing.gui_main.history import node_state
+from chainer_wing.node import IDRegistry, Node, MetaNode
 from chainer_wing.node import NODECLASSES
 from chainer_wing import util
 from chainer_wing.subwindows.train_config import TrainParamServer
 
+logger = logging.getLogger('Chainer-Wing')
+
 
 def dummy(node_class):
     return node_class
@@ -22,11 +25,19 @@ class Graph(object):
 
     def __init__(self, painter=None):
         self.nodes = {}
+        self.id_registry = IDRegistry()
         self.runner = None
         # from self to other
         self.connections = {}
         # from other to self
         self.reverseConnections = {}
+        # Indices of the connections by pin ID.
+        # input pin ID -> Connection
+        self.inputConnection = {}
+        # output pin ID -> list of Connections
+        self.outputConnections = {}
+        # GraphHistory set by the painter.
+        self.history = None
 
         if painter:
             self.painter = painter
@@ -62,9 +73,18 @@ class Graph(object):
         except AttributeError:
             pass
         self.nodes[newNode.ID] = newNode
+        self.record(['spawn', newNode.ID, None])
 
         return newNode
 
+    def record(self, operation):
+        """
+        Record an operation for undo/redo. See GraphHistory.
+        """
+        if self.history is not None:
+            self.history.record(operation)
+            self.painter.invalidateBodies(operation)
+
     def pasteNode(self, node, pos):
         new_node = self.spawnNode(node.__class__, position=(pos.x(), pos.y()))
         node.clone_param(new_node)
@@ -123,16 +143,31 @@ class Graph(object):
                     inp,
                     str(inpNode)))
         conn = Connection(outNode, out, inpNode, inp)
-        for oldCon in self.reverseConnections[inpNode]:
-            if oldCon.input_name == inp:
-                self.reverseConnections[inpNode].remove(oldCon)
-                self.connections[oldCon.output_node].remove(oldCon)
-                break
+        oldCon = self.inputConnection.get(conn.input_id)
+        if oldCon is not None:
+            self.detach(oldCon)
         inpInfo.setConnected(True)
         self.connections[outNode].add(conn)
         self.reverseConnections[inpNode].add(conn)
+        self.inputConnection[conn.input_id] = conn
+        self.outputConnections.setdefault(conn.output_id, []).append(conn)
+        self.record(['connect', outNode.ID, out, inpNode.ID, inp])
         # self.update()
 
+    def detach(self, conn):
+        """
+        Remove conn from the connection sets and indices.
+        """
+        self.connections[conn.output_node].remove(conn)
+        self.reverseConnections[conn.input_node].remove(conn)
+        del self.inputConnection[conn.input_id]
+        output_conns = self.outputConnections[conn.output_id]
+        output_conns.remove(conn)
+        if not output_conns:
+            del self.outputConnections[conn.output_id]
+        self.record(['disconnect', conn.output_node.ID, conn.output_name,
+                     conn.input_node.ID, conn.input_name])
+
     def getConnectionsFrom(self, node):
         """
         Returns a list of all connections that involve 'node's' outputs.
@@ -156,11 +191,7 @@ class Graph(object):
         :param inp: InputInfo instance.
         :return: Connection instance. If there is no connection, return None.
         """
-        for con in self.getConnectionsTo(
-                self.nodes[inp.ID.partition(':')[0]]):
-            if con.input_name == inp.name:
-                return con
-        return None
+        return self.inputConnection.get(inp.ID)
 
     def getConnectionsOfOutput(self, output):
         """
@@ -168,15 +199,16 @@ class Graph(object):
         :param output: OutputInfo instance.
         :return: list of Connection instances.
         """
-        node = self.nodes[output.ID.partition(':')[0]]
-        return [con for con in self.getConnectionsFrom(node) if
-                con.output_name == output.name]
+        return list(self.outputConnections.get(output.ID, ()))
 
     def update(self):
         """
         Updates and repaints the painter instance.
         :return:
         """
+        if self.painter is dummy:
+            # Headless graph, e.g. in benchmarks.
+            return
         self.painter.repaint()
         self.painter.update()
 
@@ -185,8 +217,9 @@ class Graph(object):
         Compile the Graph as chainer code.
         :return: If compilation was succeeded, return True.
         """
+        graph_compiler = compiler.Compiler()
         try:
-            result = compiler.Compiler()(self.nodes)
+            result = graph_compiler(self.nodes)
         except util.ExistsInvalidParameter as error:
             util.disp_error('{0} is not set @{1}'.format(error.args[1][1:],
                                                          error.args[0]))
@@ -195,27 +228,159 @@ class Graph(object):
         except compiler.NoLossError:
             util.disp_error('Please place loss function.')
             return False
+        for report in graph_compiler.reports:
+            logger.info(report)
         return result
 
+    def export_inference(self, module_file):
+        """
+        Export the graph as a standalone inference module and its trained
+         weights. Weights are saved next to module_file.
+        :return: If export was succeeded, return True.
+        """
+        from chainer_wing import runner
+        weight_file = os.path.splitext(module_file)[0] + '.npz'
+        try:
+            if not compiler.Compiler().export(self.nodes, module_file,
+                                              os.path.basename(weight_file)):
+                return False
+            runner.export_weights(weight_file)
+        except util.ExistsInvalidParameter as error:
+            util.disp_error('{0} is not set @{1}'.format(error.args[1][1:],
+                                                         error.args[0]))
+            self.nodes[error.args[0]].runtime_error_happened = True
+            return False
+        except compiler.NoLossError:
+            util.disp_error('Please place loss function.')
+            return False
+        except SyntaxError:
+            util.disp_error('Generated chainer script ({}) is not valid.'
+                            .format(TrainParamServer().get_net_name()))
+            return False
+        except FileNotFoundError as error:
+            util.disp_error('{} is not found. Please train the model before '
+                            'export.'.format(error.filename))
+            return False
+        return True
+
+    def estimate(self):
+        """
+        Estimate output shape, parameter count, activation memory and FLOPs
+         of each node from the input data shape, without running chainer.
+        :return: Formatted estimation. If estimation failed, return ''.
+        """
+        from chainer_wing import shape_inference
+        from chainer_wing.data_fetch import DataManager
+        from chainer_wing.data_fetch import ImageDataManager
+        self.clear_error()
+        try:
+            if 'Image' in TrainParamServer()['Task']:
+                input_shape = ImageDataManager().get_input_shape()
+            else:
+                input_shape = DataManager().get_input_shape()
+        except KeyError:
+            util.disp_error('Please set training data before estimation.')
+            return ''
+        except FileNotFoundError as error:
+            util.disp_error('{} is not found.'.format(error.filename))
+            return ''
+        except util.UnexpectedFileExtension:
+            util.disp_error('Input shape can be estimated only from ".csv" '
+                            'or ".npz" data.')
+            return ''
+        try:
+            estimates = shape_inference.ShapeInference(
+                self.nodes, input_shape, TrainParamServer()['BatchSize'])()
+        except compiler.NoLossError:
+            util.disp_error('Please place loss function.')
+            return ''
+        except shape_inference.ShapeInferenceError as error:
+            error.args[0].runtime_error_happened = True
+            util.disp_error(error.args[1])
+            return ''
+        return shape_inference.format_estimates(estimates)
+
+    def dry_run(self):
+        """
+        Run forward and backward of compiled chainer code on a tiny batch.
+        :return: Formatted per node time and memory. If failed, return ''.
+        """
+        from chainer_wing.extension import node_profiler
+        self.clear_error()
+        if not self.init_runner():
+            return ''
+        records = self.execute(self.runner.dry_run)
+        if records is None:
+            return ''
+        return node_profiler.format_records(records)
+
+    def memory_profile(self):
+        """
+        Measure output, parameter, gradient and optimizer state memory of
+         each node on a batch of the training batch size. node.memory gets
+         the record of the node and 'share', the fraction of the total.
+        :return: Formatted per node memory. If failed, return ''.
+        """
+        from chainer_wing.extension import node_profiler
+        self.clear_error()
+        if not self.init_runner():
+            return ''
+        result = self.execute(self.runner.memory_profile)
+        if result is None:
+            return ''
+        records, batch_size, peak_rss_mb = result
+        total = sum(sum(record.values()) for record in records.values())
+        for node in self.nodes.values():
+            record = records.get(node.get_name())
+            if record is None:
+                node.memory = None
+                continue
+            node.memory = dict(record)
+            node.memory['share'] = sum(record.values()) / total if total \
+                else 0.
+        return node_profiler.format_memory_records(records, batch_size,
+                                                   peak_rss_mb)
+
     def run(self):
         """
         Run compiled chainer code.
+        A dry run on a tiny batch precedes training to find errors early.
         :return:
         """
+        from chainer_wing.extension import node_profiler
         self.clear_error()
         if TrainParamServer()['GPU'] and not util.check_cuda_available():
             util.disp_error('GPU option is selected but available cuda device'
                             'is not found.')
             return
 
+        if not self.init_runner():
+            return
+        records = self.execute(self.runner.dry_run)
+        if records is None:
+            return
+        logger.info('Dry run\n' + node_profiler.format_records(records))
+        report_widget = getattr(self.painter, 'reportWidget', None)
+        self.execute(lambda: self.runner.run(report_widget))
+
+    def init_runner(self):
+        from chainer_wing import runner
         try:
             self.runner = runner.TrainRunner()
         except SyntaxError:
             util.disp_error('Generated chainer script ({}) is not valid.'
                             .format(TrainParamServer().get_net_name()))
-            return
+            return False
+        return True
+
+    def execute(self, func):
+        """
+        Call func and display the error raised from it.
+        :return: Return value of func. If error was raised, return None.
+        """
+        from chainer.utils import type_check
         try:
-            self.runner.run()
+            return func()
         except util.AbnormalDataCode as error:
             util.disp_error(str(error.args[0][0]) + ' @' +
                             TrainParamServer()['TrainData'])
@@ -233,6 +398,32 @@ class Graph(object):
             last_nodeID = util.get_executed_last_node()
             util.disp_error(str(error.args) + ' @node: ' + last_nodeID)
             self.nodes[last_nodeID].runtime_error_happened = True
+        return None
+
+    def load_profile(self):
+        """
+        Attach the node profile written by training to each node.
+        node.profile gets 'forward_ms', 'backward_ms', 'output_bytes' and
+         'share', the fraction of the whole profiled time.
+        :return: If profile was found, return True.
+        """
+        for node in self.nodes.values():
+            node.profile = None
+        profile_file = TrainParamServer().get_profile_name()
+        if not os.path.isfile(profile_file):
+            return False
+        with open(profile_file, 'r') as fr:
+            records = json.load(fr)['nodes']
+        total = sum(record['forward_ms'] + record['backward_ms']
+                    for record in records.values())
+        for node in self.nodes.values():
+            record = records.get(node.get_name())
+            if record is None:
+                continue
+            node.profile = dict(record)
+            elapsed = record['forward_ms'] + record['backward_ms']
+            node.profile['share'] = elapsed / total if total else 0.
+        return True
 
     def clear_error(self):
         for node in self.nodes.values():
@@ -247,6 +438,83 @@ class Graph(object):
         """
         return [(node.ID, node.to_dict()) for node in self.nodes.values()]
 
+    def to_table(self):
+        """
+        Compact representation of the graph for the project file.
+        'nodes' is a list of [nodeID, class name, name, x, y, subgraph,
+         {input name: value}] and 'edges' is a list of [outputNodeID,
+         output name, inputNodeID, input name]. As load_from_dict, only
+         bool, int and float values are kept.
+        :return: Dictionary of 'nodes' and 'edges'.
+        """
+        nodes = []
+        for node in self.nodes.values():
+            values = {input_name: inp.value
+                      for input_name, inp in node.inputs.items()
+                      if isinstance(inp.value, (bool, int, float))}
+            nodes.append([node.ID, node.__class__.__name__, node.name,
+                          node.__pos__[0], node.__pos__[1], node.subgraph,
+                          values])
+        edges = [[conn.output_node.ID, conn.output_name,
+                  conn.input_node.ID, conn.input_name]
+                 for conn in self.inputConnection.values()]
+        return {'nodes': nodes, 'edges': edges}
+
+    def load_from_table(self, table):
+        """
+        Reconstruct the graph from the representation created by to_table.
+        Nodes and connections are constructed in bulk, without notifications
+         and history records, and the painter is updated once.
+        :return: Dictionary mapping the saved nodeIDs to the newly created
+        nodes's IDs.
+        """
+        idMap = {}
+        for nodeID, class_name, name, x, y, subgraph, values in \
+                table['nodes']:
+            try:
+                node_class = NODECLASSES[class_name]
+            except KeyError:
+                util.disp_error('Unknown Node class **{}**'
+                                .format(class_name))
+                continue
+            node = node_class(self, (x, y), nodeID)
+            node.name = name
+            node.subgraph = subgraph
+            for input_name, value in values.items():
+                node.inputs[input_name].set_value(value)
+            self.reverseConnections[node] = set()
+            self.connections[node] = set()
+            self.nodes[node.ID] = node
+            try:
+                self.painter.registerNode(node, silent=True)
+            except AttributeError:
+                pass
+            idMap[nodeID] = node.ID
+        for outputID, output_name, inputID, input_name in table['edges']:
+            try:
+                outNode = self.nodes[idMap[outputID]]
+                inpNode = self.nodes[idMap[inputID]]
+                inpInfo = inpNode.getInputInfo(input_name)
+                outInfo = outNode.getOutputInfo(output_name)
+            except KeyError:
+                print('Warning: Could not create connection '
+                      'due to missing node.')
+                continue
+            if not set(outInfo.var_type) & set(inpInfo.var_type):
+                print('Warning: Could not create connection '
+                      'due to type mismatch.')
+                continue
+            conn = Connection(outNode, output_name, inpNode, input_name)
+            if conn.input_id in self.inputConnection:
+                continue
+            inpInfo.setConnected(True)
+            self.connections[outNode].add(conn)
+            self.reverseConnections[inpNode].add(conn)
+            self.inputConnection[conn.input_id] = conn
+            self.outputConnections.setdefault(conn.output_id, []).append(conn)
+        self.update()
+        return idMap
+
     def killRunner(self):
         """
         Kill chainer execution thread.
@@ -255,11 +523,12 @@ class Graph(object):
         if self.runner is not None:
             self.runner.kill()
 
-    def load_from_dict(self, graph_state):
+    def load_from_dict(self, graph_state, silent=False):
         """
         Reconstruct a Graph instance from a JSON string representation
         created by the Graph.to_json() method.
         :param graph_state:
+        :param silent: Boolean. Suppresses notifications of spawned nodes.
         :return: Dictionary mapping the saved nodeIDs to the newly created
         nodes's IDs.
         """
@@ -269,7 +538,8 @@ class Graph(object):
                 restoredNode = self.spawnNode(NODECLASSES[nodeData['class']],
                                               position=nodeData['position'],
                                               id=id,
-                                              name=nodeData['name'])
+                                              name=nodeData['name'],
+                                              silent=silent)
             except KeyError:
                 util.disp_error('Unknown Node class **{}**'
                                     .format(nodeData['class']))
@@ -287,8 +557,9 @@ class Graph(object):
         for id, nodeData in graph_state:
             for input_name, outputID in nodeData['inputConnections'].items():
                 output_node, output_name = outputID.split(':O')
+                # Output node may be outside of graph_state and left as is.
+                output_node = idMap.get(output_node, output_node)
                 try:
-                    output_node = idMap[output_node]
                     self.connect(str(output_node), output_name, str(idMap[id]),
                                  input_name)
                 except KeyError:
@@ -325,27 +596,13 @@ class Graph(object):
         :param pinID: string representing a Pin instance's ID.
         :return:
         """
-        pinName, node = self.getNodeFromPinID(pinID)
-        thisConn = None
         if from_self:
-            connections = self.connections[node]
+            conns = self.outputConnections.get(pinID)
+            thisConn = conns[-1] if conns else None
         else:
-            connections = self.reverseConnections[node]
-        for conn in connections:
-            if from_self:
-                target_pin = conn.output_name
-            else:
-                target_pin = conn.input_name
-            if target_pin == pinName:
-                thisConn = conn
-                break
+            thisConn = self.inputConnection.get(pinID)
         if thisConn:
-            if from_self:
-                self.connections[node].remove(thisConn)
-                self.reverseConnections[conn.input_node].remove(thisConn)
-            else:
-                self.reverseConnections[node].remove(thisConn)
-                self.connections[conn.output_node].remove(thisConn)
+            self.detach(thisConn)
 
     def deleteNode(self, node):
         """
@@ -356,8 +613,15 @@ class Graph(object):
         for inp in node.inputs.values():
             self.removeConnection(inp.ID, from_self=False)
         for out in node.outputs.values():
-            self.removeConnection(out.ID, from_self=True)
+            # An output may be connected to several inputs. Undo connects
+            # them again in the reverse order of detaching.
+            for conn in reversed(self.getConnectionsOfOutput(out)):
+                self.detach(conn)
         del self.nodes[node.ID]
+        del self.connections[node]
+        del self.reverseConnections[node]
+        node.clear()
+        self.record(['delete', node.ID, node_state(node)])
 
     def correct_pos(self, pos):
         return self.painter.correct_pos(pos)
@@ -374,3 +638,5 @@ class Connection(object):
         self.output_name = output_name
         self.input_node = input_node
         self.input_name = input_name
+        self.output_id = output_node.getOutputID(output_name)
+        self.input_id = input_node.getInputID(input_name)
@@ -0,0 +1,153 @@
+from collections import deque
+
+from chainer_wing.node import NODECLASSES
+
+
+def node_state(node):
+    """
+    :return: Dictionary of the data necessary to respawn node without its
+     connections.
+    """
+    return {'class': node.__class__.__name__,
+            'name': node.name,
+            'position': node.__pos__,
+            'subgraph': node.subgraph,
+            'inputs': [(input_name, inp.value)
+                       for input_name, inp in node.inputs.items()]}
+
+
+def spawn_node(graph, nodeID, state):
+    node = graph.spawnNode(NODECLASSES[state['class']],
+                           position=state['position'], silent=True,
+                           id=nodeID, name=state['name'])
+    node.subgraph = state['subgraph']
+    for input_name, value in state['inputs']:
+        node.inputs[input_name].set_value(value)
+    return node
+
+
+class GraphHistory(object):
+    """
+    Undo/redo history of graph edits.
+    Graph and Painter2D record operations, which are lists beginning with
+     one of the following kinds.
+        ['spawn', nodeID, state]
+        ['delete', nodeID, state]
+        ['connect', outputNodeID, output_name, inputNodeID, input_name]
+        ['disconnect', outputNodeID, output_name, inputNodeID, input_name]
+        ['move', nodeID, old_position, new_position]
+        ['value', nodeID, input_name, old_value, new_value]
+        ['rename', nodeID, old_name, new_name]
+    Operations recorded until a gesture (click, drag, menu action) is
+     completed make one command. Undo applies the inverse of each operation
+     in reverse order in place, so it costs as much as the command itself.
+    :param max_depth: Number of commands kept. The oldest command is dropped.
+    """
+
+    def __init__(self, max_depth=500):
+        self.undo_stack = deque(maxlen=max_depth)
+        self.redo_stack = []
+        self.pending = []
+        self.recording = True
+
+    def reset(self):
+        """
+        Forget all commands.
+        """
+        self.undo_stack.clear()
+        self.redo_stack = []
+        self.pending = []
+
+    def record(self, operation):
+        if not self.recording:
+            return
+        if operation[0] == 'value' and self.pending:
+            # Typing a value records one operation.
+            last = self.pending[-1]
+            if last[:3] == operation[:3]:
+                last[4] = operation[4]
+                return
+        self.pending.append(operation)
+
+    def commit(self):
+        """
+        Make a command of the operations recorded since the last command.
+        :return: If any operation was recorded, return True.
+        """
+        if not self.pending:
+            return False
+        self.undo_stack.append(self.pending)
+        self.pending = []
+        self.redo_stack = []
+        return True
+
+    def undo(self, painter):
+        """
+        :return: If a command was undone, return True.
+        """
+        self.commit()
+        if not self.undo_stack:
+            return False
+        command = self.undo_stack.pop()
+        self.run(painter, reversed(command), undo=True)
+        self.redo_stack.append(command)
+        return True
+
+    def redo(self, painter):
+        """
+        :return: If a command was redone, return True.
+        """
+        if self.commit() or not self.redo_stack:
+            return False
+        command = self.redo_stack.pop()
+        self.run(painter, command, undo=False)
+        self.undo_stack.append(command)
+        return True
+
+    def run(self, painter, command, undo):
+        self.recording = False
+        try:
+            for operation in command:
+                getattr(self, 'apply_' + operation[0])(painter, operation,
+                                                       undo)
+                painter.invalidateBodies(operation)
+        finally:
+            self.recording = True
+
+    def apply_spawn(self, painter, operation, undo):
+        graph = painter.graph
+        if undo:
+            node = graph.nodes[operation[1]]
+            # Keep the state including edits made after spawning for redo.
+            operation[2] = node_state(node)
+            painter.clear_node(node)
+        else:
+            spawn_node(graph, operation[1], operation[2])
+
+    def apply_delete(self, painter, operation, undo):
+        self.apply_spawn(painter, operation, not undo)
+
+    def apply_connect(self, painter, operation, undo):
+        graph = painter.graph
+        _, outputNodeID, output_name, inputNodeID, input_name = operation
+        if undo:
+            graph.removeConnection('{}:I{}'.format(inputNodeID, input_name),
+                                   from_self=False)
+        else:
+            graph.connect(outputNodeID, output_name, inputNodeID, input_name)
+
+    def apply_disconnect(self, painter, operation, undo):
+        self.apply_connect(painter, operation, not undo)
+
+    def apply_move(self, painter, operation, undo):
+        node = painter.graph.nodes[operation[1]]
+        node.__pos__ = operation[2] if undo else operation[3]
+
+    def apply_value(self, painter, operation, undo):
+        node = painter.graph.nodes[operation[1]]
+        node.inputs[operation[2]].set_value(
+            operation[3] if undo else operation[4])
+
+    def apply_rename(self, painter, operation, undo):
+        node = painter.graph.nodes[operation[1]]
+        node.name = operation[2] if undo else operation[3]
@@ -1,7 +1,9 @@
 import argparse
 import logging
+import importlib
 import os
 import sys
+import threading
 
 from PyQt5 import QtWidgets
 
@@ -34,12 +36,29 @@ def initialize_painter():
 
 def startUI(app, painter):
     win = MainWindow(painter=painter)
-    win.setArgs(parse_argv())
     win.show()
+    preload_modules()
+    win.setArgs(parse_argv())
     logger.debug('Startup successful. Handing main thread control to Qt main loop.')
     sys.exit(app.exec_())
 
 
+def preload_modules(names=('chainer', 'chainer_wing.runner')):
+    """
+    Import heavy modules in background after the window is shown, so that
+     the first compile or training does not wait for them.
+    """
+    def preload():
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except ImportError as error:
+                logger.warning('Failed to preload {}: {}'.format(name, error))
+    thread = threading.Thread(target=preload, daemon=True)
+    thread.start()
+    return thread
+
+
 def parse_argv():
     parser = argparse.ArgumentParser()
     parser.add_argument('-i', action='store_true', required=False)
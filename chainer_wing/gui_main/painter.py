@@ -1,45 +1,53 @@
 import json
 import logging
+import math
 import os
 
-import chainer
-import numpy
 from PyQt5 import QtCore
 from PyQt5 import QtGui
 from PyQt5 import QtWidgets
 from PyQt5.QtCore import Qt
 
 from chainer_wing import util
+from chainer_wing.gui_main import project
+from chainer_wing.gui_main.history import GraphHistory
 from chainer_wing.gui_main.mainwindow import Ui_MainWindow
+from chainer_wing.gui_main.spatial_index import GridIndex
 from chainer_wing.subwindows.data_config import DataDialog
 from chainer_wing.subwindows.image_data_config import ImageDataDialog
 from chainer_wing.subwindows.settings import SettingsDialog
 from chainer_wing.subwindows.train_config import TrainDialog
 from chainer_wing.subwindows.train_config import TrainParamServer
-from chainer_wing.subwindows.prediction_widget import PredictionWindow
 
-logger = logging.getLogger('ChainerWing')
+logger = logging.getLogger('Chainer-Wing')
 
 PINSIZE = 8
 TEXTYOFFSET = 0
 
 
+def heat_color(share):
+    """
+    Node color for the fraction of profiled time spent in the node.
+    """
+    share = min(max(share, 0.), 1.)
+    return QtGui.QColor(int(55 + 200 * share), int(55 + 100 * share), 55)
+
+
 class Painter2D(QtWidgets.QWidget):
-    PINCOLORS = {str: QtGui.QColor(255, 190, 0),
-                 int: QtGui.QColor(0, 115, 130),
-                 float: QtGui.QColor(0, 200, 0),
-                 object: QtGui.QColor(190, 190, 190),
-                 bool: QtGui.QColor(190, 0, 0),
-                 chainer.Variable: QtGui.QColor(100, 0, 100),
-                 numpy.ndarray: QtGui.QColor(100, 0, 200), }
+    # Keyed by type name not to import chainer and numpy at startup.
+    PINCOLORS = {'str': QtGui.QColor(255, 190, 0),
+                 'int': QtGui.QColor(0, 115, 130),
+                 'float': QtGui.QColor(0, 200, 0),
+                 'object': QtGui.QColor(190, 190, 190),
+                 'bool': QtGui.QColor(190, 0, 0),
+                 'Variable': QtGui.QColor(100, 0, 100),
+                 'ndarray': QtGui.QColor(100, 0, 200), }
     nodes = []
     scale = 1.
     globalOffset = QtCore.QPoint(0, 0)
     drag = False
-    inputPinPositions = []
     clickedPin = None
     clickedNode = None
-    nodePoints = []
     downOverNode = False
 
     def __init__(self, parent=None):
@@ -51,8 +59,6 @@ class Painter2D(QtWidgets.QWidget):
         self.graph = None
         self.looseConnection = None
         self.reportWidget = None
-        self.pinPositions = {}
-        self.drawItems = []
         self.drawItemsOfNode = {}
         self.watchingItems = set()
         self.rightClickedNode = None
@@ -61,9 +67,25 @@ class Painter2D(QtWidgets.QWidget):
         self.selectFrame = None
         self.selectFrame_End = None
         self.groupSelection = []
+        self.moveStart = []
         self.copied_node = None
-        self.graph_stack = []  # For undo/redo
-        self.max_graph_stack = 20
+        self.scenePinPositions = {}
+        self.nodeIndex = GridIndex()
+        self.pinIndex = GridIndex()
+        self.viewTransform = QtGui.QTransform()
+        self.connectionPaths = {}
+        self.fontSizes = None
+        self.titleFont = QtGui.QFont()
+        self.itemFont = QtGui.QFont()
+        self.titleTexts = {}  # text -> QStaticText
+        self.history = GraphHistory()
+        # Repaints requested while dragging are coalesced into one per frame.
+        self.repaintTimer = QtCore.QTimer(self)
+        self.repaintTimer.setSingleShot(True)
+        screen = QtGui.QGuiApplication.primaryScreen()
+        refresh_rate = screen.refreshRate() if screen is not None else 60.
+        self.repaintTimer.setInterval(int(1000 / max(refresh_rate, 1.)))
+        self.repaintTimer.timeout.connect(self.update)
         self.reset()
 
     def reset(self):
@@ -71,8 +93,6 @@ class Painter2D(QtWidgets.QWidget):
         self.graph = None
         self.looseConnection = None
         self.reportWidget = None
-        self.pinPositions = {}
-        self.drawItems = []
         self.drawItemsOfNode = {}
         self.watchingItems = set()
         self.rightClickedNode = None
@@ -81,27 +101,64 @@ class Painter2D(QtWidgets.QWidget):
         self.selectFrame = None
         self.selectFrame_End = None
         self.groupSelection = []
+        self.moveStart = []
         self.copied_node = None
+        self.scenePinPositions = {}
+        self.nodeIndex = GridIndex()
+        self.pinIndex = GridIndex()
+        self.connectionPaths = {}
+        self.titleTexts = {}
+        self.nodeBodies = {}
+
+    def sceneAt(self, pos):
+        """
+        Map a position in the widget to the node coordinates.
+        """
+        return self.viewTransform.inverted()[0].map(QtCore.QPointF(pos))
 
-    def update_graph_stack(self):
+    def nodeAt(self, pos):
+        scene = self.sceneAt(pos)
+        for node in self.nodeIndex.query_point(scene.x(), scene.y()):
+            return node
+        return None
+
+    def pinAt(self, pos, tolerance, kind):
         """
-        This method should be called After graph manipulated.
+        :param kind: ':I' for input pins and ':O' for output pins.
+        :return: ID of the nearest pin within tolerance (in the node
+         coordinates) or None.
         """
-        if self.graph is None:
-            return
-        self.graph_stack.append(self.graph.to_dict())  # For undo/redo
-        if len(self.graph_stack) > self.max_graph_stack:
-            self.graph_stack.pop()
+        scene = self.sceneAt(pos)
+        return self.pinIndex.nearest(scene.x(), scene.y(), tolerance,
+                                     lambda pinID: kind in pinID)
 
-    def undo_graph(self):
+    def requestUpdate(self):
         """
-        Undo graph manipulation by graph_stack.
+        Schedule a repaint on the next frame.
         """
-        if not self.graph_stack:
-            return
-        self.clear_all_nodes()
-        self.graph_stack.pop(-1)
-        self.graph.load_from_dict(self.graph_stack[-1])
+        if not self.repaintTimer.isActive():
+            self.repaintTimer.start()
+
+    def commit_history(self):
+        """
+        This method should be called after a gesture manipulated the graph.
+        """
+        self.history.commit()
+
+    def reset_history(self):
+        self.history.reset()
+
+    def undo_graph(self):
+        if self.graph is not None and self.history.undo(self):
+            self.clickedNode = None
+            self.groupSelection = []
+            self.repaint()
+
+    def redo_graph(self):
+        if self.graph is not None and self.history.redo(self):
+            self.clickedNode = None
+            self.groupSelection = []
+            self.repaint()
 
     def relayInputEventsTo(self, drawItem):
         self.relayTo = drawItem
@@ -118,6 +175,7 @@ class Painter2D(QtWidgets.QWidget):
 
     def registerGraph(self, graph):
         self.graph = graph
+        graph.history = self.history
 
     def keyPressEvent(self, event):
         super(Painter2D, self).keyPressEvent(event)
@@ -134,87 +192,64 @@ class Painter2D(QtWidgets.QWidget):
         else:
             x = .9
         self.scale *= x
-        self.repaint()
-        self.update()
+        self.requestUpdate()
 
     def mousePressEvent(self, event):
+        if self.relayTo is not None:
+            # Text typed into a LineEdit is a gesture of its own.
+            self.commit_history()
         self.mouseDownPos = event.pos()
         if event.button() == Qt.RightButton:
-            self.rightClickedNode = None
-            for nodePoints in self.nodePoints:
-                x1 = nodePoints[0].x()
-                x2 = nodePoints[1].x()  # + x1
-                y1 = nodePoints[0].y()
-                y2 = nodePoints[1].y()  # + y1
-                xx = event.pos()
-                yy = xx.y()
-                xx = xx.x()
-                if x1 < xx < x2 and y1 < yy < y2:
-                    self.rightClickedNode = nodePoints[-1]
-                    break
+            self.rightClickedNode = self.nodeAt(event.pos())
             if not self.rightClickedNode:
                 self.drag = event.pos()
 
         if event.button() == Qt.LeftButton:
-            for drawItem in self.drawItems:
+            for drawItem in self.iterDrawItems():
                 if issubclass(type(drawItem), Selector) or issubclass(
                         type(drawItem), LineEdit):
                     if drawItem.collide(event.pos()):
                         break
 
-            for point, i in self.inputPinPositions:
-                if abs(event.pos().x() - point.x()) < PINSIZE * self.scale and abs(
-                            event.pos().y() - point.y()) < PINSIZE * self.scale:
-                    self.clickedPin = i
-                    if i[-8:] != 'in_array':
-                        self.clickedPin = None
-                        return
-                    self.graph.removeConnection(i, from_self=False)
-                    self.update()
-                    self.update_graph_stack()
+            i = self.pinAt(event.pos(), PINSIZE, ':I')
+            if i is not None:
+                self.clickedPin = i
+                if i[-8:] != 'in_array':
+                    self.clickedPin = None
                     return
+                self.graph.removeConnection(i, from_self=False)
+                self.update()
+                return
 
-            for point, i in self.outputPinPositions:
-                if abs(event.pos().x() - point.x()) < PINSIZE * self.scale and abs(
-                            event.pos().y() - point.y()) < PINSIZE * self.scale:
-                    self.clickedPin = i
-                    self.graph.removeConnection(i, from_self=True)
-                    self.update()
-                    self.update_graph_stack()
-                    return
+            i = self.pinAt(event.pos(), PINSIZE, ':O')
+            if i is not None:
+                self.clickedPin = i
+                self.graph.removeConnection(i, from_self=True)
+                self.update()
+                return
 
-            for nodePoints in self.nodePoints:
-                x1 = nodePoints[0].x()
-                x2 = nodePoints[1].x()  # + x1
-                y1 = nodePoints[0].y()
-                y2 = nodePoints[1].y()  # + y1
-                xx = event.pos()
-                yy = xx.y()
-                xx = xx.x()
-                if x1 < xx < x2 and y1 < yy < y2:
-                    self.clickedNode = nodePoints[-1]
-                    self.update()
-                    self.update_graph_stack()
-                    self.downOverNode = event.pos()
-                    return
+            node = self.nodeAt(event.pos())
+            if node is not None:
+                self.clickedNode = node
+                self.update()
+                self.downOverNode = event.pos()
+                # Nodes dragged by mouseMoveEvent and their start positions.
+                self.moveStart = [(moved, moved.__pos__) for moved in
+                                  self.groupSelection or [node]]
+                return
             self.groupSelection = []
             self.selectFrame = event.pos() + (event.pos() - self.center) * (
                 1 - self.scale) * 1 / self.scale
             self._selectFrame = event.pos()
 
     def getOutputPinAt(self, pos):
-        for point, pin in self.outputPinPositions:
-            if abs(pos.x() - point.x()) < 16 * self.scale and abs(
-                            pos.y() - point.y()) < 16 * self.scale:
-                return pin
+        return self.pinAt(pos, 16, ':O')
 
     def getInputPinAt(self, pos):
-        for point, pin in self.inputPinPositions:
-            if abs(pos.x() - point.x()) < 16 * self.scale and abs(
-                            pos.y() - point.y()) < 16 * self.scale:
-                if pin[-8:] != 'in_array':
-                    return None
-                return pin
+        pin = self.pinAt(pos, 16, ':I')
+        if pin is None or pin[-8:] != 'in_array':
+            return None
+        return pin
 
     def mouseReleaseEvent(self, event):
         super(Painter2D, self).mouseReleaseEvent(event)
@@ -238,13 +273,16 @@ class Painter2D(QtWidgets.QWidget):
                 try:
                     self.graph.connect(output_nodeID, output_name, input_nodeID,
                                        input_name)
-                    # self.update_graph_stack()
                 except TypeError:
                     util.disp_error('Cannot connect pins of different type')
             self.looseConnection = False
             self.clickedPin = None
         self.drag = False
         self.downOverNode = False
+        for node, position in self.moveStart:
+            if node.__pos__ != position:
+                self.graph.record(['move', node.ID, position, node.__pos__])
+        self.moveStart = []
 
         if self.selectFrame and self.selectFrame_End:
             x1, x2 = self._selectFrame.x(), self._selectFrame_End.x()
@@ -257,18 +295,21 @@ class Painter2D(QtWidgets.QWidget):
                                                        x2, y2)
         self.selectFrame = None
         self.selectFrame_End = None
+        self.commit_history()
         self.repaint()
-        self.update()
 
     def massNodeCollide(self, x, y, xx, yy):
+        """
+        :return: Nodes entirely inside of the rectangle in the widget.
+        """
+        start = self.sceneAt(QtCore.QPoint(x, y))
+        end = self.sceneAt(QtCore.QPoint(xx, yy))
+        x, y, xx, yy = start.x(), start.y(), end.x(), end.y()
         nodes = []
-        for nodePoints in self.nodePoints:
-            x1 = nodePoints[0].x()
-            x2 = nodePoints[1].x()  # + x1
-            y1 = nodePoints[0].y()
-            y2 = nodePoints[1].y()  # + y1
+        for node in self.nodeIndex.query_rect(x, y, xx, yy):
+            x1, y1, x2, y2 = self.nodeIndex.rects[node]
             if x < x1 < xx and y < y1 < yy and x < x2 < xx and y < y2 < yy:
-                nodes.append(nodePoints[-1])
+                nodes.append(node)
         return nodes
 
     def mouseMoveEvent(self, event):
@@ -279,8 +320,7 @@ class Painter2D(QtWidgets.QWidget):
         if self.drag:
             self.globalOffset += event.pos() - self.drag
             self.drag = event.pos()
-            self.update()
-            self.update_graph_stack()
+            self.requestUpdate()
         if self.downOverNode:
             if self.groupSelection:
                 for node in self.groupSelection:
@@ -289,8 +329,7 @@ class Painter2D(QtWidgets.QWidget):
                     newPos = oldPos + newPos
                     node.__pos__ = (newPos.x(), newPos.y())
                 self.downOverNode = event.pos()
-                self.update()
-                self.update_graph_stack()
+                self.requestUpdate()
             else:
                 node = self.clickedNode
                 newPos = (event.pos() - self.downOverNode) / self.scale
@@ -298,13 +337,11 @@ class Painter2D(QtWidgets.QWidget):
                 newPos = oldPos + newPos
                 node.__pos__ = (newPos.x(), newPos.y())
                 self.downOverNode = event.pos()
-                self.update()
-                self.update_graph_stack()
+                self.requestUpdate()
 
         else:
             self.drawLooseConnection(event.pos())
-            self.update()
-            self.update_graph_stack()
+            self.requestUpdate()
         if self.selectFrame:
             self.selectFrame_End = event.pos() + (event.pos() - self.center) * (
                 1 - self.scale) * 1 / self.scale
@@ -338,26 +375,26 @@ class Painter2D(QtWidgets.QWidget):
 
     def delete_node(self, node):
         self.clear_node(node)
+        self.commit_history()
         self.repaint()
-        self.update_graph_stack()
         # release clicked node for prevent double deleting.
         self.clickedNode = None
 
     def clear_node(self, node):
         self.graph.deleteNode(node)
         self.unregisterNode(node)
-        node.clear()
 
     def clear_all_nodes(self, repaint=True):
         while self.nodes:
             node = self.nodes[0]
             self.clear_node(node)
+        # Number the nodes of a new graph from 0 again.
+        self.graph.id_registry.clear()
         if repaint:
             self.repaint()
 
     def copy_node(self, node):
         self.copied_node = node
-        self.update_graph_stack()
 
     def paste_node(self, pos=None):
         if self.copied_node is None:
@@ -369,7 +406,7 @@ class Painter2D(QtWidgets.QWidget):
             pos -= self.center
             pos /= self.scale
         self.graph.pasteNode(self.copied_node, pos)
-        self.update_graph_stack()
+        self.commit_history()
         self.repaint()
 
     def correct_pos(self, pos):
@@ -378,6 +415,13 @@ class Painter2D(QtWidgets.QWidget):
         pos /= self.scale
         return pos
 
+    def set_input_from_text(self, node, input_name, text):
+        inp = node.inputs[input_name]
+        old_value = inp.value
+        inp.set_value_from_text(text)
+        self.graph.record(['value', node.ID, input_name, old_value,
+                           inp.value])
+
     def get_all_name(self):
         return [node.get_name() for node in self.nodes]
 
@@ -385,22 +429,17 @@ class Painter2D(QtWidgets.QWidget):
         text, ok = QtWidgets.QInputDialog.getText(self, 'Rename node',
                                                   'Enter new name:')
         if ok and text and text not in self.get_all_name():
+            self.graph.record(['rename', node.ID, node.name, text])
             node.name = text
+            self.commit_history()
             self.repaint()
-            self.update_graph_stack()
 
     def paintEvent(self, event):
-        self.inputPinPositions = []
-        self.outputPinPositions = []
-        self.nodePoints = []
         super(Painter2D, self).paintEvent(event)
         painter = QtGui.QPainter(self)
         painter.setRenderHint(QtGui.QPainter.HighQualityAntialiasing)
+        self.updateFonts()
         self.drawGrid(painter)
-        try:
-            self.drawConnections(painter)
-        except KeyError:
-            pass
 
         painter.translate(self.width() / 2. + self.globalOffset.x(),
                           self.height() / 2. + self.globalOffset.y())
@@ -408,109 +447,261 @@ class Painter2D(QtWidgets.QWidget):
                                     self.height() / 2. + self.globalOffset.y())
         painter.scale(self.scale, self.scale)
         painter.setRenderHint(QtGui.QPainter.HighQualityAntialiasing)
+        # Copy, because the painter is destroyed after this event.
+        transform = QtGui.QTransform(painter.transform())
+        self.viewTransform = transform
+        # Visible area in the node coordinates.
+        viewport = transform.inverted()[0].mapRect(QtCore.QRectF(self.rect()))
+
+        # All nodes are placed for connections and mouse events, but only
+        # visible nodes are drawn. Unmoved nodes keep their index entries.
+        node_width = self.settings.value('NodeWidth')
+        geometries = [(node, self.layoutNode(node, transform, node_width))
+                      for node in self.nodes]
+        try:
+            self.drawConnections(painter, viewport)
+        except KeyError:
+            pass
 
         lastDraws = []
-        halfPinSize = PINSIZE // 2
+        bodies = {}
+        for node, (x, y, w, h) in geometries:
+            bounds = QtCore.QRectF(x - PINSIZE, y - 20, w + 2 * PINSIZE,
+                                   h + 20 + PINSIZE)
+            if bounds.intersects(viewport):
+                self.paintNode(painter, node, x, y, w, h, lastDraws)
+                if node in self.nodeBodies:
+                    bodies[node] = self.nodeBodies[node]
+        # Bodies of the nodes out of sight are dropped to bound the memory.
+        self.nodeBodies = bodies
 
-        for node in self.nodes:
-            pen = QtGui.QPen()
-            pen.setWidth(2)
-            if node.runtime_error_happened:
-                painter.setBrush(QtGui.QColor(125, 45, 45))
-            elif hasattr(node, 'color'):
-                painter.setBrush(node.color())
+        for item in lastDraws:
+            item.draw(painter, last=True)
+
+        self.draw_selection(painter)
+
+    def layoutNode(self, node, transform, node_width):
+        """
+        Update the spatial indices, pin positions and input items of node.
+        :return: x, y, width and height of node.
+        """
+        x = node.__pos__[0]  # + self.globalOffset.x()
+        y = node.__pos__[1]  # + self.globalOffset.y()
+        w = node.__size__[0] * node_width
+        if len(node.__class__.__name__) > 10:
+            w += len(node.__class__.__name__) * 4
+        h = node.__size__[1] * (8 + PINSIZE) + 40
+        self.nodeIndex.move(node, (x, y, x + w, y + h))
+
+        drawOffset = 33
+        for drawItem in self.drawItemsOfNode[node]['inp']:
+            point = QtCore.QPoint(x, y + drawOffset + 4 + PINSIZE)
+            self.placePin(drawItem.data.ID, point)
+            drawOffset += (8 + PINSIZE)
+            drawItem.update(x, y + drawOffset + 8, w, h, transform)
+
+        for drawItem in self.drawItemsOfNode[node]['out']:
+            point = QtCore.QPoint(x + w - 4, y + drawOffset + 4 + PINSIZE)
+            self.placePin(drawItem.data.ID, point)
+            drawOffset += (8 + PINSIZE)
+            drawItem.update(x, y + drawOffset + 8, w, h, transform)
+        return x, y, w, h
+
+    def placePin(self, pinID, point):
+        self.scenePinPositions[pinID] = point
+        self.pinIndex.move(pinID, (point.x(), point.y(), point.x(), point.y()))
+
+    def updateFonts(self):
+        """
+        Build the fonts of node titles and items again only when their sizes
+         in the settings have changed. Laid out titles are dropped with them.
+        """
+        sizes = (self.settings.value('NodeTitleFontSize'),
+                 self.settings.value('FontSize'))
+        if sizes == self.fontSizes:
+            return
+        self.fontSizes = sizes
+        self.titleFont = QtGui.QFont('Helvetica', sizes[0])
+        self.itemFont = QtGui.QFont('Helvetica', sizes[1])
+        self.titleTexts = {}
+
+    def drawTitle(self, painter, x, y, w, text):
+        """
+        Draw text centered in the width w, with the layout and the metrics
+         of text cached per title font.
+        """
+        title = self.titleTexts.get(text)
+        if title is None:
+            title = QtGui.QStaticText(text)
+            title.setPerformanceHint(QtGui.QStaticText.AggressiveCaching)
+            title.prepare(font=self.titleFont)
+            self.titleTexts[text] = title
+        painter.drawStaticText(
+            QtCore.QPointF(x + (w - title.size().width()) / 2., y), title)
+
+    def nodeBrush(self, node):
+        if self.clickedNode == node or node in self.groupSelection:
+            return QtGui.QColor(75, 75, 75)
+        if node.runtime_error_happened:
+            return QtGui.QColor(125, 45, 45)
+        elif node.profile is not None:
+            return heat_color(node.profile['share'])
+        elif node.memory is not None:
+            return heat_color(node.memory['share'])
+        elif hasattr(node, 'color'):
+            return node.color()
+        return QtGui.QColor(55, 55, 55)
+
+    def nodeLabels(self, node):
+        """
+        :return: Texts shown above node, from the bottom.
+        """
+        labels = []
+        if node.profile is not None:
+            labels.append('F {:.2f} / B {:.2f} ms'.format(
+                node.profile['forward_ms'], node.profile['backward_ms']))
+        if node.memory is not None:
+            labels.append(util.format_bytes(
+                node.memory['output_bytes'] + node.memory['param_bytes'] +
+                node.memory['grad_bytes'] + node.memory['optimizer_bytes']))
+        return labels
+
+    def invalidateBodies(self, operation):
+        """
+        Drop the cached bodies of the nodes changed by a graph operation.
+        See GraphHistory for operations.
+        """
+        if operation[0] in ('connect', 'disconnect'):
+            nodeIDs = operation[1:4:2]
+        else:
+            nodeIDs = operation[1:2]
+        for nodeID in nodeIDs:
+            self.nodeBodies.pop(self.graph.nodes.get(nodeID), None)
+
+    def paintNode(self, painter, node, x, y, w, h, lastDraws):
+        self.drawBody(painter, node, x, y, w, h)
+        for drawItem in self.drawItemsOfNode[node]['inp']:
+            if self.graph.getConnectionOfInput(drawItem.data) is not None:
+                drawItem.draw(painter, as_label=drawItem.data.name)
             else:
-                painter.setBrush(QtGui.QColor(55, 55, 55))
-            if self.clickedNode == node or node in self.groupSelection:
-                painter.setBrush(QtGui.QColor(75, 75, 75))
-
-            font = QtGui.QFont('Helvetica', 12)
-            painter.setFont(font)
-            path = QtGui.QPainterPath()
-            x = node.__pos__[0]  # + self.globalOffset.x()
-            y = node.__pos__[1]  # + self.globalOffset.y()
-            w = node.__size__[0] * self.settings.value('NodeWidth')
-            if len(node.__class__.__name__) > 10:
-                w += len(node.__class__.__name__) * 4
-            h = node.__size__[1] * (8 + PINSIZE) + 40
-
-            path.addRoundedRect(x, y, w, h, 50, 5)
-            self.nodePoints.append((QtCore.QPoint(x, y) * painter.transform(),
-                                    QtCore.QPoint(x + w, y + h) * painter.transform(),
-                                    node))
-            painter.setPen(pen)
+                item = drawItem.draw(painter)
+                if item:
+                    lastDraws.append(item)
+        for drawItem in self.drawItemsOfNode[node]['out']:
+            drawItem.draw(painter)
 
-            painter.fillPath(path, QtGui.QColor(55, 55, 55))
-            painter.drawPath(path)
-            pen.setColor(QtGui.QColor(150, 150, 150))
-            painter.setFont(
-                QtGui.QFont('Helvetica', self.settings.value('NodeTitleFontSize')))
+    def drawBody(self, painter, node, x, y, w, h):
+        """
+        Draw the frame, titles, labels and pins of node from a pixmap.
+        The pixmap is kept until a graph operation changes node (see
+         invalidateBodies) or the scale, fonts, color or clicked pin differ.
+        Input fields, which change while typing, are drawn over it.
+        """
+        labels = self.nodeLabels(node)
+        brush = self.nodeBrush(node)
+        clickedPin = self.clickedPin
+        if not clickedPin or not clickedPin.startswith(node.ID + ':'):
+            clickedPin = None
+        top = y - 16 * len(labels) - 4
+        bounds = QtCore.QRectF(x - PINSIZE, top, w + 2 * PINSIZE,
+                               y + h + PINSIZE - top)
+        # The pixmap is drawn at a device pixel, and the fraction of the
+        # position, in eighths not to differ by rounding errors while
+        # panning, is rendered into it so that the body stays sharp.
+        origin = painter.transform().map(bounds.topLeft())
+        left, upper = math.floor(origin.x()), math.floor(origin.y())
+        offset = (round((origin.x() - left) * 8) / 8.,
+                  round((origin.y() - upper) * 8) / 8.)
+        ratio = self.devicePixelRatioF()
+        key = (self.scale, ratio, offset, self.fontSizes, w, h,
+               brush.rgba(), clickedPin, tuple(labels))
+        cached = self.nodeBodies.get(node)
+        if cached is None or cached[0] != key:
+            size = bounds.size() * self.scale
+            if max(size.width(), size.height()) * ratio > 4096:
+                # Zoomed in too much to cache.
+                self.paintBody(painter, node, x, y, w, h, labels, brush,
+                               clickedPin)
+                return
+            pixmap = QtGui.QPixmap(math.ceil(size.width() * ratio) + 2,
+                                   math.ceil(size.height() * ratio) + 2)
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+            pixmapPainter = QtGui.QPainter(pixmap)
+            pixmapPainter.setRenderHint(
+                QtGui.QPainter.HighQualityAntialiasing)
+            pixmapPainter.translate(*offset)
+            pixmapPainter.scale(self.scale, self.scale)
+            pixmapPainter.translate(-bounds.left(), -bounds.top())
+            self.paintBody(pixmapPainter, node, x, y, w, h, labels, brush,
+                           clickedPin)
+            pixmapPainter.end()
+            cached = (key, pixmap)
+            self.nodeBodies[node] = cached
+        painter.save()
+        painter.resetTransform()
+        painter.drawPixmap(left, upper, cached[1])
+        painter.restore()
+
+    def paintBody(self, painter, node, x, y, w, h, labels, brush, clickedPin):
+        halfPinSize = PINSIZE // 2
+        pen = QtGui.QPen()
+        pen.setWidth(2)
+        painter.setBrush(brush)
+
+        path = QtGui.QPainterPath()
+        path.addRoundedRect(x, y, w, h, 50, 5)
+        painter.setPen(pen)
+
+        painter.fillPath(path, QtGui.QColor(55, 55, 55))
+        painter.drawPath(path)
+        pen.setColor(QtGui.QColor(150, 150, 150))
+        painter.setFont(self.titleFont)
+        painter.setPen(pen)
+        self.drawTitle(painter, x, y + 3, w, node.__class__.__name__)
+        self.drawTitle(painter, x, y + 20, w, node.get_name())
+        label_y = y - 18
+        for label in labels:
+            painter.drawText(x, label_y, w, 16, Qt.AlignHCenter, label)
+            label_y -= 16
+        painter.setBrush(QtGui.QColor(40, 40, 40))
+        drawOffset = 33
+        for drawItem in self.drawItemsOfNode[node]['inp']:
+            inputPin = drawItem.data
+            try:
+                pen.setColor(Painter2D.PINCOLORS[
+                    inputPin.info.var_type[0].__name__])
+            except KeyError:
+                pen.setColor(QtGui.QColor(*inputPin.info.var_type[0].color))
+            pen.setWidth(2)
             painter.setPen(pen)
-            painter.drawText(x, y + 3, w, h, Qt.AlignHCenter,
-                             node.__class__.__name__)
-            painter.drawText(x, y + 20, w, h, Qt.AlignHCenter,
-                             node.get_name())
-            painter.setBrush(QtGui.QColor(40, 40, 40))
-            drawOffset = 33
-            for i, drawItem in enumerate(self.drawItemsOfNode[node]['inp']):
-                inputPin = drawItem.data
-                try:
-                    pen.setColor(Painter2D.PINCOLORS[inputPin.info.var_type[0]])
-                except KeyError:
-                    pen.setColor(QtGui.QColor(*inputPin.info.var_type[0].color))
-                pen.setWidth(2)
+            if inputPin.ID == clickedPin:
+                pen.setColor(Qt.red)
                 painter.setPen(pen)
-                if inputPin.ID == self.clickedPin:
-                    pen.setColor(Qt.red)
-                    painter.setPen(pen)
 
-                if inputPin.info.var_type[0] is chainer.Variable:
-                    painter.drawEllipse(x - halfPinSize,
-                                        y + drawOffset + PINSIZE, PINSIZE,
-                                        PINSIZE)
-                point = QtCore.QPoint(x, y + drawOffset + 4 + PINSIZE)
-                point *= painter.transform()
-                self.inputPinPositions.append((point, inputPin.ID))
-                drawOffset += (8 + PINSIZE)
-                drawItem.update(x, y + drawOffset + 8, w, h,
-                                painter.transform())
-                if self.graph.getConnectionOfInput(inputPin) is not None:
-                    text = inputPin.name
-                    drawItem.draw(painter, as_label=text)
-                else:
-                    item = drawItem.draw(painter)
-                    if item:
-                        lastDraws.append(item)
+            if inputPin.info.var_type[0].__name__ == 'Variable':
+                painter.drawEllipse(x - halfPinSize,
+                                    y + drawOffset + PINSIZE, PINSIZE,
+                                    PINSIZE)
+            drawOffset += (8 + PINSIZE)
 
-            for k, drawItem in enumerate(self.drawItemsOfNode[node]['out']):
-                outputPin = drawItem.data
-                try:
-                    pen.setColor(Painter2D.PINCOLORS[outputPin.info.var_type[0]])
-                except KeyError:
-                    pen.setColor(QtGui.QColor(*outputPin.info.var_type[0].color))
-                pen.setWidth(2)
+        for drawItem in self.drawItemsOfNode[node]['out']:
+            outputPin = drawItem.data
+            try:
+                pen.setColor(Painter2D.PINCOLORS[
+                    outputPin.info.var_type[0].__name__])
+            except KeyError:
+                pen.setColor(QtGui.QColor(*outputPin.info.var_type[0].color))
+            pen.setWidth(2)
+            painter.setPen(pen)
+            if outputPin.ID == clickedPin:
+                pen.setColor(Qt.red)
                 painter.setPen(pen)
-                if outputPin.ID == self.clickedPin:
-                    pen.setColor(Qt.red)
-                    painter.setPen(pen)
-                else:
-                    painter.drawEllipse(x + w - halfPinSize,
-                                        y + drawOffset + PINSIZE, PINSIZE,
-                                        PINSIZE)
-                    point = QtCore.QPoint(x + w - 4,
-                                   y + drawOffset + 4 + PINSIZE) * painter.transform()
-                drawOffset += (8 + PINSIZE)
-                self.outputPinPositions.append((point, outputPin.ID))
-                drawItem.update(x, y + drawOffset + 8, w, h,
-                                painter.transform())
-                drawItem.draw(painter)
-
-        self.pinPositions = {value[1]: value[0] for value in
-                             self.inputPinPositions + self.outputPinPositions}
-        for item in lastDraws:
-            item.draw(painter, last=True)
-
-        self.draw_selection(painter)
+            else:
+                painter.drawEllipse(x + w - halfPinSize,
+                                    y + drawOffset + PINSIZE, PINSIZE,
+                                    PINSIZE)
+            drawOffset += (8 + PINSIZE)
 
     def draw_selection(self, painter):
         if self.selectFrame and self.selectFrame_End:
@@ -526,70 +717,91 @@ class Painter2D(QtWidgets.QWidget):
             painter.translate(self.width() / 2. + self.globalOffset.x(),
                               self.height() / 2. + self.globalOffset.y())
 
-    def drawConnections(self, painter):
+    def drawConnections(self, painter, viewport):
+        """
+        Draw connections in the node coordinates.
+        Paths are cached while both ends of a connection stay in place.
+        """
         if not self.graph:
             print('No graph connected yet.')
             return
-        if not self.pinPositions:
+        if not self.scenePinPositions:
             return
 
         if self.looseConnection and self.clickedPin:
-            start = self.pinPositions[self.clickedPin]
+            start = self.scenePinPositions[self.clickedPin]
+            loose = painter.transform().inverted()[0].map(
+                QtCore.QPointF(self.looseConnection))
             if ':I' in self.clickedPin:
-                start, end = self.looseConnection, start
+                start, end = loose, start
             else:
-                end = self.looseConnection
+                end = loose
             self.drawBezier(start, end, Qt.white, painter)
 
+        paths = {}
         for output_node, connList in self.graph.connections.items():
             for info in connList:
                 outputID = output_node.getOutputID(info.output_name)
                 inputID = info.input_node.getInputID(info.input_name)
+                start = self.scenePinPositions[outputID]
+                end = self.scenePinPositions[inputID]
+                key = (start.x(), start.y(), end.x(), end.y())
+                path = self.connectionPaths.get(key)
+                if path is None:
+                    path = self.bezierPath(start, end)
+                paths[key] = path
+                if not path.controlPointRect().intersects(viewport):
+                    continue
                 var_type = output_node.getOutputInfo(info.output_name).var_type
-                start = self.pinPositions[outputID]
-                end = self.pinPositions[inputID]
                 try:
-                    color = Painter2D.PINCOLORS[var_type[0]]
+                    color = Painter2D.PINCOLORS[var_type[0].__name__]
                 except KeyError:
                     color = QtGui.QColor(*var_type[0].color)
-                rotate = None
-                self.drawBezier(start, end, color, painter, rotate)
+                self.setConnectionPen(color, painter)
+                painter.drawPath(path)
+        self.connectionPaths = paths
 
     def drawLooseConnection(self, position):
         self.looseConnection = position
 
-    def drawBezier(self, start, end, color, painter, rotate=None):
+    def setConnectionPen(self, color, painter):
         pen = QtGui.QPen()
         pen.setColor(color)
-        pen.setWidth(self.settings.value('ConnectionLineWidth') * self.scale)
+        pen.setWidth(self.settings.value('ConnectionLineWidth'))
         painter.setPen(pen)
+
+    def drawBezier(self, start, end, color, painter, rotate=None):
+        self.setConnectionPen(color, painter)
+        painter.drawPath(self.bezierPath(start, end, rotate))
+
+    def bezierPath(self, start, end, rotate=None):
         path = QtGui.QPainterPath()
         path.moveTo(start)
         diffx = abs((start.x() - end.x()) / 2.)
-        if diffx < 100 * self.scale:
-            diffx = 100 * self.scale
+        if diffx < 100:
+            diffx = 100
         if rotate == 'input':
             p21 = start.x() + diffx
             p22 = start.y()
             p31 = end.x()
-            p32 = end.y() - 100 * self.scale
+            p32 = end.y() - 100
         elif rotate == 'output':
             p21 = start.x()
-            p22 = start.y() + 100 * self.scale
+            p22 = start.y() + 100
             p31 = end.x() - diffx
             p32 = end.y()
         elif rotate == 'both':
             p21 = start.x()
-            p22 = start.y() + 100 * self.scale
+            p22 = start.y() + 100
             p31 = end.x()
-            p32 = end.y() - 100 * self.scale
+            p32 = end.y() - 100
         else:
             p21 = start.x() + diffx
             p22 = start.y()
             p31 = end.x() - diffx
             p32 = end.y()
         path.cubicTo(p21, p22, p31, p32, end.x(), end.y())
-        painter.drawPath(path)
+        return path
 
     def registerNode(self, node, silent=False):
         if not silent:
@@ -604,19 +816,29 @@ class Painter2D(QtWidgets.QWidget):
                 s = Selector(node, out, self)
             else:
                 s = OutputLabel(node, out, self)
-            self.drawItems.append(s)
             self.drawItemsOfNode[node]['out'].append(s)
         for inp in node.inputPins.values():
             if inp.info.select:
                 s = Selector(node, inp, self)
             else:
                 s = LineEdit(node, inp, self)
-            self.drawItems.append(s)
             self.drawItemsOfNode[node]['inp'].append(s)
 
     def unregisterNode(self, node):
         self.nodes.remove(node)
-        del self.drawItemsOfNode[node]
+        self.nodeBodies.pop(node, None)
+        drawItems = self.drawItemsOfNode.pop(node)
+        for drawItem in drawItems['inp'] + drawItems['out']:
+            self.scenePinPositions.pop(drawItem.data.ID, None)
+            self.pinIndex.remove(drawItem.data.ID)
+            self.watchingItems.discard(drawItem)
+            self.stopInputRelayingTo(drawItem)
+        self.nodeIndex.remove(node)
+
+    def iterDrawItems(self):
+        for drawItems in self.drawItemsOfNode.values():
+            for drawItem in drawItems['out'] + drawItems['inp']:
+                yield drawItem
 
     def drawGrid(self, painter):
         color = 105
@@ -668,10 +890,11 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.setWindowIcon(
             QtGui.QIcon(os.path.join(self.iconRoot, 'appIcon.png')))
 
+        self.init_graph = ''
         try:
             self.resize(self.settings.value("size", (900, 700)))
             self.move(self.settings.value("pos", QtCore.QPoint(50, 50)))
-            init_graph = self.settings.value("graph_file", '')
+            self.init_graph = self.settings.value("graph_file", '')
         except TypeError:
             pass
         self.setWindowTitle('ChainerWind')
@@ -691,6 +914,17 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.DrawArea.setLayout(l)
         self.drawer = painter
 
+        # Configuration and the last graph are loaded after the window is
+        # shown, because they import the node library.
+        self.configured = False
+        QtCore.QTimer.singleShot(0, self.init_config)
+
+    def init_config(self):
+        if self.configured:
+            return
+        self.configured = True
+        QtWidgets.QApplication.processEvents()
+
         # to reflect initial configuration
         SettingsDialog(self, settings=self.settings).close()
         TrainDialog(self, settings=self.settings).close()
@@ -702,13 +936,14 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         # Open Last Opened JSON if enable
         TrainParamServer()['ProjectName'] = 'New Project'
         try:
-            if init_graph:
-                self.load_graph(init_graph)
+            if self.init_graph:
+                self.load_graph(self.init_graph)
         except FileNotFoundError:
             pass
 
     def setArgs(self, args):
         if args.test:
+            self.init_config()
             logger.info('Performing test.')
             self.load_graph(override=args.test[0])
             self.compile_and_exe()
@@ -764,6 +999,27 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.compile_action.setIconVisibleInMenu(True)
         self.addAction(self.compile_action)
 
+        self.estimate_action = QtWidgets.QAction('Estimate model size', self)
+        self.estimate_action.setShortcut('Ctrl+E')
+        self.estimate_action.triggered.connect(self.estimate_model)
+        self.addAction(self.estimate_action)
+
+        self.export_action = QtWidgets.QAction('Export inference module',
+                                               self)
+        self.export_action.triggered.connect(self.export_inference)
+        self.addAction(self.export_action)
+
+        self.dry_run_action = QtWidgets.QAction('Dry run', self)
+        self.dry_run_action.setShortcut('Ctrl+Shift+K')
+        self.dry_run_action.triggered.connect(self.dry_run)
+        self.addAction(self.dry_run_action)
+
+        self.memory_profile_action = QtWidgets.QAction('Memory profile',
+                                                       self)
+        self.memory_profile_action.setShortcut('Ctrl+Shift+M')
+        self.memory_profile_action.triggered.connect(self.memory_profile)
+        self.addAction(self.memory_profile_action)
+
         self.exe_action = QtWidgets.QAction(
             QtGui.QIcon(os.path.join(self.iconRoot, 'step.png')), 'Run', self)
         self.exe_action.setShortcut('Ctrl+K')
@@ -795,6 +1051,12 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.undoAction.setIconVisibleInMenu(False)
         self.addAction(self.undoAction)
 
+        self.redoAction = QtWidgets.QAction('Redo', self)
+        self.redoAction.setShortcut('Ctrl+Shift+Z')
+        self.redoAction.triggered.connect(self.redoGraph)
+        self.redoAction.setIconVisibleInMenu(False)
+        self.addAction(self.redoAction)
+
         self.statusAction = QtWidgets.QAction('Status', self)
         # self.statusAction.setShortcut('Ctrl+R')
         self.statusAction.triggered.connect(self.updateStatus)
@@ -836,6 +1098,10 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         run_menu.addAction(self.compile_and_exe_action)
         run_menu.addAction(self.compile_action)
         run_menu.addAction(self.exe_action)
+        run_menu.addAction(self.estimate_action)
+        run_menu.addAction(self.dry_run_action)
+        run_menu.addAction(self.memory_profile_action)
+        run_menu.addAction(self.export_action)
 
         settingsMenu = self.menuBar.addMenu('&Settings')
         settingsMenu.addAction(self.train_configure_action)
@@ -890,6 +1156,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         TrainDialog(self, settings=self.settings).show()
 
     def open_prediction(self):
+        from chainer_wing.subwindows.prediction_widget import PredictionWindow
         PredictionWindow(self, settings=self.settings).show()
 
     def connect(self):
@@ -923,6 +1190,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
     def clear_all_nodes(self):
         self.drawer.clear_all_nodes()
+        self.drawer.commit_history()
 
     def copyNode(self):
         node = self.drawer.getSelectedNode()
@@ -935,15 +1203,54 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     def undoGraph(self):
         self.drawer.undo_graph()
 
+    def redoGraph(self):
+        self.drawer.redo_graph()
+
     def exe_runner(self):
         self.statusBar.showMessage('Run started.', 2000)
         self.drawer.graph.run()
-        self.BottomWidget.update_report()
+        self.drawer.graph.load_profile()
+        self.drawer.repaint()
 
     def compile_runner(self):
         self.statusBar.showMessage('Compile started.', 2000)
         return self.drawer.graph.compile()
 
+    def estimate_model(self):
+        summary = self.drawer.graph.estimate()
+        self.drawer.repaint()
+        if summary:
+            util.disp_message('<pre>' + summary + '</pre>',
+                              title='Model estimate')
+
+    def dry_run(self):
+        self.statusBar.showMessage('Dry run started.', 2000)
+        summary = self.drawer.graph.dry_run()
+        self.drawer.repaint()
+        if summary:
+            util.disp_message('<pre>' + summary + '</pre>',
+                              title='Dry run')
+
+    def memory_profile(self):
+        self.statusBar.showMessage('Memory profile started.', 2000)
+        summary = self.drawer.graph.memory_profile()
+        self.drawer.repaint()
+        if summary:
+            util.disp_message('<pre>' + summary + '</pre>',
+                              title='Memory profile')
+
+    def export_inference(self):
+        module_file, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, 'Export inference module',
+            os.path.join(TrainParamServer().get_work_dir(),
+                         TrainParamServer()['NetName'] + '_inference.py'),
+            filter='Python Files (*.py)')
+        if not module_file:
+            return
+        if self.drawer.graph.export_inference(module_file):
+            self.statusBar.showMessage('Exported to ' + module_file, 2000)
+        self.drawer.repaint()
+
     def compile_and_exe(self):
         if self.compile_runner():
             self.exe_runner()
@@ -962,22 +1269,19 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             return
         logger.debug('Attempting to load graph: {}'.format(file_name))
         self.drawer.clear_all_nodes()
-        with open(file_name, 'r') as fp:
-            try:
-                proj_dict = json.load(fp)
-            except json.decoder.JSONDecodeError:
-                util.disp_error(file_name + ' is corrupted.')
-                return
-            # proj_dict = json.load(fp, object_hook=util.nethook)
-            if 'graph' in proj_dict:
-                self.drawer.graph.load_from_dict(proj_dict['graph'])
-                self.statusBar.showMessage(
-                    'Graph loaded from {}.'.format(file_name), 2000)
-                logger.info('Successfully loaded graph: {}'.format(file_name))
-            if 'train' in proj_dict:
-                TrainParamServer().load_from_dict(proj_dict['train'])
+        try:
+            has_graph = project.load_project(file_name, self.drawer.graph)
+        except json.decoder.JSONDecodeError:
+            util.disp_error(file_name + ' is corrupted.')
+            return
+        if has_graph:
+            self.drawer.reset_history()
+            self.statusBar.showMessage(
+                'Graph loaded from {}.'.format(file_name), 2000)
+            logger.info('Successfully loaded graph: {}'.format(file_name))
         self.settings.setValue('graph_file', file_name)
         self.update_data_label()
+        self.BottomWidget.update_report()
         self.setupNodeLib()
         TrainParamServer()['ProjectName'] = file_name.split('/')[-1].replace('.json', '')
 
@@ -995,12 +1299,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         if not file_name.endswith('.json'):
             file_name += '.json'
         logger.debug('Attempting to save graph as {}'.format(file_name))
-        with open(file_name, 'w') as fp:
-            proj_dict = {'graph': self.drawer.graph.to_dict(),
-                         'train': TrainParamServer().to_dict()}
-            proj_dump = json.dumps(proj_dict, sort_keys=True, indent=4,
-                                   cls=util.NetJSONEncoder)
-            fp.write(proj_dump)
+        project.save_project(file_name, self.drawer.graph)
         self.statusBar.showMessage('Graph saved as {}.'.format(file_name), 2000)
         logger.info('Save graph as {}'.format(file_name))
 
@@ -1045,6 +1344,8 @@ class DrawItem(object):
         self.parent = parent
         self.data = data
         self.active = True
+        self.transform = QtGui.QTransform()
+        self._hit_box = None
 
     def deactivate(self):
         self.active = False
@@ -1058,14 +1359,34 @@ class DrawItem(object):
         self.y = y
         self.w = w - 10
         self.h = h
-        point = QtCore.QPoint(x + 12, y - 16) * transform
-        self._x = point.x()
-        self._y = point.y()
-        point = QtCore.QPoint(x + w - 24, y + h - 60) * transform
-        self._xx = point.x()
-        self._yy = point.y()
-
-        self._yy = self._y + PINSIZE
+        # Hit box in the widget coordinates is computed on demand,
+        # because most items are not clicked before the next paint.
+        self._hit_box = None
+
+    def hit_box(self):
+        if self._hit_box is None:
+            point = QtCore.QPoint(self.x + 12, self.y - 16) * self.transform
+            end = QtCore.QPoint(self.x + self.w + 10 - 24,
+                                self.y + self.h - 60) * self.transform
+            self._hit_box = (point.x(), point.y(), end.x(),
+                             point.y() + PINSIZE)
+        return self._hit_box
+
+    @property
+    def _x(self):
+        return self.hit_box()[0]
+
+    @property
+    def _y(self):
+        return self.hit_box()[1]
+
+    @property
+    def _xx(self):
+        return self.hit_box()[2]
+
+    @property
+    def _yy(self):
+        return self.hit_box()[3]
 
     def draw(self, painter, as_label=''):
         alignment = self.__class__.alignment
@@ -1081,8 +1402,7 @@ class DrawItem(object):
                          alignment, text)
 
     def set_font(self, painter):
-        painter.setFont(
-            QtGui.QFont('Helvetica', self.settings.value('FontSize')))
+        painter.setFont(self.painter.itemFont)
 
     def run(self):
         pass
@@ -1131,7 +1451,8 @@ class Selector(DrawItem):
 
     def watchDown(self, pos):
         self.select = str(self.items[self.highlight - 1])
-        self.parent.inputs[self.data.name].set_value_from_text(self.select)
+        self.painter.set_input_from_text(self.parent, self.data.name,
+                                         self.select)
 
     def collide(self, pos):
         if self._x < pos.x() < self._xx + 16 and self._y < pos.y() < self._yy:
@@ -1282,7 +1603,8 @@ class LineEdit(DrawItem):
         else:
             self.text += self._sanitize_string(event.text())
         self.painter.update()
-        self.parent.inputs[self.data.name].set_value_from_text(self.text)
+        self.painter.set_input_from_text(self.parent, self.data.name,
+                                         self.text)
 
     def _sanitize_string(self, string):
         string = string.strip('\r\n')
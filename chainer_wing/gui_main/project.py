@@ -0,0 +1,58 @@
+import gc
+import json
+import os
+
+from chainer_wing import util
+from chainer_wing.subwindows.train_config import TrainParamServer
+
+PROJECT_VERSION = 2
+
+
+def dump_project(graph):
+    """
+    :return: Minified JSON of the graph table and train parameters.
+    """
+    proj_dict = {'version': PROJECT_VERSION,
+                 'graph': graph.to_table(),
+                 'train': TrainParamServer().to_dict()}
+    return json.dumps(proj_dict, separators=(',', ':'),
+                      cls=util.NetJSONEncoder)
+
+
+def save_project(file_name, graph):
+    """
+    Write the project file. The file is replaced atomically, so that an
+     error while saving does not break the existing project.
+    """
+    tmp_file = file_name + '.tmp'
+    with open(tmp_file, 'w') as fw:
+        fw.write(dump_project(graph))
+    os.replace(tmp_file, file_name)
+
+
+def load_project(file_name, graph):
+    """
+    Load the project file into graph and TrainParamServer. Both the compact
+     format and the indented format of Graph.to_dict are accepted.
+    :return: If the file had a graph, return True.
+    :raise json.decoder.JSONDecodeError: If the file is corrupted.
+    """
+    with open(file_name, 'r') as fr:
+        proj_dict = json.load(fr)
+    has_graph = 'graph' in proj_dict
+    if has_graph:
+        # Constructing many nodes triggers the cyclic garbage collector
+        # repeatedly, though nothing is garbage while loading.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            if isinstance(proj_dict['graph'], dict):
+                graph.load_from_table(proj_dict['graph'])
+            else:
+                graph.load_from_dict(proj_dict['graph'], silent=True)
+        finally:
+            if gc_enabled:
+                gc.enable()
+    if 'train' in proj_dict:
+        TrainParamServer().load_from_dict(proj_dict['train'])
+    return has_graph
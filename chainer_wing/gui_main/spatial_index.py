@@ -0,0 +1,106 @@
+from collections import defaultdict
+import math
+
+
+class GridIndex(object):
+    """
+    Uniform grid of rectangles for hit testing in the scene coordinates.
+    Each key is registered in every cell its rectangle overlaps, so that
+     point and rectangle queries only look at the keys near them.
+    :param cell_size: Width and height of a cell.
+    """
+
+    def __init__(self, cell_size=200):
+        self.cell_size = cell_size
+        self.cells = defaultdict(set)
+        self.rects = {}
+
+    def __contains__(self, key):
+        return key in self.rects
+
+    def __len__(self):
+        return len(self.rects)
+
+    def clear(self):
+        self.cells.clear()
+        self.rects.clear()
+
+    def cell_range(self, x1, y1, x2, y2):
+        size = self.cell_size
+        for i in range(int(math.floor(x1 / size)),
+                       int(math.floor(x2 / size)) + 1):
+            for j in range(int(math.floor(y1 / size)),
+                           int(math.floor(y2 / size)) + 1):
+                yield i, j
+
+    def insert(self, key, rect):
+        """
+        :param rect: Tuple of x1, y1, x2 and y2 (x1 <= x2, y1 <= y2).
+        """
+        self.rects[key] = rect
+        for cell in self.cell_range(*rect):
+            self.cells[cell].add(key)
+
+    def remove(self, key):
+        rect = self.rects.pop(key, None)
+        if rect is None:
+            return
+        for cell in self.cell_range(*rect):
+            keys = self.cells[cell]
+            keys.discard(key)
+            if not keys:
+                del self.cells[cell]
+
+    def move(self, key, rect):
+        """
+        Insert key or update its rectangle. Cheap if nothing has changed.
+        """
+        if self.rects.get(key) == rect:
+            return
+        self.remove(key)
+        self.insert(key, rect)
+
+    def query_point(self, x, y):
+        """
+        :return: Keys whose rectangle strictly contains (x, y).
+        """
+        size = self.cell_size
+        cell = int(math.floor(x / size)), int(math.floor(y / size))
+        found = []
+        for key in self.cells.get(cell, ()):
+            x1, y1, x2, y2 = self.rects[key]
+            if x1 < x < x2 and y1 < y < y2:
+                found.append(key)
+        return found
+
+    def query_rect(self, x1, y1, x2, y2):
+        """
+        :return: Set of keys whose rectangle overlaps the given rectangle.
+        """
+        found = set()
+        for cell in self.cell_range(x1, y1, x2, y2):
+            found.update(self.cells.get(cell, ()))
+        return {key for key in found
+                if self.rects[key][0] <= x2 and x1 <= self.rects[key][2] and
+                self.rects[key][1] <= y2 and y1 <= self.rects[key][3]}
+
+    def nearest(self, x, y, tolerance, accept=None):
+        """
+        :return: The key nearest to (x, y) whose rectangle is within
+         tolerance on both axes, or None.
+        """
+        best = None
+        best_distance = None
+        for key in self.query_rect(x - tolerance, y - tolerance,
+                                   x + tolerance, y + tolerance):
+            if accept is not None and not accept(key):
+                continue
+            x1, y1, x2, y2 = self.rects[key]
+            dx = max(x1 - x, 0, x - x2)
+            dy = max(y1 - y, 0, y - y2)
+            if dx >= tolerance or dy >= tolerance:
+                continue
+            distance = dx * dx + dy * dy
+            if best is None or distance < best_distance:
+                best, best_distance = key, distance
+        return best
@@ -6,7 +6,22 @@ from PyQt5.QtGui import QColor
 
 from chainer_wing import util
 
-NODECLASSES = {}
+
+class NodeClasses(dict):
+    """
+    Dictionary of Node classes by name.
+    A class of the node library which is not loaded yet is loaded by
+     loader on first access. See node_lib.
+    """
+    loader = None
+
+    def __missing__(self, name):
+        if self.loader is not None and self.loader(name):
+            return self[name]
+        raise KeyError(name)
+
+
+NODECLASSES = NodeClasses()
 
 
 class InputNotAvailable(Exception):
@@ -64,6 +79,13 @@ class Info(object):
     def setOwner(self, owner):
         self.owner = owner
 
+    def __copy__(self):
+        # Same as copy.copy, without its generic reduce protocol. Called for
+        # every pin of every spawned node.
+        info = self.__class__.__new__(self.__class__)
+        info.__dict__.update(self.__dict__)
+        return info
+
     def convert_var_type(self, value):
         if None in self.var_type and value == 'None':
             return None
@@ -218,9 +240,51 @@ class MetaNode(type):
 
         for tag in MetaNode.tags:
             result._addTag(tag)
+        # Filled by Node.chainer_defaults on first use. Not inherited,
+        # because register_chainer_impl may be overridden.
+        result.__chainer_defaults__ = None
         return result
 
 
+class IDRegistry(object):
+    """
+    Node IDs used in a Graph.
+    A counter for each ID prefix remembers where to search a free ID, so
+     that spawning n nodes takes O(n) time.
+    """
+
+    def __init__(self):
+        self.ids = set()
+        self.counters = {}
+
+    def __contains__(self, nodeID):
+        return nodeID in self.ids
+
+    def register(self, id_from_cnt, id_proposal=None):
+        """
+        :param id_from_cnt: Node.id_from_cnt of the node to register.
+        :param id_proposal: ID to use if not registered yet.
+        :return: Registered ID.
+        """
+        if id_proposal is None or id_proposal in self.ids:
+            prefix = id_from_cnt(0)
+            cnt = self.counters.get(prefix, 0)
+            id_proposal = id_from_cnt(cnt)
+            while id_proposal in self.ids:
+                cnt += 1
+                id_proposal = id_from_cnt(cnt)
+            self.counters[prefix] = cnt + 1
+        self.ids.add(id_proposal)
+        return id_proposal
+
+    def release(self, nodeID):
+        self.ids.discard(nodeID)
+
+    def clear(self):
+        self.ids.clear()
+        self.counters.clear()
+
+
 @abstractNode
 class Node(object, metaclass=MetaNode):
     """
@@ -236,7 +300,6 @@ class Node(object, metaclass=MetaNode):
     An 'InputNotAvailable' Exception is raised is the input is not set yet.
     """
     Tag('Node')
-    registered_id = []
     is_image_node = False
 
     def __init__(self, graph, position, id_proposal=None):
@@ -249,19 +312,13 @@ class Node(object, metaclass=MetaNode):
         self.inputPins = OrderedDict()
         self.outputPins = OrderedDict()
         self.runtime_error_happened = False
+        # Per iteration profile loaded from profile.json. See Graph.
+        self.profile = None
+        # Memory measured by Graph.memory_profile.
+        self.memory = None
         self.name = ''
 
-        cnt = 0
-        if id_proposal is None or id_proposal in Node.registered_id:
-            while True:
-                id_proposal = self.id_from_cnt(cnt)
-                if id_proposal not in Node.registered_id:
-                    self.ID = id_proposal
-                    break
-                cnt += 1
-        else:
-            self.ID = id_proposal
-        Node.registered_id.append(self.ID)
+        self.ID = graph.id_registry.register(self.id_from_cnt, id_proposal)
 
         for i, inp in enumerate(self.__inputs__.values()):
             inp = copy(inp)
@@ -356,25 +413,76 @@ class Node(object, metaclass=MetaNode):
         :return: object; Attribute
         :rtype: object
         """
-        default_dict = {key: value.default for key, value in
-                        inspect.signature(self.register_chainer_impl()).parameters.items()
-                        if repr(value.default) != "<class 'inspect._empty'>"}
-
         if item.startswith('_') and not item.startswith('__'):
-            try:
-                key = item.lstrip('_')
-                input_val = self.inputs[key]()
+            key = item.lstrip('_')
+            inp = self.inputs.get(key)
+            if inp is not None:
+                input_val = inp()
                 if input_val is not None:
                     return input_val
+                default_dict = self.chainer_defaults()
                 if key in default_dict:
                     return default_dict[key]
-                raise KeyError
+            try:
+                return self.outputs[key]
             except KeyError:
-                try:
-                    return self.outputs[item.lstrip('_')]
-                except KeyError:
-                    raise AttributeError(
-                        'Please set {}.'.format(item.lstrip('_')))
+                raise AttributeError('Please set {}.'.format(key))
+
+    @classmethod
+    def chainer_defaults(cls):
+        """
+        Default values of the arguments of register_chainer_impl.
+        Inspected once per class.
+        :return: Dictionary mapping argument name to default value.
+        """
+        if cls.__chainer_defaults__ is None:
+            if hasattr(cls, 'register_chainer_impl'):
+                cls.__chainer_defaults__ = {
+                    key: value.default for key, value in
+                    inspect.signature(
+                        cls.register_chainer_impl()).parameters.items()
+                    if repr(value.default) != "<class 'inspect._empty'>"}
+            else:
+                cls.__chainer_defaults__ = {}
+        return cls.__chainer_defaults__
+
+    def get_param_value(self, name):
+        """
+        Get the value set to an input. If it is not set, fall back to the
+        default of register_chainer_impl.
+        :param name: str; Name of the input.
+        :return: object; Value of the input.
+        """
+        value = self.inputs[name].value
+        if value in ('', None) or isinstance(value, util.NotSettedParameter):
+            defaults = self.chainer_defaults()
+            if defaults.get(name) is None:
+                raise InputNotAvailable('Please set {}.'.format(name))
+            return defaults[name]
+        return value
+
+    def infer_shape(self, in_shape):
+        """
+        Infer the output shape of this node without running chainer.
+        Override this in nodes which change the shape of their input.
+        :param in_shape: tuple of int; Shape of in_array without batch axis.
+        :return: tuple of int; Shape of out_array without batch axis.
+        """
+        return in_shape
+
+    def count_params(self, in_shape):
+        """
+        :param in_shape: tuple of int; Shape of in_array without batch axis.
+        :return: int; Number of trainable parameters.
+        """
+        return 0
+
+    def count_flops(self, in_shape, out_shape):
+        """
+        Floating point operations per sample. Elementwise by default.
+        A multiply-add is counted as two operations.
+        """
+        return util.prod(out_shape)
 
     def getInputPin(self, input_name):
         """
@@ -449,8 +557,9 @@ class Node(object, metaclass=MetaNode):
     def get_input_connections(self):
         connects = []
         for inp in self.inputs.values():
-            if self.graph.getConnectionOfInput(inp) is not None:
-                connects.append(self.graph.getConnectionOfInput(inp))
+            connect = self.graph.getConnectionOfInput(inp)
+            if connect is not None:
+                connects.append(connect)
         return connects
 
     def get_input_connect_dict(self):
@@ -493,7 +602,7 @@ class Node(object, metaclass=MetaNode):
         raise NotImplementedError
 
     def clear(self):
-        Node.registered_id.remove(self.ID)
+        self.graph.id_registry.release(self.ID)
 
     def check_member(self, members):
         for member in members:
@@ -553,5 +662,11 @@ class Loss(Function):
     def id_from_cnt(self, cnt):
         return 'loss' + str(cnt)
 
+    def infer_shape(self, in_shape):
+        return ()
+
+    def count_flops(self, in_shape, out_shape):
+        return util.prod(in_shape)
+
     def color(self):
         return QColor(45, 45, 95)
@@ -0,0 +1,173 @@
+from bisect import bisect_left
+import importlib.util
+import json
+import os
+import sys
+
+from PyQt5.QtCore import QSettings
+
+from chainer_wing.node import NODECLASSES
+
+CATALOG_VERSION = 2
+
+
+def default_cache_file():
+    """
+    :return: Path of the cache in the user config directory, where the
+     settings of the GUI are stored.
+    """
+    settings = QSettings('ChainerWing', 'ChainerWing')
+    return os.path.join(os.path.dirname(settings.fileName()),
+                        'node_catalog.json')
+
+
+def describe(node_class, file_name):
+    """
+    :return: Catalogue entry of node_class, data used by Node.matchHint and
+     the node list.
+    """
+    hints = []
+    for info in list(node_class.__inputs__.values()) + \
+            list(node_class.__outputs__.values()):
+        hints.extend(info.hints)
+    try:
+        doc = node_class.doc()
+    except AttributeError:
+        # register_chainer_impl is missing in the installed chainer.
+        doc = None
+    return {'file': file_name,
+            'tags': list(node_class.__tags__),
+            'hints': hints,
+            'doc': doc or '',
+            'is_image_node': node_class.is_image_node}
+
+
+class NodeCatalog(object):
+    """
+    Names, tags, hints and docs of the nodes defined in the python files of
+     a directory. The catalogue is cached on disk and rebuilt only when the
+     modification time of a file changes, so that node modules, which
+     import chainer links and models, are loaded on first use.
+    :param directory: Directory of node modules.
+    :param cache_file: Path of the cache. By default, it is placed in the
+     user config directory.
+    """
+
+    def __init__(self, directory, cache_file=None):
+        self.directory = os.path.abspath(directory)
+        if cache_file is None:
+            cache_file = default_cache_file()
+        self.cache_file = cache_file
+        self.files = sorted(path for path in os.listdir(directory)
+                            if path.endswith('py'))
+        self.loaded = set()
+        self.entries = self.read_cache()
+        if self.entries is None:
+            self.entries = self.build()
+            self.write_cache()
+        self.build_index()
+
+    def mtimes(self):
+        return {path: os.path.getmtime(os.path.join(self.directory, path))
+                for path in self.files}
+
+    def read_cache(self):
+        """
+        :return: Cached entries. If the cache is missing or stale, None.
+        """
+        try:
+            with open(self.cache_file, 'r') as fr:
+                cache = json.load(fr)
+        except (OSError, ValueError):
+            return None
+        if cache.get('version') != CATALOG_VERSION or \
+                cache.get('directory') != self.directory or \
+                cache.get('mtimes') != self.mtimes():
+            return None
+        return cache['nodes']
+
+    def write_cache(self):
+        cache = {'version': CATALOG_VERSION,
+                 'directory': self.directory,
+                 'mtimes': self.mtimes(),
+                 'nodes': self.entries}
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = self.cache_file + '.tmp'
+            with open(tmp_file, 'w') as fw:
+                json.dump(cache, fw)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as error:
+            print('Warning: node catalogue is not cached:\n{}'.format(
+                str(error)))
+
+    def build(self):
+        entries = {}
+        for path in self.files:
+            for name in self.load_file(path):
+                entries[name] = describe(NODECLASSES[name], path)
+        return entries
+
+    def build_index(self):
+        """
+        Sorted keys (hints and lower case tags) for prefix search by bisect.
+        """
+        pairs = []
+        for name, entry in self.entries.items():
+            for hint in entry['hints']:
+                pairs.append((hint, name))
+            for tag in entry['tags']:
+                pairs.append((tag.lower(), name))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.key_names = [name for _, name in pairs]
+
+    def load_file(self, path):
+        """
+        Load a node module.
+        :return: Names of the node classes registered by the module.
+        """
+        if path in self.loaded:
+            return []
+        self.loaded.add(path)
+        before = set(NODECLASSES.keys())
+        module_name = 'chainer_wing.CustomNodes.' + os.path.splitext(path)[0]
+        try:
+            spec = importlib.util.spec_from_file_location(
+                module_name, os.path.join(self.directory, path))
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)
+        except Exception as e:
+            sys.modules.pop(module_name, None)
+            print('Warning: error in custom node:\n{}'.format(str(e)))
+        return [name for name in NODECLASSES.keys() if name not in before]
+
+    def load_class(self, name):
+        """
+        Load the module defining node class name.
+        :return: If the class was registered to NODECLASSES, return True.
+        """
+        entry = self.entries.get(name)
+        if entry is None:
+            return False
+        self.load_file(entry['file'])
+        return name in NODECLASSES
+
+    def load_all(self):
+        for path in self.files:
+            self.load_file(path)
+
+    def match(self, text):
+        """
+        Same as Node.matchHint of each node class, by the index.
+        :return: Set of names of the matched nodes.
+        """
+        if not text or text == 'object':
+            return set(self.entries)
+        found = set()
+        for i in range(bisect_left(self.keys, text), len(self.keys)):
+            if not self.keys[i].startswith(text):
+                break
+            found.add(self.key_names[i])
+        return found
@@ -1,4 +1,3 @@
-from importlib.machinery import SourceFileLoader
 import os
 
 from PyQt5.QtCore import Qt
@@ -6,17 +5,14 @@ from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
 from chainer_wing.node import NODECLASSES
+from chainer_wing.node_catalog import NodeCatalog
 from chainer_wing.subwindows.train_config import TrainParamServer
 
 customNodesPath = os.path.join(os.path.dirname(__file__), 'CustomNodes')
 
-for i, path in enumerate(os.listdir(customNodesPath)):
-    if path.endswith('py'):
-        try:
-            full_path = os.path.join(customNodesPath, path)
-            SourceFileLoader(str(i), full_path).load_module()
-        except Exception as e:
-            print('Warning: error in custom node:\n{}'.format(str(e)))
+# Custom nodes are loaded when NODECLASSES is asked for them.
+catalog = NodeCatalog(customNodesPath)
+NODECLASSES.loader = catalog.load_class
 
 
 class NodeFilter(QLineEdit):
@@ -51,17 +47,30 @@ class NodeFilter(QLineEdit):
         text = text.lower()
         # nodes = [str(node) for node in nodeList if text in str(node).lower()]
         text = text[1:]
-        if 'Image' not in TrainParamServer()['Task']:
-            nodes = [nodeName for nodeName, node in NODECLASSES.items()
-                     if node.matchHint(text) and not node.is_image_node]
-        else:
-            nodes = [nodeName for nodeName, node in NODECLASSES.items()
-                     if node.matchHint(text)]
+        image_task = 'Image' in TrainParamServer()['Task']
+        nodes = {nodeName for nodeName in catalog.match(text)
+                 if image_task or
+                 not catalog.entries[nodeName]['is_image_node']}
+        # Classes out of the catalogue, e.g. made by createCustomNodeClass.
+        nodes.update(nodeName for nodeName, node in list(NODECLASSES.items())
+                     if nodeName not in catalog.entries and
+                     node.matchHint(text) and
+                     (image_task or not node.is_image_node))
+        # Rows are hidden instead of building a new model on each key.
+        for row, nodeName in enumerate(self.node_names):
+            self.listView.setRowHidden(row, nodeName not in nodes)
+
+    def build_model(self):
+        self.node_names = sorted(set(catalog.entries) |
+                                 set(NODECLASSES.keys()))
         model = QStandardItemModel()
-        for node in sorted(nodes):
+        for nodeName in self.node_names:
             item = QStandardItem()
-            item.setText(node)
-            item.setToolTip(NODECLASSES[node].doc())
+            item.setText(nodeName)
+            if nodeName in catalog.entries:
+                item.setToolTip(catalog.entries[nodeName]['doc'])
+            else:
+                item.setToolTip(NODECLASSES[nodeName].doc())
             model.appendRow(item)
         self.listView.setModel(model)
 
@@ -73,6 +82,7 @@ class NodeFilter(QLineEdit):
         :return: None
         """
         self.listView = view
+        self.build_model()
         self.update_node_list(text)
 
     def keyPressEvent(self, event):
@@ -85,7 +95,11 @@ class NodeFilter(QLineEdit):
         self.parent().keyPressEvent(event)
         if event.key() == Qt.Key_Down:
             self.listView.setFocus()
-            self.listView.setCurrentIndex(self.listView.model().index(0, 0))
+            for row in range(len(self.node_names)):
+                if not self.listView.isRowHidden(row):
+                    self.listView.setCurrentIndex(
+                        self.listView.model().index(row, 0))
+                    break
 
 
 class NodeList(QListView):
@@ -137,6 +151,7 @@ class NodeList(QListView):
             pos = self.graph.correct_pos(pos)
 
             self.graph.spawnNode(self.selectedClass, position=(pos.x(), pos.y()))
+            self.graph.painter.commit_history()
             self.graph.update()
 
     def mouseMoveEvent(self, event):
@@ -2,15 +2,25 @@ from importlib import machinery
 import os
 import subprocess
 
+import chainer
+from chainer.dataset import concat_examples
 import numpy
 
 from chainer_wing import util
 from chainer_wing.data_fetch import DataManager
 from chainer_wing.data_fetch import ImageDataManager
+from chainer_wing.extension.async_evaluator import AsyncEvaluator
 from chainer_wing.extension.cw_progress_bar import CWProgressBar
+from chainer_wing.extension.evaluation import ConfidenceEvaluator
 from chainer_wing.extension.image_dataset import PreprocessedDataset
 from chainer_wing.extension.image_dataset import PreprocessedTestDataset
+from chainer_wing.extension.iteration_stats import IterationStats
+from chainer_wing.extension.iteration_stats import peak_rss_mb
+from chainer_wing.extension.node_profiler import memory_records
+from chainer_wing.extension.node_profiler import NodeProfileHook
+from chainer_wing.extension.node_profiler import NodeProfiler
 from chainer_wing.extension.plot_extension import cw_postprocess
+from chainer_wing.extension.plot_extension import LiveReport
 from chainer_wing.subwindows.train_config import TrainParamServer
 
 try:
@@ -39,8 +49,14 @@ class TrainRunner(object):
         # Progress bar should be initialized after loading module file.
         self.pbar = CWProgressBar(train_server['Epoch'])
         self.chainerui_server = None
+        # Training and test data loaded by dry_run for run.
+        self.data = None
 
-    def run(self):
+    def run(self, report_widget=None):
+        """
+        :param report_widget: ReportWidget to draw charts while training.
+         If None, PlotReport renders them to the result directory.
+        """
         train_server = TrainParamServer()
         result_dir = train_server['WorkDir'] + '/result'
         if not os.path.isdir(result_dir):
@@ -66,17 +82,142 @@ class TrainRunner(object):
             train_data = PreprocessedDataset(train_label_file, mean)
             test_data = PreprocessedDataset(test_label_file, mean)
         else:
-            train_data, test_data = DataManager().get_data_train()
+            if self.data is None:
+                self.data = DataManager().get_data_train()
+            train_data, test_data = self.data
+            self.data = None
+
+        cw_extensions = []
+        profile_file = train_server.get_profile_name()
+        if os.path.isfile(profile_file):
+            os.remove(profile_file)
+        iteration_stats = IterationStats(
+            train_server.get_iteration_stats_name())
+        cw_extensions.append(iteration_stats)
+        self.pbar.iteration_stats = iteration_stats
+        if train_server['ProfileIterations']:
+            cw_extensions.append(NodeProfiler(train_server.get_net_name(),
+                                              profile_file,
+                                              train_server['ProfileIterations']))
+        live_report = None
+        if report_widget is not None:
+            report_widget.start_report()
+            live_report = LiveReport(report_widget.add_points)
+
+        def make_evaluator(test_iter, model, trigger, converter):
+            if train_server['AsyncEval']:
+                callback = None
+                if report_widget is not None:
+                    callback = report_widget.add_points
+                return AsyncEvaluator(test_iter.dataset,
+                                      train_server.get_net_name(),
+                                      train_server['NetName'],
+                                      test_iter.batch_size, trigger,
+                                      callback=callback)
+            return ConfidenceEvaluator(test_iter, model, converter=converter,
+                                       device=train_server['GPU'] - 1,
+                                       trigger=trigger)
         self.module.training_main(train_data, test_data, self.pbar,
-                                  cw_postprocess)
+                                  cw_postprocess, cw_extensions, live_report,
+                                  make_evaluator)
         util.disp_message('Training is finished. Model file is saved to ' +
                           train_server.get_model_name() + '.npz',
                           title='Training is finished')
 
+    def dry_run(self):
+        """
+        A csv file and image data are read in part. Other data, i.e. a npz
+         file or a data getter script, is loaded whole here and kept for run,
+         so that it is not loaded twice.
+        """
+        train_server = TrainParamServer()
+        if 'Image' in train_server['Task'] or \
+                train_server['TrainData'].endswith('.csv'):
+            return DryRunner(self.module).run()
+        self.data = DataManager().get_data_train()
+        return DryRunner(self.module, data=self.data[0]).run()
+
+    def memory_profile(self):
+        return MemoryProfileRunner(self.module).run()
+
     def kill(self):
         self.pbar.finalize()
 
 
+class DryRunner(object):
+    """
+    Runs forward and backward of the compiled net once on a tiny batch,
+     so that errors in the graph are found before loading whole data.
+    Tabular data is read from the head of the training data and image
+     data is replaced with random images of the preprocessed size.
+    If data, a TupleDataset of the training data, is given, the batch is
+     taken from it instead.
+    """
+
+    def __init__(self, module, batch_size=4, data=None):
+        self.module = module
+        self.batch_size = batch_size
+        self.data = data
+
+    def get_batch(self):
+        if self.data is not None:
+            return concat_examples(self.data[:self.batch_size])
+        if 'Image' in TrainParamServer()['Task']:
+            shape = ImageDataManager().get_input_shape()
+            data = numpy.random.rand(self.batch_size, *shape)
+            label = numpy.zeros(self.batch_size, dtype=numpy.int32)
+            return data.astype(numpy.float32), label
+        return DataManager().get_data_head(self.batch_size)
+
+    def run(self):
+        """
+        :return: Dictionary mapping node name to forward/backward seconds
+         and output bytes. See NodeProfileHook.records.
+        """
+        train_server = TrainParamServer()
+        data, label = self.get_batch()
+        model = getattr(self.module, train_server['NetName'])()
+        hook = NodeProfileHook(train_server.get_net_name())
+        with hook, chainer.using_config('train', True):
+            loss = model(data, label)
+            hook.collect_output_bytes()
+            model.cleargrads()
+            loss.backward()
+        return hook.records()
+
+
+class MemoryProfileRunner(DryRunner):
+    """
+    Runs forward, backward and an optimizer update once on a batch of the
+     training batch size, and measures the memory of each node.
+    """
+
+    def __init__(self, module, batch_size=None):
+        if batch_size is None:
+            batch_size = TrainParamServer()['BatchSize']
+        super(MemoryProfileRunner, self).__init__(module, batch_size)
+
+    def run(self):
+        """
+        :return: Dictionary mapping node name to bytes of output, parameters,
+         gradients and optimizer state (see memory_records), the batch size
+         and the peak RSS of the process in MiB.
+        """
+        train_server = TrainParamServer()
+        data, label = self.get_batch()
+        model = getattr(self.module, train_server['NetName'])()
+        optimizer = self.module.get_optimizer()
+        optimizer.setup(model)
+        hook = NodeProfileHook(train_server.get_net_name())
+        with hook, chainer.using_config('train', True):
+            loss = model(data, label)
+            hook.collect_output_bytes()
+            model.cleargrads()
+            loss.backward()
+        optimizer.update()
+        return memory_records(model, hook), len(data), peak_rss_mb()
+
+
 class PredictionRunner(object):
 
     def __init__(self):
@@ -92,6 +233,19 @@ class PredictionRunner(object):
         return result, label
 
 
+def export_weights(weight_file):
+    """
+    Save the trained model as an uncompressed npz for the inference module.
+    Skipping zlib makes loading faster. (npz members cannot be memory mapped.)
+    """
+    train_server = TrainParamServer()
+    module = machinery.SourceFileLoader('net_run',
+                                        train_server.get_net_name()).load_module()
+    model = getattr(module, train_server['NetName'])()
+    chainer.serializers.load_npz(train_server.get_model_name() + '.npz', model)
+    chainer.serializers.save_npz(weight_file, model, compression=False)
+
+
 class ImagePredictionRunner(PredictionRunner):
     def run(self, classification, including_label):
         pred_label_file = ImageDataManager().get_data_pred()
@@ -0,0 +1,99 @@
+from chainer_wing.compiler import Compiler
+from chainer_wing.node import InputNotAvailable
+from chainer_wing import util
+
+
+class ShapeInferenceError(Exception):
+    """
+    Raised when the output shape of a node cannot be inferred.
+    args[0] is the node and args[1] is the message.
+    """
+    pass
+
+
+class NodeEstimate(object):
+    """
+    Statically estimated cost of one node.
+    Shapes exclude the batch axis, activation_bytes includes it.
+    """
+
+    def __init__(self, node, in_shape, out_shape, params, activation_bytes,
+                 flops):
+        self.node = node
+        self.in_shape = in_shape
+        self.out_shape = out_shape
+        self.params = params
+        self.activation_bytes = activation_bytes
+        self.flops = flops
+
+
+class ShapeInference(object):
+    """
+    Propagates the input data shape through the node graph using each
+     node's infer_shape, count_params and count_flops.
+    :param nodes: Dictionary mapping node ID to Node instance.
+    :param input_shape: Shape of one input sample.
+    :param batch_size: Used for estimating activation memory.
+    :param itemsize: Bytes per element of activations (float32).
+    """
+
+    def __init__(self, nodes, input_shape, batch_size=1, itemsize=4):
+        self.nodes = nodes
+        self.input_shape = tuple(input_shape)
+        self.batch_size = batch_size
+        self.itemsize = itemsize
+
+    def __call__(self):
+        """
+        :return: List of NodeEstimate ordered from the input to the losses.
+        """
+        estimates = []
+        estimated = {}
+        for chain in Compiler(passes=[]).build_chains(self.nodes):
+            in_shape = self.input_shape
+            for node in reversed(chain):
+                if node not in estimated:
+                    estimated[node] = self.estimate(node, in_shape)
+                    estimates.append(estimated[node])
+                in_shape = estimated[node].out_shape
+        return estimates
+
+    def estimate(self, node, in_shape):
+        try:
+            out_shape = tuple(node.infer_shape(in_shape))
+            params = node.count_params(in_shape)
+            flops = node.count_flops(in_shape, out_shape)
+        except util.InvalidShape as error:
+            raise ShapeInferenceError(node, error.args[0])
+        except InputNotAvailable as error:
+            raise ShapeInferenceError(node, '{} @{}'.format(error.args[0],
+                                                            node.get_name()))
+        activation_bytes = (self.batch_size * util.prod(out_shape) *
+                            self.itemsize)
+        return NodeEstimate(node, in_shape, out_shape, params,
+                            activation_bytes, flops)
+
+
+def format_estimates(estimates):
+    """
+    Format estimates as a fixed width table.
+    :param estimates: List of NodeEstimate.
+    :return: str
+    """
+    row = '{:<32}{:<20}{:>14}{:>14}{:>12}'
+    lines = [row.format('node', 'output shape', 'params', 'activation',
+                        'MFLOPs')]
+    for estimate in estimates:
+        name = '{} ({})'.format(estimate.node.get_name(),
+                                type(estimate.node).__name__)
+        lines.append(row.format(name, str(estimate.out_shape),
+                                '{:,}'.format(estimate.params),
+                                util.format_bytes(estimate.activation_bytes),
+                                '{:.2f}'.format(estimate.flops / 1e6)))
+    lines.append(row.format(
+        'total', '',
+        '{:,}'.format(sum(estimate.params for estimate in estimates)),
+        util.format_bytes(sum(estimate.activation_bytes
+                              for estimate in estimates)),
+        '{:.2f}'.format(sum(estimate.flops for estimate in estimates) / 1e6)))
+    return '\n'.join(lines)
@@ -1,8 +1,5 @@
 import glob
 
-import chainercv.utils
-import numpy
-import PIL.Image
 from PyQt5 import QtWidgets
 from PyQt5 import QtGui
 
@@ -11,7 +8,6 @@ from chainer_wing.subwindows.data_config import AbstractDataDialog
 from chainer_wing.subwindows.data_config import DataCheckBox
 from chainer_wing.subwindows.data_config import DataFileLabel
 from chainer_wing.subwindows.data_config import DataLineEdit
-from chainer_wing.extension.image_dataset import augment_data
 from chainer_wing import util
 
 
@@ -88,6 +84,10 @@ class ImageDataDialog(AbstractDataDialog):
                         ]
 
     def update_preview(self):
+        import chainercv.utils
+        import numpy
+        import PIL.Image
+        from chainer_wing.extension.image_dataset import augment_data
         self.commit_all()
         image_files = glob.glob(TrainParamServer()['TrainData'] + '/*/*.jpg')
         if not image_files:
@@ -1,3 +1,6 @@
+import json
+import math
+
 from PyQt5 import QtCore
 from PyQt5 import QtGui
 from PyQt5 import QtWidgets
@@ -7,63 +10,190 @@ from chainer_wing.subwindows.train_config import TrainParamServer
 
 
 class ReportWidget(QtWidgets.QTabWidget):
+    """
+    Charts of loss and accuracy. Points are added epoch by epoch by
+     LiveReport while training and read from the log of LogReport when a
+     project is opened.
+    """
 
     def __init__(self, *args, **kwargs):
         super(ReportWidget, self).__init__(*args, **kwargs)
         self.setStyleSheet('''ReportWidget{background: rgb(55,55,55)}
         ''')
-        try:
-            loss_image = TrainParamServer().get_result_dir() + "/loss.png"
-        except KeyError:
-            loss_image = "result/loss.png"
-
-        self.loss_widget = GraphWidget(loss_image, parent=self)
+        self.loss_widget = ChartWidget(['main/loss', 'validation/main/loss'],
+                                       parent=self)
         self.addTab(self.loss_widget, 'Loss')
-        try:
-            acc_image = TrainParamServer().get_result_dir() + "/accuracy.png"
-        except KeyError:
-            acc_image = "result/accuracy.png"
-        self.acc_widget = GraphWidget(acc_image, parent=self)
+        self.acc_widget = ChartWidget(['main/accuracy',
+                                       'validation/main/accuracy'],
+                                      parent=self)
         self.addTab(self.acc_widget, 'Accuracy')
         self.resize(200, 200)
 
+    def start_report(self):
+        """
+        Clear the charts for a new training.
+        """
+        self.loss_widget.clear()
+        self.acc_widget.clear()
+
+    def add_points(self, epoch, values):
+        """
+        Callback of LiveReport and AsyncEvaluator.
+        Results of AsyncEvaluator are drawn as validation at the epoch of
+         their snapshot instead of epoch.
+        """
+        self.loss_widget.add_point(epoch, values)
+        self.acc_widget.add_point(epoch, values)
+        if 'async_validation/epoch' in values:
+            prefix = 'async_validation/'
+            async_values = {'validation/' + key[len(prefix):]: value
+                            for key, value in values.items()
+                            if key.startswith(prefix)}
+            self.loss_widget.add_point(values[prefix + 'epoch'],
+                                       async_values)
+            self.acc_widget.add_point(values[prefix + 'epoch'], async_values)
+
     def update_report(self):
-        self.removeTab(0)
-        self.removeTab(0)
-        try:
-            loss_image = TrainParamServer().get_result_dir() + "/loss.png"
-        except KeyError:
-            loss_image = "result/loss.png"
-        self.loss_widget = GraphWidget(loss_image, parent=self)
-        self.addTab(self.loss_widget, 'Loss')
+        """
+        Show the log of the last training of the current project.
+        """
+        self.start_report()
         try:
-            acc_image = TrainParamServer().get_result_dir() + "/accuracy.png"
-        except KeyError:
-            acc_image = "result/accuracy.png"
-        self.acc_widget = GraphWidget(acc_image, parent=self)
-        self.addTab(self.acc_widget, 'Accuracy')
+            log_file = TrainParamServer().get_result_dir() + '/log'
+            with open(log_file, 'r') as fr:
+                log = json.load(fr)
+        except (KeyError, OSError, ValueError):
+            return
+        for entry in log:
+            self.add_points(entry['epoch'], entry)
 
 
-class GraphWidget(QtWidgets.QWidget):
+class ChartWidget(QtWidgets.QWidget):
+    """
+    Line chart of the metrics of keys.
+    The chart is kept in a pixmap. A new point only draws the segment from
+     the previous point, unless an axis has to be extended. The y axis is
+     logarithmic if the values are positive and span over two orders.
+    """
+    COLORS = (QtGui.QColor(255, 190, 0), QtGui.QColor(0, 200, 200))
+    MARGIN = 50
 
-    def __init__(self, image_file, *args, **kwargs):
-        super(GraphWidget, self).__init__()
-        self.setStyleSheet('''ReportWidget{background: rgb(55,55,55)}
-        ''')
-        self.pixmap = None
-        self.image_file = image_file
+    def __init__(self, keys, parent=None):
+        super(ChartWidget, self).__init__(parent)
+        self.keys = keys
+        self.clear()
+
+    def clear(self):
+        self.points = {key: [] for key in self.keys}
+        self.x_max = 1.
+        self.y_min = None
+        self.y_max = None
+        self.log_scale = False
+        self.buffer = None
+        self.update()
+
+    def add_point(self, x, values):
+        added = [key for key in self.keys if key in values]
+        if not added:
+            return
+        for key in added:
+            self.points[key].append((x, values[key]))
+        extended = self.extend_axes(x, [values[key] for key in added])
+        if self.buffer is None or extended:
+            self.buffer = None
+        else:
+            painter = QtGui.QPainter(self.buffer)
+            painter.setRenderHint(QtGui.QPainter.Antialiasing)
+            for key in added:
+                self.draw_line(painter, key, self.points[key][-2:])
+            painter.end()
+        self.update()
+
+    def extend_axes(self, x, ys):
+        """
+        :return: If an axis was changed, return True.
+        """
+        extended = False
+        if x > self.x_max:
+            self.x_max = max(x, self.x_max * 2)
+            extended = True
+        y_min = min(ys)
+        y_max = max(ys)
+        if self.y_min is None:
+            self.y_min, self.y_max = y_min, y_max
+            extended = True
+        if y_min < self.y_min:
+            self.y_min = y_min - (self.y_max - y_min) * 0.2
+            extended = True
+        if y_max > self.y_max:
+            self.y_max = y_max + (y_max - self.y_min) * 0.2
+            extended = True
+        log_scale = 0 < self.y_min and self.y_min * 100 < self.y_max
+        if log_scale != self.log_scale:
+            self.log_scale = log_scale
+            extended = True
+        return extended
+
+    def to_screen(self, x, y):
+        width = self.width() - self.MARGIN * 1.5
+        height = self.height() - self.MARGIN * 1.5
+        y_min, y_max = self.y_min, self.y_max
+        if self.log_scale:
+            y, y_min, y_max = math.log(y), math.log(y_min), math.log(y_max)
+        y_span = (y_max - y_min) or 1.
+        return QtCore.QPointF(
+            self.MARGIN + x / self.x_max * width,
+            self.MARGIN * 0.5 + (y_max - y) / y_span * height)
+
+    def draw_line(self, painter, key, points):
+        pen = QtGui.QPen(self.COLORS[self.keys.index(key) % len(self.COLORS)])
+        pen.setWidth(2)
+        painter.setPen(pen)
+        screen_points = [self.to_screen(x, y) for x, y in points]
+        if len(screen_points) == 1:
+            painter.drawPoint(screen_points[0])
+        else:
+            painter.drawPolyline(QtGui.QPolygonF(screen_points))
+
+    def redraw(self):
+        self.buffer = QtGui.QPixmap(self.size())
+        self.buffer.fill(QtGui.QColor(55, 55, 55))
+        painter = QtGui.QPainter(self.buffer)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.setPen(QtGui.QColor(150, 150, 150))
+        painter.drawRect(QtCore.QRectF(
+            self.MARGIN, self.MARGIN * 0.5,
+            self.width() - self.MARGIN * 1.5,
+            self.height() - self.MARGIN * 1.5))
+        if self.y_min is not None:
+            label_width = self.MARGIN - 4
+            painter.drawText(
+                QtCore.QRectF(0, self.MARGIN * 0.5, label_width, 20),
+                Qt.AlignRight | Qt.AlignTop, '{:.2g}'.format(self.y_max))
+            painter.drawText(
+                QtCore.QRectF(0, self.height() - self.MARGIN - 20,
+                              label_width, 20),
+                Qt.AlignRight | Qt.AlignBottom, '{:.2g}'.format(self.y_min))
+            painter.drawText(
+                QtCore.QRectF(0, self.height() - self.MARGIN,
+                              self.width() - self.MARGIN * 0.5,
+                              self.MARGIN),
+                Qt.AlignRight | Qt.AlignVCenter,
+                '{:.3g} epoch'.format(self.x_max))
+        for i, key in enumerate(self.keys):
+            painter.setPen(self.COLORS[i % len(self.COLORS)])
+            painter.drawText(QtCore.QPointF(self.MARGIN + 5 + 160 * i,
+                                            self.MARGIN * 0.5 - 5), key)
+            if self.points[key]:
+                self.draw_line(painter, key, self.points[key])
+        painter.end()
+
+    def resizeEvent(self, event):
+        super(ChartWidget, self).resizeEvent(event)
+        self.buffer = None
 
     def paintEvent(self, event):
-        if 'Class' not in TrainParamServer()['Task']:
-            if 'accuracy' in self.image_file:
-                return
-        self.pixmap = QtGui.QPixmap(self.image_file)
-        size = self.size()
+        if self.buffer is None:
+            self.redraw()
         painter = QtGui.QPainter(self)
-        point = QtCore.QPoint(0, 0)
-        scaled_pix = self.pixmap.scaled(size, Qt.KeepAspectRatio,
-                                        transformMode=Qt.SmoothTransformation)
-        # start painting the label from left upper corner
-        point.setX((size.width() - scaled_pix.width()) / 2)
-        point.setY((size.height() - scaled_pix.height()) / 2)
-        painter.drawPixmap(point, scaled_pix)
+        painter.drawPixmap(0, 0, self.buffer)
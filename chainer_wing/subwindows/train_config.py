@@ -1,5 +1,4 @@
 from PyQt5 import QtWidgets
-from chainer_wing import inspector
 from chainer_wing import util
 
 import os
@@ -27,6 +26,25 @@ class TrainParamServer(object):
                 return os.path.dirname(__file__) + '../../examples/'
             elif key == 'PreProcessor':
                 return 'Do Nothing'
+            elif key == 'ProfileIterations':
+                return 0
+            elif key in ('EvalInterval', 'EvalSubset', 'EvalSeed'):
+                return 0
+            elif key == 'AsyncEval':
+                return False
+            elif key == 'AccumulationSteps':
+                return 1
+            elif key == 'LRSchedule':
+                return 'None'
+            elif key == 'LRDecay':
+                return 0.1
+            elif key == 'LRStepEpochs':
+                return 10
+            elif key == 'LRWarmup':
+                return 0
+            elif key == 'Task':
+                # Until TrainDialog reflects the settings.
+                return 'Simple Classification'
             else:
                 raise KeyError(key)
 
@@ -66,6 +84,12 @@ class TrainParamServer(object):
     def get_model_name(cls):
         return cls.get_result_dir() + '/' + cls['ModelName']
 
+    def get_profile_name(cls):
+        return cls.get_result_dir() + '/profile.json'
+
+    def get_iteration_stats_name(cls):
+        return cls.get_result_dir() + '/iteration_stats.jsonl'
+
     def get_train_data_name(cls):
         return cls['TrainData'].split('/')[-1]
 
@@ -87,12 +111,29 @@ class TrainDialog(QtWidgets.QDialog):
                         ('Net Name', NetNameEdit(settings, self)),
                         ('Model Name', ModelNameEdit(settings, self)),
                         ('Batch Size', BatchSizeEdit(settings, self)),
+                        ('Accumulation Steps',
+                         AccumulationStepsEdit(settings, self)),
                         ('Epoch', EpochEdit(settings, self)),
                         ('GPU', GPUEdit(settings, self)),
+                        ('Profile Iterations',
+                         ProfileIterationsEdit(settings, self)),
+                        ('Evaluation Settings', None),
+                        ('Eval Interval', EvalIntervalEdit(settings, self)),
+                        ('Eval Subset', EvalSubsetEdit(settings, self)),
+                        ('Eval Seed', EvalSeedEdit(settings, self)),
+                        ('Async Eval', AsyncEvalEdit(settings, self)),
                         ('Optimizer Settings', None),
                         ('Optimizer', opt_edit),
                         ]
+        self.lr_edits = [('LR Schedule', LRScheduleEdit(settings, self)),
+                         ('LR Decay Rate', LRDecayEdit(settings, self)),
+                         ('LR Step Epochs', LRStepEpochsEdit(settings, self)),
+                         ('LR Warmup Iterations',
+                          LRWarmupEdit(settings, self)),
+                         ]
+        self.dialogs.extend(self.lr_edits)
         optimizer_name = TrainParamServer()['Optimizer']
+        from chainer_wing import inspector
         oi = inspector.OptimizerInspector()
         for name, default in oi.get_signature(optimizer_name).items():
             if name not in TrainParamServer().__dict__:
@@ -101,6 +142,7 @@ class TrainDialog(QtWidgets.QDialog):
             dialog = (param, OptimizeParamEdit(settings, self, param,
                                                TrainParamServer()[param]))
             self.dialogs.append(dialog)
+        self.enable_lr_schedule()
 
         super(TrainDialog, self).__init__(*args)
         self.draw(*args, settings=settings)
@@ -169,6 +211,20 @@ class TrainDialog(QtWidgets.QDialog):
     def redraw(self):
         self.parent().drawer.repaint()
 
+    def enable_lr_schedule(self):
+        """
+        Disable the learning rate schedule settings if the optimizer has
+         neither lr nor alpha, since they would not be applied.
+        """
+        from chainer_wing.templates import lr_attribute
+        enabled = lr_attribute(TrainParamServer()) is not None
+        for name, widget in self.lr_edits:
+            widget.setEnabled(enabled)
+            if not enabled:
+                widget.setToolTip('{} has no learning rate to be '
+                                  'scheduled.'.format(
+                                      TrainParamServer()['Optimizer']))
+
     def update_optimizer(self, optimizer_name):
         print(optimizer_name)
         self.update_opt_params(optimizer_name)
@@ -177,6 +233,7 @@ class TrainDialog(QtWidgets.QDialog):
 
     def update_opt_params(self, optimizer_name):
         TrainParamServer()['Optimizer'] = optimizer_name
+        from chainer_wing import inspector
         oi = inspector.OptimizerInspector()
         not_exist_names = []
         exist_names = []
@@ -222,6 +279,18 @@ class BatchSizeEdit(AbstractTrainEdit):
         self.setMaximum(1000)
 
 
+class AccumulationStepsEdit(AbstractTrainEdit):
+    """
+    Mini batches whose gradients are averaged before an update. The
+     effective batch size is Batch Size * Accumulation Steps, while memory
+     for activations is of one mini batch.
+    """
+    def __init__(self, settings, parent):
+        super(AccumulationStepsEdit, self).__init__(settings, parent, 1)
+        self.setMinimum(1)
+        self.setMaximum(1000)
+
+
 class EpochEdit(AbstractTrainEdit):
     def __init__(self, settings, parent):
         super(EpochEdit, self).__init__(settings, parent, 20)
@@ -233,8 +302,120 @@ class GPUEdit(AbstractTrainEdit):
         super(GPUEdit, self).__init__(settings, parent, 0)
 
 
+class ProfileIterationsEdit(AbstractTrainEdit):
+    def __init__(self, settings, parent):
+        super(ProfileIterationsEdit, self).__init__(settings, parent, 0)
+        self.setMaximum(1000)
+
+
+class EvalIntervalEdit(AbstractTrainEdit):
+    """
+    Iterations between evaluations. If 0, evaluate at each epoch.
+    """
+    def __init__(self, settings, parent):
+        super(EvalIntervalEdit, self).__init__(settings, parent, 0)
+        self.setMaximum(1000000)
+
+
+class EvalSubsetEdit(AbstractTrainEdit):
+    """
+    Number of test examples in a fixed random subset to evaluate.
+    If 0, evaluate all of them.
+    """
+    def __init__(self, settings, parent):
+        super(EvalSubsetEdit, self).__init__(settings, parent, 0)
+        self.setMaximum(100000000)
+
+
+class EvalSeedEdit(AbstractTrainEdit):
+    def __init__(self, settings, parent):
+        super(EvalSeedEdit, self).__init__(settings, parent, 0)
+        self.setMaximum(100000)
+
+
+class AsyncEvalEdit(QtWidgets.QCheckBox):
+    """
+    Evaluate in a worker process by AsyncEvaluator while training continues.
+    """
+    def __init__(self, settings, parent):
+        self.parent = parent
+        self.settings = settings
+        super(AsyncEvalEdit, self).__init__()
+        v = settings.value('AsyncEval', type=bool)
+        if 'AsyncEval' in TrainParamServer().__dict__:
+            v = TrainParamServer()['AsyncEval']
+        else:
+            TrainParamServer()['AsyncEval'] = v
+        self.setChecked(v)
+
+    def commit(self):
+        self.settings.setValue('AsyncEval', self.isChecked())
+        TrainParamServer()['AsyncEval'] = self.isChecked()
+
+
+class LRStepEpochsEdit(AbstractTrainEdit):
+    def __init__(self, settings, parent):
+        super(LRStepEpochsEdit, self).__init__(settings, parent, 10)
+        self.setMinimum(1)
+        self.setMaximum(100000)
+
+
+class LRWarmupEdit(AbstractTrainEdit):
+    """
+    Iterations in which the learning rate rises linearly to its value.
+    """
+    def __init__(self, settings, parent):
+        super(LRWarmupEdit, self).__init__(settings, parent, 0)
+        self.setMaximum(1000000)
+
+
+class LRScheduleEdit(QtWidgets.QComboBox):
+    """
+    Schedule of lr (or alpha) of the optimizer. Step multiplies it by the
+     decay rate every step epochs, Exponential every epoch, and Cosine
+     anneals it to 0 at the last epoch.
+    """
+    def __init__(self, settings, parent):
+        menu = ('None', 'Step', 'Exponential', 'Cosine')
+        self.parent = parent
+        self.settings = settings
+        super(LRScheduleEdit, self).__init__()
+        self.addItems(menu)
+        if 'LRSchedule' in TrainParamServer().__dict__:
+            self.setCurrentText(TrainParamServer()['LRSchedule'])
+        else:
+            self.setCurrentText(settings.value('LRSchedule', type=str))
+        TrainParamServer()['LRSchedule'] = self.currentText()
+
+    def commit(self):
+        self.settings.setValue('LRSchedule', self.currentText())
+        TrainParamServer()['LRSchedule'] = self.currentText()
+
+
+class LRDecayEdit(QtWidgets.QLineEdit):
+    def __init__(self, settings, parent):
+        self.parent = parent
+        self.settings = settings
+        super(LRDecayEdit, self).__init__()
+        v = settings.value('LRDecay', type=float)
+        v = v if v else 0.1
+        if 'LRDecay' in TrainParamServer().__dict__:
+            v = TrainParamServer()['LRDecay']
+        else:
+            TrainParamServer()['LRDecay'] = v
+        self.setText(str(v))
+
+    def commit(self):
+        try:
+            TrainParamServer()['LRDecay'] = float(self.text())
+            self.settings.setValue('LRDecay', TrainParamServer()['LRDecay'])
+        except ValueError:
+            util.disp_error('LR decay rate should be float.')
+
+
 class OptimizerEdit(QtWidgets.QComboBox):
     def __init__(self, settings, parent):
+        from chainer_wing import inspector
         menu = inspector.OptimizerInspector().get_members()
         self.parent = parent
         self.settings = settings
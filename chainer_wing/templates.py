@@ -1,3 +1,5 @@
+import re
+
 TEMPLATES = {}
 
 
@@ -30,7 +32,7 @@ class Template(object, metaclass=MetaTemplate):
 class NetTemplate(Template):
 
     def __call__(self, net_name, init_impl, call_impl, pred_impl, lossID,
-                 classification):
+                 classification, fused_pred_impl='', fuse_impl=''):
         rtn = '''import chainer
 from chainer.functions import *
 from chainer.links import *
@@ -59,9 +61,9 @@ class {0}(chainer.Chain):
 
     def _predict(self, x):
 {3}
-
+{5}
     def predict(self, x):
-        return self._predict(x).data
+        return {6}(x).data
 
     def predict_class(self, x):
         predicted = numpy.argmax(self.predict(x), axis=1)
@@ -71,71 +73,306 @@ class {0}(chainer.Chain):
         self.y = self._predict(x)
         self.{4} = {2}
         reporter.report({{'loss': self.{4}}}, self)
-'''.format(net_name, init_impl, call_impl, pred_impl, lossID)
+'''.format(net_name, init_impl, call_impl, pred_impl, lossID,
+           self.fused_methods(fused_pred_impl, fuse_impl),
+           'self._predict_fused' if fuse_impl else 'self._predict')
         if classification:
             rtn += "        self.accuracy = accuracy(self.y, t)\n"
             rtn += "        reporter.report({'accuracy': self.accuracy}, self)\n"
         rtn += "        return self.{}".format(lossID)
+        if fuse_impl:
+            rtn += self.fuse_function()
         return rtn
 
+    def fused_methods(self, fused_pred_impl, fuse_impl):
+        if not fuse_impl:
+            return ''
+        return '''
+    fused = False
+
+    def _predict_fused(self, x):
+        if not self.fused:
+            return self._predict(x)
+{0}
+
+    def fuse_batch_normalization(self):
+        """Fold BatchNormalization statistics into the preceding links."""
+{1}
+        self.fused = True
+'''.format(fused_pred_impl, fuse_impl)
+
+    def fuse_function(self):
+        return '''
+
+
+def fuse_batch_normalization(link, bn):
+    xp = link.xp
+    gamma = getattr(bn, 'gamma', None)
+    beta = getattr(bn, 'beta', None)
+    scale = 1 / xp.sqrt(bn.avg_var + bn.eps)
+    if gamma is not None:
+        scale = scale * gamma.data
+    shift = -bn.avg_mean * scale
+    if beta is not None:
+        shift = shift + beta.data
+    link.W.data *= scale.reshape((-1,) + (1,) * (link.W.ndim - 1))
+    if link.b is None:
+        with link.init_scope():
+            link.b = chainer.Parameter(shift.astype(link.W.dtype))
+    else:
+        link.b.data *= scale
+        link.b.data += shift
+'''
+
+
+class InferenceTemplate(Template):
+    """
+    Standalone inference module which imports only what the net uses,
+     so that it can be served without chainerui, optimizers or trainer.
+    """
+
+    def __call__(self, net_name, init_impl, pred_impl, classification,
+                 weight_file, fused_pred_impl='', fuse_impl=''):
+        code = '\n'.join((init_impl, pred_impl, fused_pred_impl))
+        rtn = '''\"\"\"
+Inference module of {0} exported by ChainerWing.
+
+    import {0}_inference
+    y = {0}_inference.predict(batch)
+\"\"\"
+import os
+
+import chainer
+{1}from chainer import serializers
+import numpy
+
+WEIGHT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '{2}')
+
+
+class {0}(chainer.Chain):
+
+    def __init__(self):
+        super({0}, self).__init__(
+{3}
+        )
+
+    def _predict(self, x):
+{4}
+{5}
+
+_model = None
+
+
+def load_model(weight_file=WEIGHT_FILE):
+    global _model
+    if _model is None:
+        model = {0}()
+        serializers.load_npz(weight_file, model)
+{6}        _model = model
+    return _model
+
+
+def predict(batch):
+    with chainer.using_config('train', False), \\
+            chainer.using_config('enable_backprop', False):
+        return load_model().{7}(batch).data
+'''.format(net_name, self.explicit_imports(code), weight_file, init_impl,
+           pred_impl,
+           NetTemplate().fused_methods(fused_pred_impl, fuse_impl),
+           '        model.fuse_batch_normalization()\n' if fuse_impl else '',
+           '_predict_fused' if fuse_impl else '_predict')
+        if classification:
+            rtn += '''
+
+def predict_class(batch):
+    return numpy.argmax(predict(batch), axis=1)
+'''
+        if fuse_impl:
+            rtn += NetTemplate().fuse_function()
+        return rtn
+
+    @staticmethod
+    def explicit_imports(code):
+        import chainer
+        links = set()
+        functions = set()
+        for name in re.findall(r'(?<![\w.])([A-Za-z_]\w*)\(', code):
+            if hasattr(chainer.links, name):
+                links.add(name)
+            elif hasattr(chainer.functions, name):
+                functions.add(name)
+        imports = ''
+        if functions:
+            imports += 'from chainer.functions import {}\n'.format(
+                ', '.join(sorted(functions)))
+        if links:
+            imports += 'from chainer.links import {}\n'.format(
+                ', '.join(sorted(links)))
+        return imports
+
+
+def lr_attribute(train_server):
+    """
+    :return: Name of the hyperparameter of the optimizer scaled by the
+     learning rate schedule. If the optimizer has none, return None.
+    """
+    for name in ('lr', 'alpha'):
+        if 'opt_' + name in train_server.__dict__:
+            return name
+    return None
+
+
+def use_lr_schedule(train_server):
+    return bool(lr_attribute(train_server) and
+                (train_server['LRSchedule'] != 'None' or
+                 train_server['LRWarmup']))
+
 
 class OptimizerTemplate(Template):
     def __call__(self, train_server):
         opt_params = []
         for param in train_server.iter_for_opt_params():
             opt_params.append(''.join((param[4:], '=', str(train_server[param]))))
-        return '''
+        rtn = '''
 
 def get_optimizer():
     return {0}({1})
 '''.format(train_server['Optimizer'], ', '.join(opt_params))
+        if use_lr_schedule(train_server):
+            rtn += self.lr_schedule(train_server)
+        return rtn
+
+    def lr_schedule(self, train_server):
+        schedule = train_server['LRSchedule']
+        if schedule == 'Step':
+            scale = '{0} ** (int(epoch) // {1})'.format(
+                train_server['LRDecay'], train_server['LRStepEpochs'])
+        elif schedule == 'Exponential':
+            scale = '{0} ** int(epoch)'.format(train_server['LRDecay'])
+        elif schedule == 'Cosine':
+            # min is chainer.functions.min in the net file.
+            scale = '0.5 * (1 + numpy.cos(numpy.pi * ' \
+                    'numpy.minimum(epoch / {0}, 1.)))'.format(
+                        train_server['Epoch'])
+        else:
+            scale = '1.'
+        return '''
+
+def lr_scale(epoch, iteration):
+    scale = {0}
+    if iteration < {1}:
+        # Warmup
+        scale *= (iteration + 1) / {1}
+    return scale
+
+
+class LRSchedule(training.Extension):
+    """Set {2} of the optimizer to its initial value * lr_scale."""
+    trigger = 1, 'iteration'
+
+    def __init__(self, optimizer):
+        self.optimizer = optimizer
+        self.base = optimizer.{2}
+
+    def initialize(self, trainer):
+        self(trainer)
+
+    def __call__(self, trainer):
+        updater = trainer.updater
+        self.optimizer.{2} = self.base * lr_scale(updater.epoch_detail,
+                                                   updater.iteration)
+'''.format(scale, train_server['LRWarmup'], lr_attribute(train_server))
 
 
 class TrainerTemplate(Template):
-    def __call__(self, kwargs):
-        call_train = '''
+    def __call__(self, kwargs, fused=False):
+        call_train = ''
+        accumulation_steps = kwargs['AccumulationSteps']
+        if accumulation_steps > 1:
+            call_train += self.accumulation_updater()
+        call_train += self.array_iterator()
+        call_train += '''
 
-def training_main(train, test, pbar=None, plot_postprocess=None):
-    model = {3}()
+def training_main(train, test, pbar=None, plot_postprocess=None,
+                  cw_extensions=(), live_report=None, make_evaluator=None):
+    model = {0}()
 
     optimizer = get_optimizer()
     optimizer.setup(model)
-
-    train_iter = chainer.iterators.SerialIterator(train, {1})
-    test_iter = chainer.iterators.SerialIterator(test, {1},
-                                                 repeat=False,
-                                                 shuffle=False)
+'''.format(kwargs['NetName'])
+        if kwargs['EvalSubset']:
+            call_train += '''
+    if {0} < len(test):
+        # Fixed random subset of the test data.
+        order = numpy.random.RandomState({1}).permutation(len(test))
+        test = chainer.datasets.SubDataset(test, 0, {0}, order)
+'''.format(kwargs['EvalSubset'], kwargs['EvalSeed'])
+        call_train += '''
+    # ArrayIterator if the data are numpy arrays.
+    train_iter, converter = make_iterator(train, {0})
+    test_iter, test_converter = make_iterator(test, {0}, repeat=False,
+                                              shuffle=False)
 
     # Set up a trainer
-    updater = training.StandardUpdater(train_iter, optimizer,
-                                       device={2})
-    '''.format(kwargs['Optimizer'], kwargs['BatchSize'],
-               kwargs['GPU']-1, kwargs['NetName']) + '''
+'''.format(kwargs['BatchSize'])
+        if accumulation_steps > 1:
+            call_train += '''    updater = GradientAccumulationUpdater(
+        train_iter, optimizer, {0}, converter=converter, device={1})
+'''.format(accumulation_steps, kwargs['GPU']-1)
+        else:
+            call_train += '''    updater = training.StandardUpdater(train_iter, optimizer,
+                                       converter=converter, device={0})
+'''.format(kwargs['GPU']-1)
+        call_train += '''
     if pbar is None:
         trainer = training.Trainer(updater, ({0}, 'epoch'))
     else:
         trainer = training.Trainer(updater, pbar.get_stop_trigger)
     '''.format(kwargs['Epoch']) + '''
-    trainer.extend(extensions.Evaluator(test_iter, model, device={0}))
-    '''.format(kwargs['GPU']-1) + '''
-    trainer.extend(extensions.LogReport(log_name='{0}/log'))
-    trainer.extend(
-        extensions.PlotReport(['main/loss', 'validation/main/loss'],
-                               'epoch',
-                               file_name='{0}/loss.png',
-                               postprocess=plot_postprocess))
+    eval_trigger = {1}
+    if make_evaluator is None:
+        trainer.extend(extensions.Evaluator(test_iter, model,
+                                            converter=test_converter,
+                                            device={0}),
+                       trigger=eval_trigger)
+    else:
+        # e.g. AsyncEvaluator, which evaluates in another process.
+        trainer.extend(make_evaluator(test_iter, model, eval_trigger,
+                                      test_converter))
+    '''.format(kwargs['GPU']-1,
+               (kwargs['EvalInterval'], 'iteration')
+               if kwargs['EvalInterval'] else (1, 'epoch'))
+        if use_lr_schedule(kwargs):
+            call_train += '''trainer.extend(LRSchedule(optimizer))
+    trainer.extend(extensions.observe_value(
+        'lr', lambda trainer: optimizer.{0}))
+    '''.format(lr_attribute(kwargs))
+        call_train += '''trainer.extend(extensions.LogReport(log_name='{0}/log'))
+    if live_report is not None:
+        # Charts are drawn by the GUI.
+        trainer.extend(live_report)
+    else:
+        trainer.extend(
+            extensions.PlotReport(['main/loss', 'validation/main/loss'],
+                                  'epoch',
+                                  file_name='{0}/loss.png',
+                                  postprocess=plot_postprocess))
     '''.format(kwargs.get_result_dir())
         if 'Class' in kwargs['Task']:
             call_train += '''
-    trainer.extend(
-        extensions.PlotReport(['main/accuracy', 'validation/main/accuracy'],
-                               'epoch', file_name='{0}/accuracy.png'))
+        trainer.extend(
+            extensions.PlotReport(['main/accuracy',
+                                   'validation/main/accuracy'],
+                                  'epoch', file_name='{0}/accuracy.png'))
     '''.format(kwargs.get_result_dir())
         call_train += '''
     if pbar is not None:
         trainer.extend(pbar)
     else:
         trainer.extend(extensions.ProgressBar())
+    for extension in cw_extensions:
+        trainer.extend(extension)
 
     if _chainerui_available:
         trainer.extend(CommandsExtension())
@@ -148,7 +385,7 @@ def prediction_main(input, classification=False):
     with chainer.using_config('train', False):
         model = {0}()
         serializers.load_npz('{1}.npz', model)
-        if classification:
+{2}        if classification:
             return model.predict_class(input)
         else:
             return model.predict(input)
@@ -156,5 +393,50 @@ def prediction_main(input, classification=False):
 
 if __name__ == '__main__':
     training_main(False)
-'''.format(kwargs['NetName'], kwargs.get_model_name())
+'''.format(kwargs['NetName'], kwargs.get_model_name(),
+           '        model.fuse_batch_normalization()\n' if fused else '')
         return call_train
+
+    def array_iterator(self):
+        """
+        :return: Code of make_iterator and what it uses, so that the net
+         file does not depend on chainer_wing.
+        """
+        import inspect
+        from chainer_wing.extension import array_iterator
+        return ''.join('\n\n' + inspect.getsource(obj)
+                       for obj in (array_iterator.get_arrays,
+                                   array_iterator.array_converter,
+                                   array_iterator.make_iterator,
+                                   array_iterator.ArrayIterator))
+
+    def accumulation_updater(self):
+        return '''
+
+class GradientAccumulationUpdater(training.StandardUpdater):
+    """Update with the mean gradient of accumulation_steps mini batches."""
+
+    def __init__(self, iterator, optimizer, accumulation_steps,
+                 converter=chainer.dataset.concat_examples, device=None):
+        super(GradientAccumulationUpdater, self).__init__(
+            iterator, optimizer, converter=converter, device=device)
+        self.accumulation_steps = accumulation_steps
+
+    def update_core(self):
+        iterator = self._iterators['main']
+        optimizer = self._optimizers['main']
+        loss_func = self.loss_func or optimizer.target
+        optimizer.target.cleargrads()
+        new_epoch = False
+        for _ in range(self.accumulation_steps):
+            batch = iterator.next()
+            in_arrays = self.converter(batch, self.device)
+            loss = loss_func(*in_arrays) / self.accumulation_steps
+            loss.backward()
+            # Free the activations before the next mini batch.
+            loss.unchain_backward()
+            new_epoch = new_epoch or iterator.is_new_epoch
+        optimizer.update()
+        if new_epoch and getattr(self, 'auto_new_epoch', False):
+            optimizer.new_epoch(auto=True)
+'''
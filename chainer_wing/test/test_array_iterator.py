@@ -0,0 +1,81 @@
+from chainer.datasets import SubDataset
+from chainer.datasets import TupleDataset
+import numpy as np
+
+from chainer_wing.extension.array_iterator import ArrayIterator
+
+if __name__ == '__main__':
+    x = np.arange(10, dtype=np.float32).reshape(10, 1)
+    t = np.arange(10, dtype=np.int32)
+    dataset = TupleDataset(x, t)
+
+    # Batch boundaries: the batch over the end of an epoch is filled with
+    # the head of the next one.
+    iterator = ArrayIterator(dataset, 4, shuffle=False)
+    batches = [iterator.next()[1].tolist() for _ in range(3)]
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9, 0, 1]]
+    assert iterator.epoch == 1
+    assert iterator.is_new_epoch
+    assert iterator.current_position == 2
+    assert iterator.epoch_detail == 1.2
+    assert iterator.next()[1].tolist() == [2, 3, 4, 5]
+    assert not iterator.is_new_epoch
+
+    # A batch larger than the dataset takes whole shuffled passes, and
+    # each of them counts as an epoch.
+    np.random.seed(1)
+    iterator = ArrayIterator(TupleDataset(x[:4], t[:4]), 10)
+    batch_t = iterator.next()[1]
+    assert iterator.epoch == 2
+    assert iterator.current_position == 2
+    assert iterator.is_new_epoch
+    assert sorted(batch_t[:4].tolist()) == [0, 1, 2, 3]
+    assert sorted(batch_t[4:8].tolist()) == [0, 1, 2, 3]
+    orders = [batch_t[:4].tolist(), batch_t[4:8].tolist()]
+    batch_t = iterator.next()[1]
+    assert iterator.epoch == 5
+    assert iterator.current_position == 0
+    orders.append(batch_t[2:6].tolist())
+    assert len(set(map(tuple, orders))) > 1
+    iterator = ArrayIterator(TupleDataset(x[:4], t[:4]), 8, shuffle=False)
+    assert iterator.next()[1].tolist() == [0, 1, 2, 3, 0, 1, 2, 3]
+    assert iterator.epoch == 2 and iterator.current_position == 0
+
+    # repeat=False: the last batch is short and the iteration stops.
+    iterator = ArrayIterator(dataset, 4, repeat=False, shuffle=False)
+    batches = [batch[1].tolist() for batch in iterator]
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert iterator.epoch == 1
+    iterator.reset()
+    assert iterator.next()[1].tolist() == [0, 1, 2, 3]
+
+    # Shuffle: each epoch is a permutation, and x and t stay paired.
+    np.random.seed(0)
+    iterator = ArrayIterator(dataset, 5)
+    for _ in range(3):
+        seen = []
+        for _ in range(2):
+            batch_x, batch_t = iterator.next()
+            assert (batch_x[:, 0] == batch_t).all()
+            seen.extend(batch_t.tolist())
+        assert sorted(seen) == list(range(10))
+    assert seen != list(range(10))
+
+    # SubDataset, e.g. the test subset of the generated trainer.
+    order = np.random.permutation(10)
+    iterator = ArrayIterator(SubDataset(dataset, 0, 4, order), 4,
+                             shuffle=False)
+    assert iterator.next()[1].tolist() == order[:4].tolist()
+
+    # Buffers are reused: a batch is overwritten by the next but one, so
+    # that it must be copied to be kept.
+    iterator = ArrayIterator(dataset, 2, shuffle=False)
+    first = iterator.next()
+    kept = first[1].copy()
+    second = iterator.next()
+    assert first[1].tolist() == [0, 1]
+    assert second[1].tolist() == [2, 3]
+    third = iterator.next()
+    assert third[1] is first[1]
+    assert first[1].tolist() == [4, 5]
+    assert kept.tolist() == [0, 1]
@@ -0,0 +1,97 @@
+from chainer_wing.compiler import Compiler
+from chainer_wing.compiler_pass import DeadNodeElimination
+from chainer_wing.compiler_pass import FoldActivation
+from chainer_wing.compiler_pass import FuseBatchNormalization
+from chainer_wing.gui_main.graph import Graph
+from chainer_wing.node import NODECLASSES
+import chainer_wing.node_lib  # To register CustomNodes.
+
+
+def spawn(graph, class_name, **values):
+    node = graph.spawnNode(NODECLASSES[class_name])
+    for name, value in values.items():
+        node.inputs[name].set_value(value)
+    return node
+
+
+def connect(graph, *nodes):
+    for producer, consumer in zip(nodes[:-1], nodes[1:]):
+        graph.connect(producer, 'out_array', consumer, 'in_array')
+
+
+def optimize(graph, optimization):
+    compiler = Compiler(passes=[optimization])
+    program = compiler.optimize(graph.nodes)
+    return program, compiler.reports[0]
+
+
+if __name__ == '__main__':
+    # DeadNodeElimination drops nodes which do not lead to a loss.
+    graph = Graph()
+    linear = spawn(graph, 'Linear', out_size=3, nobias=False)
+    loss = spawn(graph, 'SoftmaxCrossEntropy')
+    connect(graph, linear, loss)
+    dead = spawn(graph, 'Linear', out_size=3, nobias=False)
+    dead_relu = spawn(graph, 'Relu')
+    connect(graph, dead, dead_relu)
+    program, report = optimize(graph, DeadNodeElimination())
+    assert set(program.nodes.values()) == {linear, loss}
+    assert report == 'DeadNodeElimination: dropped {}, dropped {}'.format(
+        dead.get_name(), dead_relu.get_name())
+    program, report = optimize(graph, FoldActivation())
+    assert len(program.nodes) == 4
+    assert report == 'FoldActivation: nothing changed.'
+
+    # FoldActivation keeps the activation which computes both alone.
+    graph = Graph()
+    linear = spawn(graph, 'Linear', out_size=3, nobias=False)
+    relu0 = spawn(graph, 'Relu')
+    relu1 = spawn(graph, 'Relu')
+    clipped0 = spawn(graph, 'ClippedRelu', z=5.)
+    clipped1 = spawn(graph, 'ClippedRelu', z=2.)
+    loss = spawn(graph, 'SoftmaxCrossEntropy')
+    connect(graph, linear, relu0, relu1, clipped0, clipped1, loss)
+    program, report = optimize(graph, FoldActivation())
+    assert program.chains == [[loss, clipped1, linear]]
+    assert set(program.nodes.values()) == {linear, clipped1, loss}
+    assert report.count('folded') == 3
+
+    # Sigmoid is not folded into Relu.
+    graph = Graph()
+    linear = spawn(graph, 'Linear', out_size=3, nobias=False)
+    relu = spawn(graph, 'Relu')
+    sigmoid = spawn(graph, 'Sigmoid')
+    loss = spawn(graph, 'SoftmaxCrossEntropy')
+    connect(graph, linear, relu, sigmoid, loss)
+    program, report = optimize(graph, FoldActivation())
+    assert program.chains == [[loss, sigmoid, relu, linear]]
+
+    # FuseBatchNormalization fuses BatchNormalization into the preceding
+    # Linear only if it is the only consumer of the Linear.
+    graph = Graph()
+    linear0 = spawn(graph, 'Linear', out_size=8, nobias=True)
+    bn0 = spawn(graph, 'BatchNormalization', size=8, decay=0.9, eps=2e-5,
+                use_gamma=True, use_beta=True)
+    relu = spawn(graph, 'Relu')
+    bn1 = spawn(graph, 'BatchNormalization', size=8, decay=0.9, eps=2e-5,
+                use_gamma=True, use_beta=True)
+    linear1 = spawn(graph, 'Linear', out_size=3, nobias=False)
+    loss = spawn(graph, 'SoftmaxCrossEntropy')
+    connect(graph, linear0, bn0, relu, bn1, linear1, loss)
+    program, report = optimize(graph, FuseBatchNormalization())
+    assert dict(program.fused) == {bn0: linear0}
+    assert program.fused_chains() == [[loss, linear1, bn1, relu, linear0]]
+    assert report == 'FuseBatchNormalization: fused {} into {}'.format(
+        bn0.get_name(), linear0.get_name())
+
+    graph = Graph()
+    linear = spawn(graph, 'Linear', out_size=8, nobias=True)
+    bn = spawn(graph, 'BatchNormalization', size=8, decay=0.9, eps=2e-5,
+               use_gamma=True, use_beta=True)
+    loss0 = spawn(graph, 'SoftmaxCrossEntropy')
+    loss1 = spawn(graph, 'SoftmaxCrossEntropy')
+    connect(graph, linear, bn, loss0)
+    connect(graph, linear, loss1)
+    program, report = optimize(graph, FuseBatchNormalization())
+    assert not program.fused
+    assert report == 'FuseBatchNormalization: nothing changed.'
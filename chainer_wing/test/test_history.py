@@ -0,0 +1,118 @@
+import sys
+
+from PyQt5.QtWidgets import QApplication
+
+from chainer_wing.gui_main.graph import Graph
+from chainer_wing.gui_main.painter import Painter2D
+from chainer_wing.node import NODECLASSES
+import chainer_wing.node_lib  # To register CustomNodes.
+
+
+def spawn(graph, class_name, position=(0, 0)):
+    return graph.spawnNode(NODECLASSES[class_name], position=position,
+                           silent=True)
+
+
+def state(graph):
+    """
+    :return: Nodes as (ID, class, position, input values) and connections
+     as (output node ID, output, input node ID, input).
+    """
+    nodes = set()
+    for nodeID, node in graph.nodes.items():
+        values = tuple((name, inp.value) for name, inp in node.inputs.items())
+        nodes.add((nodeID, type(node).__name__, tuple(node.__pos__), values))
+    connections = {(conn.output_node.ID, conn.output_name,
+                    conn.input_node.ID, conn.input_name)
+                   for conn in graph.inputConnection.values()}
+    return nodes, connections
+
+
+if __name__ == '__main__':
+    test_app = QApplication(sys.argv)
+    painter = Painter2D()
+    graph = Graph(painter=painter)
+    history = painter.history
+
+    linear = spawn(graph, 'Linear', (0, 0))
+    relu = spawn(graph, 'Relu', (200, 0))
+    loss = spawn(graph, 'SoftmaxCrossEntropy', (400, 0))
+    graph.connect(linear, 'out_array', relu, 'in_array')
+    graph.connect(relu, 'out_array', loss, 'in_array')
+    painter.commit_history()
+    built = state(graph)
+    assert len(built[0]) == 3 and len(built[1]) == 2
+
+    # Value edits while typing make one operation.
+    unset = linear.inputs['out_size'].value
+    painter.set_input_from_text(linear, 'out_size', '1')
+    painter.set_input_from_text(linear, 'out_size', '10')
+    painter.commit_history()
+    assert list(history.undo_stack[-1]) == [
+        ['value', linear.ID, 'out_size', unset, 10]]
+    edited = state(graph)
+    assert history.undo(painter)
+    assert state(graph) == built
+    assert history.redo(painter)
+    assert state(graph) == edited
+
+    # Deleting a node also removes its connections, and undo restores both.
+    painter.delete_node(relu)
+    assert relu.ID not in graph.nodes
+    assert not graph.inputConnection
+    assert history.undo(painter)
+    assert state(graph) == edited
+    respawned = graph.nodes[relu.ID]
+    assert respawned is not relu
+    assert history.redo(painter)
+    assert relu.ID not in graph.nodes and not graph.inputConnection
+    assert history.undo(painter)
+
+    # A value change recorded before a node was deleted is replayed on the
+    # node respawned by undo, which is fetched by ID.
+    painter.set_input_from_text(linear, 'out_size', '20')
+    painter.commit_history()
+    painter.delete_node(linear)
+    assert history.undo(painter)
+    restored = graph.nodes[linear.ID]
+    assert restored is not linear
+    assert restored.inputs['out_size'].value == 20
+    assert history.undo(painter)
+    assert restored.inputs['out_size'].value == 10
+    assert state(graph) == edited
+    assert history.redo(painter)
+    assert restored.inputs['out_size'].value == 20
+    assert history.redo(painter)
+    assert linear.ID not in graph.nodes
+    assert not history.redo(painter)
+    assert history.undo(painter)
+    assert graph.nodes[linear.ID].inputs['out_size'].value == 20
+
+    # Clear all is one command.
+    before_clear = state(graph)
+    painter.clear_all_nodes(repaint=False)
+    painter.commit_history()
+    assert not graph.nodes and not graph.inputConnection
+    assert history.undo(painter)
+    assert state(graph) == before_clear
+    assert history.redo(painter)
+    assert not graph.nodes
+    assert history.undo(painter)
+    assert state(graph) == before_clear
+
+    # A new command drops the commands which can be redone.
+    assert history.undo(painter)
+    spawn(graph, 'Relu', (0, 200))
+    painter.commit_history()
+    assert not history.redo(painter)
+
+    # Nodes spawned after clear all are numbered from 0 again, and undo
+    # gives the restored nodes their own IDs back.
+    before_clear = state(graph)
+    painter.clear_all_nodes(repaint=False)
+    painter.commit_history()
+    assert spawn(graph, 'Relu').ID == 'f0'
+    painter.commit_history()
+    assert history.undo(painter)
+    assert history.undo(painter)
+    assert state(graph) == before_clear
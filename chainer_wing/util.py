@@ -2,7 +2,6 @@ import json
 import os
 import sys
 
-from chainer import cuda
 from PyQt5 import QtWidgets
 
 from chainer_wing.subwindows.train_config import TrainParamServer
@@ -24,6 +23,7 @@ def disp_message(message: str, title=None):
 
 
 def check_cuda_available():
+    from chainer import cuda
     try:
         cuda.check_cuda_available()
     except RuntimeError:
@@ -46,6 +46,10 @@ class UnexpectedFileExtension(Exception):
     pass
 
 
+class InvalidShape(Exception):
+    pass
+
+
 def get_executed_last_node():
 
     def get_last_lineno(stack):
@@ -127,6 +131,21 @@ def for_image_extensions():
     return 'jpg', 'jpeg', 'png', 'tiff', 'bmp'
 
 
+def prod(shape):
+    result = 1
+    for size in shape:
+        result *= size
+    return result
+
+
+def format_bytes(n_bytes):
+    for unit in ('B', 'KiB', 'MiB'):
+        if n_bytes < 1024:
+            return '{:.4g} {}'.format(n_bytes, unit)
+        n_bytes /= 1024
+    return '{:.4g} GiB'.format(n_bytes)
+
+
 def isfloat(string: str):
     try:
         float(string)